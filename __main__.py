@@ -0,0 +1,5 @@
+# __main__.py
+"""Lets the checkout run as `python <checkout> [options]`, the same as `python main.py`."""
+from main import main
+
+main()
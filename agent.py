@@ -1,22 +1,24 @@
 import random
 import math
-import time
-from OpenGL.GL import *
-from map import Map
+from sim_clock import WallClock
+from compartments import HEALTHY, INFECTED, RECOVERED, DECEASED
+from events import QUARANTINE, RESOLVE, GRAVEYARD
 
 class Agent:
     HEALTHY = "healthy"
     INFECTED = "infected"
     REMOVED = "removed"
-    QUARANTINE_THRESHOLD = 5  # Seconds before moving to quarantine
+    QUARANTINE_THRESHOLD = 5  # Simulated seconds before moving to quarantine
     QUARANTINE_SIZE = 2
     QUARANTINE_DELAY = 10  
     ANIMATION_SPEED = 0.3  # Speed of arc animation to quarantine
+    GRAVEYARD_DELAY = 1  # Seconds a deceased agent waits before it is carried to the graveyard
 
     def __init__(self, city_size, building_size, road_width, city_map, step_size=0.05,
                  infection_radius=0.5, detection_radius=3.0,
                  infection_probability=0.75, infection_duration=15,
-                 mortality_rate=0.2, road_buffer=0.3, quarantine_start_time=5):
+                 mortality_rate=0.2, road_buffer=0.3, quarantine_start_time=5, clock=None, rng=None,
+                 counter=None, scheduler=None):
         self.city_size = city_size
         self.building_size = building_size
         self.road_width = road_width
@@ -27,13 +29,23 @@ class Agent:
         self.infection_duration = infection_duration
         self.mortality_rate = mortality_rate
         self.road_buffer = road_buffer
+        self.clock = clock if clock is not None else WallClock()  # Source of (simulated) time
+        self.rng = rng if rng is not None else random  # Per-run SimulationRNG, or the global stream
         self.state = Agent.HEALTHY
+        self.compartment = HEALTHY  # Healthy, infected, recovered or deceased
+        self.counter = counter  # Run-wide CompartmentCounter notified of every transition
+        if counter is not None:
+            counter.add(HEALTHY)
+        # Run-wide events.EventScheduler for the infection timers; without one they are
+        # checked every tick instead
+        self.scheduler = scheduler
+        self.quarantine_due = False  # Set by the quarantine event
         self.color = (0.0, 1.0, 0.0)  # Green for healthy
         self.infection_start_time = None
         self.cube_size = 0.15
         self.x, self.y = self._random_road_position()
-        self.direction = random.choice(["up", "down", "left", "right"])
-        self.steps_remaining = random.uniform(0, 0.05)
+        self.direction = self.rng.choice(["up", "down", "left", "right"])
+        self.steps_remaining = self.rng.uniform(0, 0.05)
         self.quarantine_start_time = quarantine_start_time
         self.in_quarantine = False  # Track if the agent is in quarantine
         self.moving_to_quarantine = False  # Track if the agent is animating to quarantine
@@ -54,37 +66,76 @@ class Agent:
 
     def _random_road_position(self):
         cell_size = self.building_size + self.road_width
-        x = random.randint(0, self.city_size - 2) * cell_size + self.building_size + self.road_buffer
-        y = random.randint(0, self.city_size - 2) * cell_size + self.building_size + self.road_buffer
-        x += random.uniform(0, self.road_width - 2 * self.road_buffer)
-        y += random.uniform(0, self.road_width - 2 * self.road_buffer)
+        x = self.rng.randint(0, self.city_size - 2) * cell_size + self.building_size + self.road_buffer
+        y = self.rng.randint(0, self.city_size - 2) * cell_size + self.building_size + self.road_buffer
+        x += self.rng.uniform(0, self.road_width - 2 * self.road_buffer)
+        y += self.rng.uniform(0, self.road_width - 2 * self.road_buffer)
         return x, y
 
+    def _set_compartment(self, compartment):
+        old = self.compartment
+        self.compartment = compartment
+        if self.counter is not None:
+            self.counter.transition(old, compartment, 1, self.clock.now())
+
     def infect(self):
         """Set the agent's state to infected with a probability."""
         if self.state == Agent.HEALTHY:
-            if random.random() < self.infection_probability:
-                self.state = Agent.INFECTED
-                self.color = (1.0, 0.0, 0.0)  # Red for infected
-                self.infection_start_time = time.time()
+            if self.rng.random() < self.infection_probability:
+                self.become_infected()
+
+    def become_infected(self):
+        """Infect the agent unconditionally, starting its infection timer now.
+
+        With a scheduler, the quarantine and the outcome (drawn now) are scheduled here.
+        """
+        self.state = Agent.INFECTED
+        self.color = (1.0, 0.0, 0.0)  # Red for infected
+        self.infection_start_time = self.clock.now()
+        self._set_compartment(INFECTED)
+        if self.scheduler is not None:
+            dies = self.rng.random() < self.mortality_rate
+            self.scheduler.schedule(self.infection_start_time + Agent.QUARANTINE_THRESHOLD, QUARANTINE, self)
+            self.scheduler.schedule(self.infection_start_time + self.infection_duration, RESOLVE, self, dies)
+
+    def resolve_infection(self, dies, time=None):
+        """End the infection: the agent dies or recovers."""
+        self.state = Agent.REMOVED
+        if dies:
+            self.color = (1.0, 0.65, 0.0)
+            self.deceased_start_time = self.clock.now() if time is None else time  # Mark the time of death
+            self._set_compartment(DECEASED)
+        else:
+            self.color = (0.0, 0.0, 1.0)  # Blue for recovered
+            self._set_compartment(RECOVERED)
+
+    def handle_event(self, kind, time, payload=None):
+        """Apply an event of this agent that has come due on the scheduler (see events.py)."""
+        if kind == QUARANTINE:
+            self.quarantine_due = self.state == Agent.INFECTED
+        elif kind == RESOLVE:
+            self.resolve_infection(payload, time)
+            if payload:
+                self.scheduler.schedule(time + Agent.GRAVEYARD_DELAY, GRAVEYARD, self)
+        elif kind == GRAVEYARD:
+            self.start_moving_to_graveyard(self.map_instance.graveyard_start_x, self.map_instance.graveyard_start_y)
 
     def update_infection_status(self):
         """Update the infection status based on duration and mortality rate."""
         if self.state == Agent.INFECTED:
-            elapsed_time = time.time() - self.infection_start_time
-
-            # Infection duration complete, determine next state
-            if elapsed_time >= self.infection_duration:
-                if random.random() < self.mortality_rate:
-                    self.state = Agent.REMOVED
-                    self.color = (1.0, 0.65, 0.0)  
-                    self.deceased_start_time = time.time()  # Mark the time of death
-                else:
-                    self.state = Agent.REMOVED
-                    self.color = (0.0, 0.0, 1.0)  # Blue for recovered
+            if self.scheduler is None:
+                elapsed_time = self.clock.now() - self.infection_start_time
+
+                # Infection duration complete, determine next state
+                if elapsed_time >= self.infection_duration:
+                    self.resolve_infection(self.rng.random() < self.mortality_rate)
+                    return
+                quarantine_due = elapsed_time >= Agent.QUARANTINE_THRESHOLD
+            else:
+                quarantine_due = self.quarantine_due
 
             # Quarantine logic
-            elif elapsed_time >= Agent.QUARANTINE_THRESHOLD and not self.in_quarantine:
+            if quarantine_due and not self.in_quarantine:
                 self.move_in_quarantine()  # Only infected agents can move to quarantine
 
 
@@ -97,8 +148,8 @@ class Agent:
         self.arc_mid = ((self.x + self.quarantine_box_position[0]) / 2, 
                         (self.y + self.quarantine_box_position[1]) / 2 + 5)  # Midpoint for an arc effect
         self.arc_end = (
-            self.quarantine_box_position[0] + random.uniform(0, Agent.QUARANTINE_SIZE),
-            self.quarantine_box_position[1] + random.uniform(0, Agent.QUARANTINE_SIZE)
+            self.quarantine_box_position[0] + self.rng.uniform(0, Agent.QUARANTINE_SIZE),
+            self.quarantine_box_position[1] + self.rng.uniform(0, Agent.QUARANTINE_SIZE)
         )  # Random end position within quarantine
 
     def animate_to_quarantine(self):
@@ -108,8 +159,8 @@ class Agent:
             self.in_quarantine = True
             self.moving_to_quarantine = False
             # Randomize position within quarantine box on arrival
-            self.x = self.quarantine_box_position[0] + random.uniform(0, Agent.QUARANTINE_SIZE)
-            self.y = self.quarantine_box_position[1] + random.uniform(0, Agent.QUARANTINE_SIZE)
+            self.x = self.quarantine_box_position[0] + self.rng.uniform(0, Agent.QUARANTINE_SIZE)
+            self.y = self.quarantine_box_position[1] + self.rng.uniform(0, Agent.QUARANTINE_SIZE)
             return
 
         # Quadratic Bezier interpolation for arc movement
@@ -121,8 +172,8 @@ class Agent:
         """Move randomly within the quarantine zone."""
         quarantine_x_start = self.quarantine_box_position[0]
         quarantine_y_start = self.quarantine_box_position[1]
-        self.x = max(quarantine_x_start, min(self.x + random.uniform(-0.02, 0.02), quarantine_x_start + Agent.QUARANTINE_SIZE))
-        self.y = max(quarantine_y_start, min(self.y + random.uniform(-0.02, 0.02), quarantine_y_start + Agent.QUARANTINE_SIZE))
+        self.x = max(quarantine_x_start, min(self.x + self.rng.uniform(-0.02, 0.02), quarantine_x_start + Agent.QUARANTINE_SIZE))
+        self.y = max(quarantine_y_start, min(self.y + self.rng.uniform(-0.02, 0.02), quarantine_y_start + Agent.QUARANTINE_SIZE))
 
     def stay_in_quarantine(self):
         """Keeps the agent in quarantine box with no movement."""
@@ -133,7 +184,7 @@ class Agent:
         """Attempt to infect another agent if they are healthy."""
         if self.state == Agent.INFECTED and other_agent.state == Agent.HEALTHY:
             distance = math.sqrt((self.x - other_agent.x) ** 2 + (self.y - other_agent.y) ** 2)
-            if distance <= self.infection_radius and random.random() < self.infection_probability:
+            if distance <= self.infection_radius and self.rng.random() < self.infection_probability:
                 other_agent.infect()
 
 
@@ -155,8 +206,8 @@ class Agent:
             possible_directions.remove("up")
 
         # Favor current direction or pick a random valid direction
-        self.direction = random.choice(possible_directions)
-        self.steps_remaining = random.uniform(0, 0.05)
+        self.direction = self.rng.choice(possible_directions)
+        self.steps_remaining = self.rng.uniform(0, 0.05)
 
 
     def random_move(self):
@@ -172,18 +223,20 @@ class Agent:
 
         if self.is_on_road(new_x, new_y):
             self.x, self.y = new_x, new_y
-            self.steps_remaining -= random.uniform(0, 0.02)
+            self.steps_remaining -= self.rng.uniform(0, 0.02)
 
         else:
             self.change_direction()
 
+    def is_buried(self):
+        """Whether this agent is deceased and has reached the graveyard (it is no longer drawn)."""
+        return bool(self.in_graveyard) and self.compartment == DECEASED
+
     def draw(self):
         """Draw the agent as a 3D cube unless deceased in graveyard."""
-        if self.in_graveyard and self.state == Agent.REMOVED and self.color == (1.0, 0.65, 0.0):
-            # Ensure the grave is added only once
-            if not getattr(self, 'grave_added', False):
-                self.map_instance.add_grave()
-                self.grave_added = True
+        # PyOpenGL is only imported for drawing, so headless runs and their workers start fast
+        from OpenGL.GL import glColor3f, glColor4f, glPopMatrix, glPushMatrix, glScalef, glTranslatef
+        if self.is_buried():
             return  # Skip cube drawing for deceased agents
 
         # Shadow and agent cube drawing as before for other agents
@@ -202,6 +255,7 @@ class Agent:
 
     def _draw_shape(self):
         """Base shape for Agent, overridden by subclasses."""
+        from OpenGL.GL import GL_QUADS, glBegin, glEnd, glVertex3f
         half_size = self.cube_size / 2
         glBegin(GL_QUADS)
         glVertex3f(-half_size, -half_size, half_size)
@@ -211,26 +265,7 @@ class Agent:
         glEnd()
 
     def is_on_road(self, x, y):
-        cell_size = self.building_size + self.road_width
-        buffer = 0.05
-        for i in range(self.city_size):
-            y_pos = (i + 1) * cell_size - self.road_width
-            if buffer <= x <= self.city_size * cell_size - buffer and y_pos + buffer <= y <= y_pos + self.road_width - buffer:
-                return True
-
-        for j in range(self.city_size):
-            x_pos = (j + 1) * cell_size - self.road_width
-            if buffer <= y <= self.city_size * cell_size - buffer and x_pos + buffer <= x <= x_pos + self.road_width - buffer:
-                return True
-            # Explicitly handle bottom horizontal road boundary with buffer
-            if buffer <= x <= self.city_size * cell_size - buffer and -self.road_width <= y <= buffer:
-                return True
-
-            # Explicitly handle left vertical road boundary with buffer
-            if buffer <= y <= self.city_size * cell_size - buffer and -self.road_width <= x <= buffer:
-                return True
-
-        return False
+        return self.map_instance.road_index.contains(x, y)
     
     def change_direction(self):
         self.choose_new_direction_with_bias()
@@ -241,6 +276,9 @@ class Agent:
         if self.arc_progress >= 1.0:
             self.in_graveyard = True
             self.moving_to_graveyard = False
+            if self.compartment == DECEASED and not getattr(self, 'grave_added', False):
+                self.map_instance.add_grave()  # Ensure the grave is added only once
+                self.grave_added = True
             return
 
         # Quadratic Bezier interpolation for arc movement
@@ -258,8 +296,8 @@ class Agent:
                             (self.y + graveyard_start_y) / 2 + 5)  # Arc midpoint for animation
 
             # Assign a unique grave position within the graveyard zone
-            grave_x = graveyard_start_x + random.uniform(0, self.map_instance.graveyard_width - 0.2)
-            grave_y = graveyard_start_y + random.uniform(0, self.map_instance.graveyard_height - 0.2)
+            grave_x = graveyard_start_x + self.rng.uniform(0, self.map_instance.graveyard_width - 0.2)
+            grave_y = graveyard_start_y + self.rng.uniform(0, self.map_instance.graveyard_height - 0.2)
             self.arc_end = (grave_x, grave_y)
             self.grave_position = self.arc_end  # Set the final resting position
 
@@ -274,28 +312,27 @@ class Agent:
 
         # REMOVED agents (recovered or deceased) shouldn't move further
         if self.state == Agent.REMOVED:
-            if self.color == (1.0, 0.65, 0.0):  # Deceased agents move to graveyard
-                if not self.moving_to_graveyard:
-                    if time.time() - self.deceased_start_time >= 1:  # 1-second delay before moving to graveyard
-                        self.start_moving_to_graveyard(
-                            self.map_instance.graveyard_start_x, 
-                            self.map_instance.graveyard_start_y
-                        )
-                elif not self.moving_to_graveyard:
-                    self.stay_in_graveyard()  # Ensure they stay at the grave position
-                else:
+            if self.compartment == DECEASED:  # Deceased agents move to graveyard
+                if self.moving_to_graveyard:
                     self.animate_to_graveyard()
+                elif (self.scheduler is None  # Otherwise started by the graveyard event
+                      and self.clock.now() - self.deceased_start_time >= Agent.GRAVEYARD_DELAY):
+                    self.start_moving_to_graveyard(
+                        self.map_instance.graveyard_start_x, 
+                        self.map_instance.graveyard_start_y
+                    )
                 return
 
         # Normal movement logic for healthy or quarantined agents
-        current_time = time.time()
+        current_time = self.clock.now()
 
         if self.in_quarantine:
             self.move_in_quarantine()
             return
 
         # Infected agents: move to quarantine after threshold
-        if self.state == Agent.INFECTED and (current_time - self.infection_start_time) >= Agent.QUARANTINE_THRESHOLD:
+        if self.state == Agent.INFECTED and (self.quarantine_due if self.scheduler is not None else
+                                             current_time - self.infection_start_time >= Agent.QUARANTINE_THRESHOLD):
             if not self.moving_to_quarantine:
                 self.start_moving_to_quarantine()
             self.animate_to_quarantine()
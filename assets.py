@@ -0,0 +1,77 @@
+# assets.py
+import os
+from OpenGL.GL import *
+from PIL import Image
+
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
+
+ROAD_TEXTURE = "asphalt-road-texture-dark-gray-color_1017-20231.jpg"
+BUILDING_TEXTURE = "clouds-reflected-windows-modern-office.png"
+GRASS_TEXTURE = "th.jpeg"
+GRAVESTONE_TEXTURE = "gravestone.png"
+FONT = "Minecraftia-Regular.ttf"
+
+_decoded_images = {}  # (path, alpha) -> (pixel bytes, width, height), shared by the whole process
+
+
+def decode_image(path, alpha=False):
+    """Decode an image file into bottom-up RGB(A) bytes for OpenGL, once per process."""
+    key = (path, alpha)
+    image = _decoded_images.get(key)
+    if image is None:
+        img = Image.open(path)
+        img = img.convert("RGBA" if alpha else "RGB")  # Convert for OpenGL compatibility
+        img = img.transpose(Image.FLIP_TOP_BOTTOM)  # Flip vertically for OpenGL
+        image = _decoded_images[key] = (img.tobytes(), img.size[0], img.size[1])
+    return image
+
+
+class AssetManager:
+    """Resolves the simulation's assets next to this module and keeps their GL textures alive.
+
+    Textures are uploaded once and reused by every Map created while the GL context
+    lives, so consecutive runs in the same window don't reload anything.
+    """
+
+    def __init__(self, base_dir=ASSET_DIR):
+        self.base_dir = base_dir
+        self.textures = {}  # (name, alpha) -> texture id
+
+    def path(self, name):
+        """Absolute path of an asset file."""
+        return os.path.join(self.base_dir, name)
+
+    def texture(self, name, alpha=False):
+        """GL texture id for an image asset, uploading it on first use."""
+        key = (name, alpha)
+        texture_id = self.textures.get(key)
+        if texture_id is None:
+            data, width, height = decode_image(self.path(name), alpha)
+            texture_format = GL_RGBA if alpha else GL_RGB
+
+            texture_id = glGenTextures(1)
+            glBindTexture(GL_TEXTURE_2D, texture_id)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+            glTexImage2D(GL_TEXTURE_2D, 0, texture_format, width, height, 0, texture_format, GL_UNSIGNED_BYTE, data)
+            self.textures[key] = texture_id
+        return texture_id
+
+    def release(self):
+        """Delete all textures; call before the GL context goes away."""
+        if self.textures:
+            glDeleteTextures(list(self.textures.values()))
+        self.textures.clear()
+
+
+_shared_assets = None
+
+
+def shared_assets():
+    """The process-wide AssetManager used by default."""
+    global _shared_assets
+    if _shared_assets is None:
+        _shared_assets = AssetManager()
+    return _shared_assets
@@ -0,0 +1,256 @@
+# bench.py
+"""Benchmarks of the simulation hot paths, with results compared against a stored baseline."""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+from city import CityLayout
+from compartments import CompartmentCounter
+from engine import PARAM_SETS, create_agents, create_contact_grid, move_phase, contact_phase, state_phase
+from events import EventScheduler
+from rng import SimulationRNG
+from sim_clock import SimulationClock
+
+BENCH_PARAMS = PARAM_SETS[4]  # Moderate radius, high probability: the epidemic spreads during the run
+ENGINES = ("agents", "population")
+DEFAULT_AGENTS = (50, 200, 1000)
+DEFAULT_CITY_SIZES = (5, 10, 20)
+RENDER_SIZE = (800, 800)
+
+
+class PhaseTimer:
+    """Accumulates the time spent in each named phase over a number of ticks."""
+
+    def __init__(self):
+        self.totals = {}
+
+    def time(self, phase, function, *args):
+        start = time.perf_counter()
+        function(*args)
+        self.totals[phase] = self.totals.get(phase, 0.0) + time.perf_counter() - start
+
+
+def _agent_phases(city_map, clock, num_agents, rng):
+    """Phases of the Agent-object engine, as (name, callable) pairs run in order each tick."""
+    counter = CompartmentCounter()
+    scheduler = EventScheduler(clock)
+    agents = create_agents(BENCH_PARAMS, city_map, clock, num_agents, rng, counter, scheduler)
+    grid = create_contact_grid(BENCH_PARAMS)
+    phases = [
+        ("movement", lambda: move_phase(agents)),
+        ("infection", lambda: contact_phase(agents, grid)),
+        ("state", lambda: state_phase(agents, scheduler)),
+    ]
+    return phases, agents, counter
+
+
+def _population_phases(city_map, clock, num_agents, rng):
+    """Phases of the NumPy engine (population.Population)."""
+    from population import Population
+    counter = CompartmentCounter()
+    population = Population.from_params(BENCH_PARAMS, city_map, num_agents, seed=rng.child_seed("population"),
+                                        clock=clock, counter=counter)
+    phases = [
+        ("movement", lambda: population.move(clock.now())),
+        ("infection", lambda: population.spread_infection(clock.now())),
+        ("state", lambda: population.update_infection_status(clock.now())),
+    ]
+    return phases, population, counter
+
+
+def _render_phases(city_map, engine, agents, counter):
+    """Rendering phases; each ends with glFinish so the GPU work is timed with it."""
+    from OpenGL.GL import glFinish
+    from agent_renderer import AgentRenderer
+    from hud import draw_hud
+
+    renderer = AgentRenderer()
+    draw_agents = renderer.draw if engine == "agents" else renderer.draw_population
+    text_renderer = _render_context().text_renderer
+
+    def finished(function, *args):
+        def run():
+            function(*args)
+            glFinish()
+        return run
+
+    return [
+        ("render_map", finished(city_map.draw_map)),
+        ("render_agents", finished(lambda: draw_agents(agents, city_map.frustum))),
+        ("render_hud", finished(draw_hud, text_renderer, counter, BENCH_PARAMS)),
+    ]
+
+
+_context = None
+
+
+class _RenderContext:
+    """A hidden window with a GL context and HUD text, shared by all render benchmarks."""
+
+    def __init__(self, width, height):
+        import pygame
+        from pygame.locals import DOUBLEBUF, OPENGL, HIDDEN
+        from assets import shared_assets, FONT
+        from hud import TextRenderer
+
+        pygame.init()
+        self.surface = pygame.display.set_mode((width, height), DOUBLEBUF | OPENGL | HIDDEN)
+        self.width = width
+        self.height = height
+        self.text_renderer = TextRenderer(shared_assets().path(FONT), width, height)
+
+
+def _render_context():
+    global _context
+    if _context is None:
+        _context = _RenderContext(*RENDER_SIZE)
+    return _context
+
+
+def bench_case(engine, num_agents, city_size, ticks=300, seed=0, render=False):
+    """Run one benchmark case and return {phase: seconds} summed over `ticks` ticks.
+
+    Every case starts from the same seeded state, so repeated runs do the same work.
+    """
+    rng = SimulationRNG(seed)
+    clock = SimulationClock()
+    if render:
+        from map import Map
+        from camera import Camera
+        context = _render_context()  # Map needs the GL context for its textures
+        city_map = Map(city_size, 2, 1, 1, rng)
+        Camera.for_city(city_map, context.width, context.height).apply()
+    else:
+        city_map = CityLayout(city_size, 2, 1, 1, rng)
+
+    make_phases = _agent_phases if engine == "agents" else _population_phases
+    phases, agents, counter = make_phases(city_map, clock, num_agents, rng)
+    if render:
+        phases += _render_phases(city_map, engine, agents, counter)
+
+    timer = PhaseTimer()
+    try:
+        for _ in range(ticks):
+            for phase, function in phases:
+                timer.time(phase, function)
+            clock.tick()
+    finally:
+        if render:
+            city_map.release()
+    return timer.totals
+
+
+def run_benchmarks(engines=ENGINES, agent_counts=DEFAULT_AGENTS, city_sizes=DEFAULT_CITY_SIZES,
+                   ticks=300, repeats=3, seed=0, render=False, progress=None):
+    """Benchmark every (engine, population, city size) combination.
+
+    Each case is run `repeats` times and the fastest time of each phase is kept, which
+    filters out most of the noise from other processes. Returns a list of result records.
+    """
+    results = []
+    for engine in engines:
+        for city_size in city_sizes:
+            for num_agents in agent_counts:
+                best = {}
+                for _ in range(repeats):
+                    for phase, seconds in bench_case(engine, num_agents, city_size, ticks, seed, render).items():
+                        best[phase] = min(seconds, best.get(phase, seconds))
+                for phase, seconds in best.items():
+                    result = {
+                        "engine": engine, "num_agents": num_agents, "city_size": city_size, "phase": phase,
+                        "ticks": ticks, "seconds_per_tick": seconds / ticks,
+                        "ticks_per_second": ticks / seconds if seconds > 0 else float("inf"),
+                    }
+                    results.append(result)
+                    if progress is not None:
+                        progress(result)
+    return results
+
+
+def result_key(result):
+    return result["engine"], result["num_agents"], result["city_size"], result["phase"]
+
+
+def compare(results, baseline, tolerance=0.2):
+    """Compare results against baseline results (both lists of records).
+
+    Returns (key, baseline ticks/s, current ticks/s, ratio) for every case present in
+    both, and the subset of them that is more than `tolerance` slower than the baseline.
+    """
+    previous = {result_key(result): result["ticks_per_second"] for result in baseline}
+    comparisons = []
+    for result in results:
+        key = result_key(result)
+        if key in previous:
+            ratio = result["ticks_per_second"] / previous[key]
+            comparisons.append((key, previous[key], result["ticks_per_second"], ratio))
+    regressions = [comparison for comparison in comparisons if comparison[3] < 1 - tolerance]
+    return comparisons, regressions
+
+
+def machine_info():
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def load_results(path):
+    with open(path, "r") as file:
+        return json.load(file)["results"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the simulation phases (ticks per second).")
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES))
+    parser.add_argument("--agents", nargs="+", type=int, default=list(DEFAULT_AGENTS))
+    parser.add_argument("--city-sizes", nargs="+", type=int, default=list(DEFAULT_CITY_SIZES))
+    parser.add_argument("--ticks", type=int, default=300, help="Ticks per run (300 = 10 simulated seconds)")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per case; the fastest is kept")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--render", action="store_true", help="Also time rendering (opens a hidden window)")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Fraction of ticks/s a case may lose before it counts as a regression")
+    parser.add_argument("--save-baseline", action="store_true", help="Also write the results to --baseline")
+    args = parser.parse_args()
+
+    def progress(result):
+        print(f"{result['engine']:>10} agents={result['num_agents']:<6} city={result['city_size']:<4} "
+              f"{result['phase']:<14} {result['ticks_per_second']:12.1f} ticks/s")
+
+    results = run_benchmarks(args.engines, args.agents, args.city_sizes, args.ticks, args.repeats,
+                             args.seed, args.render, progress)
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": machine_info(),
+        "config": {"params": BENCH_PARAMS, "ticks": args.ticks, "repeats": args.repeats, "seed": args.seed},
+        "results": results,
+    }
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=4)
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(report, file, indent=4)
+        print(f"Saved baseline to {args.baseline}")
+    elif args.baseline:
+        comparisons, regressions = compare(results, load_results(args.baseline), args.tolerance)
+        for (engine, num_agents, city_size, phase), before, after, ratio in comparisons:
+            flag = "  REGRESSION" if ratio < 1 - args.tolerance else ""
+            print(f"{engine:>10} agents={num_agents:<6} city={city_size:<4} {phase:<14} "
+                  f"{before:12.1f} -> {after:12.1f} ticks/s ({ratio:6.2f}x){flag}")
+        if regressions:
+            print(f"{len(regressions)} case(s) slower than the baseline by more than {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
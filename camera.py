@@ -0,0 +1,134 @@
+# camera.py
+import math
+import numpy as np
+import pygame
+from OpenGL.GL import *
+from OpenGL.GLU import *
+
+FIELD_OF_VIEW = 80  # Vertical field of view in degrees
+MIN_HEIGHT = 2.0
+ZOOM_STEP = 1.15  # Height factor per mouse-wheel notch or +/- key press
+PAN_STEP = 0.1  # Fraction of the visible height panned per arrow-key press
+
+
+class Frustum:
+    """The six clipping planes of a view, for testing what the camera can see.
+
+    A point p is inside when a*x + b*y + c*z + d >= 0 for every plane (a, b, c, d).
+    """
+
+    def __init__(self, planes):
+        self.planes = np.asarray(planes, dtype=np.float64)
+
+    @classmethod
+    def current(cls):
+        """Frustum of the current GL projection and modelview matrices."""
+        # GL returns column-major matrices, so these are the transposes of M and P
+        modelview = np.array(glGetFloatv(GL_MODELVIEW_MATRIX), dtype=np.float64).reshape(4, 4)
+        projection = np.array(glGetFloatv(GL_PROJECTION_MATRIX), dtype=np.float64).reshape(4, 4)
+        clip = (modelview @ projection).T  # P * M
+        rows = clip[3], clip[0], clip[1], clip[2]
+        planes = [rows[0] + rows[1], rows[0] - rows[1],  # Left, right
+                  rows[0] + rows[2], rows[0] - rows[2],  # Bottom, top
+                  rows[0] + rows[3], rows[0] - rows[3]]  # Near, far
+        return cls(planes)
+
+    def boxes_visible(self, bounds):
+        """Boolean mask of the axis-aligned boxes (n x 6 array of x0, y0, z0, x1, y1, z1) that
+        intersect the frustum, possibly including a few just outside it."""
+        bounds = np.asarray(bounds, dtype=np.float64)
+        visible = np.ones(len(bounds), dtype=bool)
+        for a, b, c, d in self.planes:
+            # Corner of each box furthest along the plane normal
+            x = bounds[:, 3] if a >= 0 else bounds[:, 0]
+            y = bounds[:, 4] if b >= 0 else bounds[:, 1]
+            z = bounds[:, 5] if c >= 0 else bounds[:, 2]
+            visible &= a * x + b * y + c * z + d >= 0
+        return visible
+
+    def points_visible(self, x, y, z=0.0, radius=0.0):
+        """Boolean mask of the points (arrays x, y and z) within radius of the frustum."""
+        visible = np.ones(np.shape(x), dtype=bool)
+        for a, b, c, d in self.planes:
+            visible &= a * x + b * y + c * z + d >= -radius * math.sqrt(a * a + b * b + c * c)
+        return visible
+
+
+class Camera:
+    """Top-down perspective camera with zoom and pan.
+
+    Looks straight down at (center_x, center_y) from `height` units above the ground,
+    like setup_camera. Mouse wheel or +/- zoom, arrow keys or dragging with the left
+    button pan, and Home returns to the initial view.
+    """
+
+    def __init__(self, center_x, center_y, height, width_px, height_px, max_height=None):
+        self.home = (center_x, center_y, height)
+        self.center_x, self.center_y, self.height = self.home
+        self.width_px = width_px
+        self.height_px = height_px
+        self.max_height = max_height if max_height is not None else max(height * 4, 100.0)
+
+    @classmethod
+    def for_city(cls, city_map, width_px, height_px, height=20):
+        """Camera centered over the city grid, as setup_camera places it."""
+        center = city_map.city_size * (city_map.building_size + city_map.road_width) / 2
+        return cls(center, center, height, width_px, height_px, max_height=max(height * 4, center * 3))
+
+    def apply(self):
+        """Load the projection and modelview matrices for the current view."""
+        glMatrixMode(GL_PROJECTION)
+        glLoadIdentity()
+        # Keep the ground inside the far plane however far the camera is zoomed out
+        gluPerspective(FIELD_OF_VIEW, self.width_px / self.height_px, 0.1, max(100.0, self.height * 2))
+        glMatrixMode(GL_MODELVIEW)
+        glLoadIdentity()
+        gluLookAt(self.center_x, self.center_y, self.height,  # Eye above the center
+                  self.center_x, self.center_y, 0,  # Looking straight down
+                  0, 1, 0)  # Up vector
+
+    def units_per_pixel(self):
+        """World units per screen pixel at ground level."""
+        visible_height = 2 * self.height * math.tan(math.radians(FIELD_OF_VIEW) / 2)
+        return visible_height / self.height_px
+
+    def zoom(self, factor):
+        """Move the camera closer (factor < 1) or further away (factor > 1)."""
+        self.height = min(max(self.height * factor, MIN_HEIGHT), self.max_height)
+
+    def pan(self, dx, dy):
+        """Move the view by (dx, dy) world units."""
+        self.center_x += dx
+        self.center_y += dy
+
+    def reset(self):
+        self.center_x, self.center_y, self.height = self.home
+
+    def handle_event(self, event):
+        """Update the view from a pygame event; returns True if the event was used."""
+        if event.type == pygame.MOUSEWHEEL:
+            self.zoom(ZOOM_STEP ** -event.y)
+        elif event.type == pygame.MOUSEMOTION and event.buttons[0]:
+            scale = self.units_per_pixel()
+            self.pan(-event.rel[0] * scale, event.rel[1] * scale)  # Screen y points down
+        elif event.type == pygame.KEYDOWN:
+            step = PAN_STEP * self.units_per_pixel() * self.height_px
+            if event.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+                self.zoom(1 / ZOOM_STEP)
+            elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                self.zoom(ZOOM_STEP)
+            elif event.key == pygame.K_LEFT:
+                self.pan(-step, 0)
+            elif event.key == pygame.K_RIGHT:
+                self.pan(step, 0)
+            elif event.key == pygame.K_UP:
+                self.pan(0, step)
+            elif event.key == pygame.K_DOWN:
+                self.pan(0, -step)
+            elif event.key == pygame.K_HOME:
+                self.reset()
+            else:
+                return False
+        else:
+            return False
+        return True
@@ -0,0 +1,294 @@
+# checkpoint.py
+"""Binary checkpoints of a headless run, written in the background and memory-mapped on resume.
+
+A checkpoint file is MAGIC, the length of a JSON header, the header (scalar state and a
+table of arrays) and then every array's raw bytes at a 64-byte aligned offset, so each array
+can be mapped straight from the file without parsing or copying it.
+"""
+import copy
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+
+import numpy as np
+
+from agent import Agent
+from city import CityLayout
+from compartments import CompartmentCounter, COMPARTMENTS
+from engine import create_agents
+from events import EventScheduler, EVENT_KINDS, RESOLVE
+from population import Population, DIRECTION_NAMES
+from rng import SimulationRNG
+from sim_clock import SimulationClock
+
+MAGIC = b"EPICKPT1"
+ALIGN = 64
+AGENT_STATES = (Agent.HEALTHY, Agent.INFECTED, Agent.REMOVED)
+
+
+def write_checkpoint(path, meta, arrays):
+    """Write meta (JSON-serializable dict) and arrays (name -> ndarray) to path atomically.
+
+    The file is written next to path and renamed over it, so a crash mid-write leaves the
+    previous checkpoint intact.
+    """
+    table = {}
+    offset = 0
+    for name, array in arrays.items():
+        table[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += -(-array.nbytes // ALIGN) * ALIGN
+    header = json.dumps({"meta": meta, "arrays": table}).encode()
+    data_start = -(-(len(MAGIC) + 8 + len(header)) // ALIGN) * ALIGN
+
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.write(MAGIC + struct.pack("<Q", len(header)) + header)
+        for name, array in arrays.items():
+            file.seek(data_start + table[name]["offset"])
+            file.write(np.ascontiguousarray(array).tobytes())
+        file.truncate(data_start + offset)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+
+def read_checkpoint(path):
+    """Map a checkpoint file; returns (meta, arrays).
+
+    The arrays are copy-on-write views of the file: pages are read on first access, and
+    writing to an array never changes the file.
+    """
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a simulation checkpoint")
+        header_length, = struct.unpack("<Q", file.read(8))
+        header = json.loads(file.read(header_length))
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+    data_start = -(-(len(MAGIC) + 8 + header_length) // ALIGN) * ALIGN
+    arrays = {}
+    for name, entry in header["arrays"].items():
+        dtype = np.dtype(entry["dtype"])
+        count = math.prod(entry["shape"])
+        arrays[name] = np.frombuffer(data, dtype, count, data_start + entry["offset"]).reshape(entry["shape"])
+    return header["meta"], arrays
+
+
+class CheckpointWriter:
+    """Writes checkpoints on a background thread so the simulation never waits for the disk.
+
+    Only the newest submitted checkpoint is kept waiting: if the disk falls behind, the
+    older pending one is dropped instead of stalling the loop.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.pending = None
+        self.error = None
+        self.written = 0
+        self.closed = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, meta, arrays):
+        """Queue a checkpoint; the arrays must not be modified afterwards (pass copies)."""
+        with self.condition:
+            if self.error is not None:
+                raise self.error
+            self.pending = (meta, arrays)
+            self.condition.notify()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closed:
+                    self.condition.wait()
+                if self.pending is None:
+                    return
+                meta, arrays = self.pending
+                self.pending = None
+            try:
+                write_checkpoint(self.path, meta, arrays)
+                self.written += 1
+            except Exception as exc:
+                with self.condition:
+                    self.error = exc
+
+    def close(self):
+        """Finish the pending write and stop the thread; re-raises a failed write."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+
+def _rng_state(rng, arrays):
+    """Split a SimulationRNG state into JSON metadata and arrays."""
+    seed, (version, internal, gauss_next) = rng.getstate()
+    arrays["rng_internal"] = np.array(internal, dtype=np.uint32)
+    return {"seed": seed, "version": version, "gauss_next": gauss_next}
+
+
+def _restore_rng(meta, arrays):
+    rng = SimulationRNG(meta["seed"])
+    internal = tuple(int(word) for word in arrays["rng_internal"])
+    rng.setstate((meta["seed"], (meta["version"], internal, meta["gauss_next"])))
+    return rng
+
+
+def _agent_arrays(agents, arrays):
+    """Store the per-agent state of a list of Agent objects as columns."""
+    def column(name, dtype=np.float64, missing=math.nan):
+        return np.array([missing if getattr(agent, name) is None else getattr(agent, name) for agent in agents],
+                        dtype=dtype)
+
+    for name in ("x", "y", "steps_remaining", "infection_start_time", "deceased_start_time", "arc_progress"):
+        arrays[name] = column(name)
+    for name in ("arc_start", "arc_mid", "arc_end", "color"):
+        arrays[name] = np.array([getattr(agent, name) for agent in agents], dtype=np.float64).reshape(len(agents), -1)
+    for name in ("in_quarantine", "moving_to_quarantine", "moving_to_graveyard", "quarantine_due"):
+        arrays[name] = column(name, bool)
+    arrays["in_graveyard"] = column("in_graveyard", np.int8, -1)  # None until the first arrival
+    arrays["grave_added"] = np.array([getattr(agent, "grave_added", False) for agent in agents], dtype=bool)
+    arrays["has_grave_position"] = np.array([hasattr(agent, "grave_position") for agent in agents], dtype=bool)
+    arrays["grave_position"] = np.array([getattr(agent, "grave_position", (0, 0)) for agent in agents],
+                                        dtype=np.float64).reshape(len(agents), 2)
+    arrays["direction"] = np.array([DIRECTION_NAMES.index(agent.direction) for agent in agents], dtype=np.int8)
+    arrays["state"] = np.array([AGENT_STATES.index(agent.state) for agent in agents], dtype=np.int8)
+    arrays["compartment"] = np.array([COMPARTMENTS.index(agent.compartment) for agent in agents], dtype=np.int8)
+
+
+def _restore_agents(agents, arrays):
+    for i, agent in enumerate(agents):
+        for name in ("x", "y", "steps_remaining", "arc_progress"):
+            setattr(agent, name, float(arrays[name][i]))
+        for name in ("infection_start_time", "deceased_start_time"):
+            value = float(arrays[name][i])
+            setattr(agent, name, None if math.isnan(value) else value)
+        for name in ("arc_start", "arc_mid", "arc_end", "color"):
+            setattr(agent, name, tuple(float(value) for value in arrays[name][i]))
+        for name in ("in_quarantine", "moving_to_quarantine", "moving_to_graveyard", "quarantine_due"):
+            setattr(agent, name, bool(arrays[name][i]))
+        in_graveyard = int(arrays["in_graveyard"][i])
+        agent.in_graveyard = None if in_graveyard < 0 else bool(in_graveyard)
+        if arrays["grave_added"][i]:
+            agent.grave_added = True
+        if arrays["has_grave_position"][i]:
+            agent.grave_position = tuple(float(value) for value in arrays["grave_position"][i])
+        agent.direction = DIRECTION_NAMES[arrays["direction"][i]]
+        agent.state = AGENT_STATES[arrays["state"][i]]
+        agent.compartment = COMPARTMENTS[arrays["compartment"][i]]
+
+
+def _event_arrays(scheduler, agents, arrays):
+    """Store the pending events of an EventScheduler, with agents as list indices."""
+    index = {id(agent): i for i, agent in enumerate(agents)}
+    queue = scheduler.pending()
+    arrays["event_time"] = np.array([event[0] for event in queue], dtype=np.float64)
+    arrays["event_sequence"] = np.array([event[1] for event in queue], dtype=np.int64)
+    arrays["event_kind"] = np.array([EVENT_KINDS.index(event[2]) for event in queue], dtype=np.int8)
+    arrays["event_agent"] = np.array([index[id(event[3])] for event in queue], dtype=np.int64)
+    arrays["event_payload"] = np.array([bool(event[4]) for event in queue], dtype=bool)
+    return scheduler.sequence
+
+
+def _restore_events(scheduler, agents, sequence, arrays):
+    scheduler.clear()
+    for time, order, kind, agent, payload in zip(arrays["event_time"].tolist(), arrays["event_sequence"].tolist(),
+                                                 arrays["event_kind"].tolist(), arrays["event_agent"].tolist(),
+                                                 arrays["event_payload"].tolist()):
+        kind = EVENT_KINDS[kind]
+        # Only the outcome of a resolution carries a payload
+        scheduler.queue.append((time, order, kind, agents[agent], payload if kind == RESOLVE else None))
+    scheduler.queue.sort(key=lambda event: event[:2])  # A sorted list is a valid heap
+    scheduler.sequence = sequence
+
+
+def snapshot(params, clock, rng, city_map, counter, agents=None, population=None, options=None, scheduler=None):
+    """Capture the state of a headless run as (meta, arrays) for write_checkpoint.
+
+    Pass either the Agent list (with the run's EventScheduler, if any) or the Population
+    of the run. The arrays and metadata are copies, so the run can continue while they are
+    written. options are stored as they are (e.g. the run_headless arguments needed to
+    continue it).
+    """
+    arrays = {
+        "building_heights": np.array(city_map.building_heights, dtype=np.float64),
+        "graves": np.array(city_map.graves.coords, dtype=np.float64).reshape(-1, 2),
+    }
+    meta = {
+        "params": list(params),
+        "ticks": clock.ticks,
+        "dt": clock.dt,
+        "layout": [city_map.city_size, city_map.building_size, city_map.road_width, city_map.building_height],
+        "counts": dict(counter.counts),  # The run keeps counting while the writer thread works
+        "rng": _rng_state(rng, arrays),
+        "options": copy.deepcopy(options or {}),
+    }
+    if population is not None:
+        meta["engine"] = "population"
+        meta["num_agents"] = population.num_agents
+        meta["population_rng"] = population.rng.bit_generator.state
+        for name in Population.STATE_ARRAYS:
+            arrays[name] = getattr(population, name).copy()
+    else:
+        meta["engine"] = "agents"
+        meta["num_agents"] = len(agents)
+        _agent_arrays(agents, arrays)
+        if scheduler is not None:
+            meta["event_sequence"] = _event_arrays(scheduler, agents, arrays)
+    return meta, arrays
+
+
+def restore(path):
+    """Rebuild a run from a checkpoint file.
+
+    Returns a dict with the run's params, clock, rng, city_map, counter and either agents
+    (Agent list, plus their scheduler if the run had one) or population, plus the stored meta.
+    """
+    meta, arrays = read_checkpoint(path)
+    params = tuple(meta["params"])
+    clock = SimulationClock(meta["dt"])
+    clock.ticks = meta["ticks"]
+    rng = SimulationRNG(meta["rng"]["seed"])  # Placeholder stream while the objects are rebuilt
+    city_map = CityLayout(*meta["layout"], rng)
+    city_map.building_heights = arrays["building_heights"].tolist()
+    city_map.graves.resize(len(arrays["graves"]))  # Grave positions follow from their order
+    counter = CompartmentCounter()
+    run = {"meta": meta, "params": params, "clock": clock, "city_map": city_map, "counter": counter}
+
+    if meta["engine"] == "population":
+        population = Population.from_params(params, city_map, meta["num_agents"], clock=clock)
+        for name in Population.STATE_ARRAYS:
+            setattr(population, name, arrays[name])  # Copy-on-write views of the file
+        population.rebuild_events()
+        population.rng.bit_generator.state = meta["population_rng"]
+        population.counter = counter
+        run["population"] = population
+    else:
+        scheduler = EventScheduler(clock) if "event_sequence" in meta else None
+        agents = create_agents(params, city_map, clock, meta["num_agents"], rng, scheduler=scheduler)
+        _restore_agents(agents, arrays)
+        for agent in agents:
+            agent.counter = counter
+        if scheduler is not None:
+            _restore_events(scheduler, agents, meta["event_sequence"], arrays)
+            run["scheduler"] = scheduler
+        run["agents"] = agents
+
+    counter.counts.update(meta["counts"])
+    # The rebuild above drew from the placeholder stream; continue the saved one instead
+    rng.setstate(_restore_rng(meta["rng"], arrays).getstate())
+    run["rng"] = rng
+    return run
@@ -0,0 +1,149 @@
+# city.py
+import math
+import random
+from array import array
+
+
+class RoadIndex:
+    """Constant-time test for whether a point lies on the road network.
+
+    Roads repeat every building_size + road_width units, so the only road band that can
+    contain a coordinate is found by division instead of scanning every row and column.
+    """
+
+    def __init__(self, city_size, building_size, road_width, buffer=0.05):
+        self.city_size = city_size
+        self.road_width = road_width
+        self.buffer = buffer
+        self.cell_size = building_size + road_width
+        self.extent = city_size * self.cell_size
+        # Lower edge of each interior road, shared by the horizontal and vertical roads
+        self.road_starts = [(i + 1) * self.cell_size - road_width for i in range(city_size)]
+
+    def _in_band(self, v):
+        """Whether coordinate v falls inside one of the interior roads (minus the buffer)."""
+        i = math.floor((v + self.road_width - self.buffer) / self.cell_size) - 1
+        # Also check the neighbouring bands so floating-point rounding can't miss a match
+        for k in (i - 1, i, i + 1):
+            if 0 <= k < self.city_size:
+                start = self.road_starts[k]
+                if start + self.buffer <= v <= start + self.road_width - self.buffer:
+                    return True
+        return False
+
+    def contains(self, x, y):
+        """Return True if (x, y) is on a road."""
+        buffer = self.buffer
+        if buffer <= x <= self.extent - buffer:
+            # Horizontal roads, including the bottom boundary road
+            if -self.road_width <= y <= buffer or self._in_band(y):
+                return True
+        if buffer <= y <= self.extent - buffer:
+            # Vertical roads, including the left boundary road
+            if -self.road_width <= x <= buffer or self._in_band(x):
+                return True
+        return False
+
+    def area(self):
+        """Total area of the points for which contains() is True."""
+        length = self.extent - 2 * self.buffer
+        band_width = self.road_width - 2 * self.buffer
+        # Per direction: the interior roads plus the boundary road, minus the crossings counted twice
+        bands = self.city_size * band_width + self.road_width + self.buffer
+        return 2 * bands * length - (self.city_size * band_width) ** 2
+
+    def contains_array(self, x, y):
+        """Vectorized contains() for NumPy arrays of coordinates."""
+        import numpy as np  # Only the vectorized population engine needs NumPy
+        buffer = self.buffer
+        x_inside = (buffer <= x) & (x <= self.extent - buffer)
+        y_inside = (buffer <= y) & (y <= self.extent - buffer)
+        on_bottom = (-self.road_width <= y) & (y <= buffer)
+        on_left = (-self.road_width <= x) & (x <= buffer)
+        return (x_inside & (on_bottom | self._in_band_array(np, y))) | (y_inside & (on_left | self._in_band_array(np, x)))
+
+    def _in_band_array(self, np, v):
+        band = np.floor((v + self.road_width - self.buffer) / self.cell_size)
+        result = np.zeros(np.shape(v), dtype=bool)
+        # Same neighbouring-band check and comparisons as _in_band, so both agree exactly
+        for k in (band - 1, band, band + 1):
+            start = k * self.cell_size - self.road_width
+            result |= ((k >= 1) & (k <= self.city_size)
+                       & (start + self.buffer <= v) & (v <= start + self.road_width - self.buffer))
+        return result
+
+class Graves:
+    """Grave positions in the graveyard, kept as a flat float32 array of x, y pairs.
+
+    Graves are laid out in rows of `columns`, in the order they are added, so the position
+    of the next one follows from how many there are and adding one takes constant time.
+    The array can be handed to OpenGL or NumPy as it is (see Map.draw_graves).
+    """
+
+    def __init__(self, start_x, start_y, columns=4, spacing=0.5):
+        self.start_x = start_x
+        self.start_y = start_y
+        self.columns = columns
+        self.spacing = spacing
+        self.coords = array("f")
+
+    def position(self, index):
+        """Lower-left corner of grave number index."""
+        row, column = divmod(index, self.columns)
+        return self.start_x + column * self.spacing, self.start_y + row * self.spacing
+
+    def add(self):
+        self.coords.extend(self.position(len(self)))
+
+    def resize(self, count):
+        """Keep the first count graves, adding graves up to count if there are fewer."""
+        del self.coords[2 * count:]
+        for index in range(len(self), count):
+            self.coords.extend(self.position(index))
+
+    def __len__(self):
+        return len(self.coords) // 2
+
+    def __iter__(self):
+        coords = self.coords
+        return zip(coords[0::2], coords[1::2])
+
+
+class CityLayout:
+    """Geometry of the city (grid, graveyard, building heights) without any rendering state."""
+
+    def __init__(self, city_size, building_size, road_width, building_height, rng=None):
+        self.city_size = city_size
+        self.building_size = building_size
+        self.road_width = road_width
+        self.building_height = building_height
+        self.rng = rng if rng is not None else random
+        self.graveyard_width, self.graveyard_height = 2, 2  # Define size
+        self.graveyard_start_x = -self.city_size - self.graveyard_width
+        self.graveyard_start_y = 4
+        # Precompute heights for all building clusters in the grid
+        self.building_heights = self.generate_building_heights()
+        self.graves = Graves(self.graveyard_start_x, self.graveyard_start_y)
+        # Shared by all agents for their on-road checks
+        self.road_index = RoadIndex(city_size, building_size, road_width)
+
+    def generate_building_heights(self):
+        """Generates fixed heights for each cluster of buildings in the grid."""
+        heights = []
+        for _ in range(self.city_size):
+            row_heights = []
+            for _ in range(self.city_size):
+                # Generate heights for the four buildings in the cell
+                cell_heights = [
+                    self.rng.uniform(self.building_height * 0.3, self.building_height * 1.1),
+                    self.rng.uniform(self.building_height * 0.4, self.building_height * 2),
+                    self.rng.uniform(self.building_height * 0.7, self.building_height * 2),
+                    self.rng.uniform(self.building_height * 0.5, self.building_height * 1.1)
+                ]
+                row_heights.append(cell_heights)
+            heights.append(row_heights)
+        return heights
+
+    def add_grave(self):
+        """Add a grave for a deceased agent in an orderly grid layout."""
+        self.graves.add()
@@ -0,0 +1,52 @@
+# compartments.py
+"""Live S/I/R/D totals, updated at the moment agents change compartment."""
+
+HEALTHY = "healthy"
+INFECTED = "infected"
+RECOVERED = "recovered"
+DECEASED = "deceased"
+COMPARTMENTS = (HEALTHY, INFECTED, RECOVERED, DECEASED)
+
+
+class CompartmentCounter:
+    """Authoritative compartment totals for one run, with transition listeners.
+
+    Agents (or the NumPy population, in bulk) report each transition here, so reading
+    the totals is O(1). Listeners are called as listener(old, new, count, time) after
+    the totals have been updated.
+    """
+
+    def __init__(self):
+        self.counts = dict.fromkeys(COMPARTMENTS, 0)
+        self.listeners = []
+
+    def subscribe(self, listener):
+        """Call listener(old, new, count, time) on every transition; returns the listener."""
+        self.listeners.append(listener)
+        return listener
+
+    def unsubscribe(self, listener):
+        self.listeners.remove(listener)
+
+    def add(self, compartment, count=1):
+        """Register agents entering the population in the given compartment."""
+        self.counts[compartment] += count
+
+    def transition(self, old, new, count=1, time=None):
+        """Move count agents from compartment old to compartment new."""
+        self.counts[old] -= count
+        self.counts[new] += count
+        for listener in self.listeners:
+            listener(old, new, count, time)
+
+    def __getitem__(self, compartment):
+        return self.counts[compartment]
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def totals(self):
+        """Return the (infected, healthy, recovered, deceased) counts, as run_simulation does."""
+        counts = self.counts
+        return counts[INFECTED], counts[HEALTHY], counts[RECOVERED], counts[DECEASED]
@@ -0,0 +1,423 @@
+# domains.py
+"""One large city on several cores: the vectorized engine split into spatial domains.
+
+The map is cut into one rectangular tile per worker process. Each worker owns the agents
+standing on its tile and advances them with the Population code. Agent state lives in
+shared memory, so nothing is pickled per tick:
+
+1. Every worker resolves its due infections and moves its agents. Agents that walked
+   onto another tile are written back to the shared arrays and their indices posted in
+   the worker's outbox.
+2. (Barrier.) Every worker adopts the agents posted for its tile, then posts the indices
+   of its infected agents within the infection radius of its tile's edges (its halo).
+3. (Barrier.) Every worker spreads the infection to its healthy agents from its own
+   infected agents plus the halo agents of the others in range.
+4. (Barrier with the main process, which records the counts and the graves dug.)
+
+Outboxes and halos are sized to the worker's own agents, not the whole population, and
+a worker that outgrows one moves it to a larger block (see _Mailbox).
+
+Each worker draws from its own random stream, so a run is reproducible for a given seed
+and number of workers and matches the single-process engine statistically, not agent
+for agent.
+"""
+import argparse
+import math
+import multiprocessing
+import threading
+import time
+import traceback
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from city import CityLayout
+from compartments import CompartmentCounter, COMPARTMENTS, INFECTED as INFECTED_COMPARTMENT
+from engine import CITY_SIZE, BUILDING_SIZE, ROAD_WIDTH, BUILDING_HEIGHT, NUM_AGENTS, TICK_DT, PARAM_SETS
+from population import Population, INFECTED
+from rng import SimulationRNG
+from sim_clock import SimulationClock
+from sweep import available_cores
+from timeseries import TimeSeriesWriter
+
+
+class SharedArrays:
+    """Named NumPy arrays in one shared memory block, attachable from other processes."""
+
+    def __init__(self, specs, name=None):
+        self.specs = specs  # name -> (dtype string, shape)
+        offsets = {}
+        size = 0
+        for key, (dtype, shape) in specs.items():
+            offsets[key] = size
+            size += -(-np.dtype(dtype).itemsize * math.prod(shape) // 64) * 64
+        self.owner = name is None
+        self.memory = shared_memory.SharedMemory(name=name, create=self.owner, size=max(size, 1))
+        self.arrays = {key: np.ndarray(shape, dtype, self.memory.buf, offsets[key])
+                       for key, (dtype, shape) in specs.items()}
+
+    def __getitem__(self, key):
+        return self.arrays[key]
+
+    def __reduce__(self):
+        # Other processes attach to the same block instead of receiving a copy
+        return SharedArrays, (self.specs, self.memory.name)
+
+    def close(self):
+        """Detach this process from the block."""
+        self.arrays = {}
+        self.memory.close()
+
+    def unlink(self):
+        """Free the block once every process has closed it (the creating process only)."""
+        if self.owner:
+            self.memory.unlink()
+
+
+# Mailbox kinds
+OUTBOX, HALO = 0, 1
+MAILBOX_SLACK = 0.25  # Spare room, as a fraction of the tile's agents, before a mailbox must grow
+MAILBOX_MIN = 64
+
+
+class _Mailbox:
+    """Agent indices that one worker posts for the others, in a shared block of its own.
+
+    The block holds up to `capacity` indices, sized to the worker's agents plus some slack.
+    When the worker needs more it moves to a larger block and publishes the new block's
+    name in the run's shared table, where the other workers find it the next time they
+    read. A mailbox is only replaced in the phase before the one its contents are read in.
+    """
+
+    def __init__(self, kind, index, shared, dtype):
+        self.kind = kind
+        self.index = index
+        self.shared = shared
+        self.dtype = dtype
+        self.block = None
+        self.capacity = 0
+
+    def post(self, indices, bound):
+        """Publish indices; bound is the most the worker could post, for sizing a new block."""
+        if self.block is None or indices.size > self.capacity:
+            self.close()
+            self.capacity = max(int(bound * (1 + MAILBOX_SLACK)) + MAILBOX_MIN, indices.size)
+            self.block = SharedArrays({"indices": (self.dtype, (self.capacity,))})
+            self.shared["mailbox_names"][self.kind, self.index] = self.block.memory.name.encode()
+            self.shared["mailbox_capacity"][self.kind, self.index] = self.capacity
+        self.block["indices"][:indices.size] = indices
+        self.shared["mailbox_count"][self.kind, self.index] = indices.size
+
+    def close(self):
+        if self.block is not None:
+            self.block.close()
+            self.block.unlink()
+            self.block = None
+
+
+class _MailboxReader:
+    """The mailboxes of the other workers, attached as they are (re)published."""
+
+    def __init__(self, shared, dtype):
+        self.shared = shared
+        self.dtype = dtype
+        self.attached = {}  # (kind, worker) -> (name, SharedArrays)
+
+    def read(self, kind, worker):
+        name = bytes(self.shared["mailbox_names"][kind, worker])
+        count = self.shared["mailbox_count"][kind, worker]
+        if not count:
+            return np.empty(0, dtype=self.dtype)
+        cached = self.attached.get((kind, worker))
+        if cached is None or cached[0] != name:
+            if cached is not None:
+                cached[1].close()
+            capacity = int(self.shared["mailbox_capacity"][kind, worker])
+            cached = self.attached[kind, worker] = (name, SharedArrays({"indices": (self.dtype, (capacity,))},
+                                                                      name.decode()))
+        return cached[1]["indices"][:count]
+
+    def close(self):
+        for _, block in self.attached.values():
+            block.close()
+        self.attached = {}
+
+
+def index_type(num_agents):
+    """Smallest integer type for the agent indices posted in mailboxes."""
+    return np.int32 if num_agents < 2 ** 31 else np.int64
+
+
+def tile_grid(workers):
+    """(columns, rows) of the most nearly square grid of `workers` tiles."""
+    rows = max(r for r in range(1, int(math.isqrt(workers)) + 1) if workers % r == 0)
+    return workers // rows, rows
+
+
+def tile_bounds(x, y, workers):
+    """Interior tile edges along x and y that split the agents at (x, y) into equal shares.
+
+    Agents gather towards the center of the map, so equal-count tiles keep the workers
+    evenly loaded where equal-area tiles would not.
+    """
+    columns, rows = tile_grid(workers)
+    x_edges = np.quantile(x, np.arange(1, columns) / columns) if columns > 1 else np.empty(0)
+    y_edges = np.quantile(y, np.arange(1, rows) / rows) if rows > 1 else np.empty(0)
+    return x_edges, y_edges
+
+
+def tile_of(x, y, x_edges, y_edges):
+    """Tile index of every position; tiles on the border extend to infinity."""
+    return np.searchsorted(x_edges, x, side="right") * (len(y_edges) + 1) + np.searchsorted(y_edges, y, side="right")
+
+
+def tile_box(tile, x_edges, y_edges):
+    """(x0, y0, x1, y1) of a tile."""
+    column, row = divmod(tile, len(y_edges) + 1)
+    x = np.concatenate([[-np.inf], x_edges, [np.inf]])
+    y = np.concatenate([[-np.inf], y_edges, [np.inf]])
+    return x[column], y[row], x[column + 1], y[row + 1]
+
+
+class _Domain:
+    """The agents of one tile, in one worker process."""
+
+    def __init__(self, index, template, shared, owned, x_edges, y_edges, workers):
+        self.index = index
+        self.shared = shared
+        self.workers = workers
+        self.x_edges, self.y_edges = x_edges, y_edges
+        self.box = tile_box(index, x_edges, y_edges)
+        self.owned = owned
+        dtype = index_type(len(shared["x"]))
+        self.outbox = _Mailbox(OUTBOX, index, shared, dtype)
+        self.halo = _Mailbox(HALO, index, shared, dtype)
+        self.mailboxes = _MailboxReader(shared, dtype)
+        self.local = template.take(np.empty(0, dtype=np.int64))
+        self.local = self._gather(owned)
+
+    def _gather(self, idx):
+        """Population of the agents at shared indices idx."""
+        subset = self.local.take(np.empty(0, dtype=np.int64))  # Keeps the settings, stream and clock
+        for name in Population.STATE_ARRAYS:
+            setattr(subset, name, self.shared[name][idx])
+        subset.num_agents = len(idx)
+        subset.rebuild_events()
+        return subset
+
+    def _scatter(self, rows, idx, names=Population.STATE_ARRAYS):
+        for name in names:
+            self.shared[name][idx] = getattr(self.local, name)[rows]
+
+    def move(self, now):
+        """Phase 1: resolve due infections and move, then hand the agents that left the tile
+        to the shared arrays."""
+        self.local.run_due(now)
+        self.local.move(now)
+        leaving = tile_of(self.local.x, self.local.y, self.x_edges, self.y_edges) != self.index
+        rows = np.flatnonzero(leaving)
+        self._scatter(rows, self.owned[rows])
+        self.outbox.post(self.owned[rows], len(self.owned))
+        self.staying = ~leaving
+
+    def exchange(self):
+        """Phase 2: adopt the agents that arrived on the tile and publish the halo."""
+        arrived = []
+        for other in range(self.workers):
+            if other == self.index:
+                continue
+            posted = self.mailboxes.read(OUTBOX, other)
+            if posted.size:
+                arrived.append(posted[tile_of(self.shared["x"][posted], self.shared["y"][posted],
+                                              self.x_edges, self.y_edges) == self.index])
+        arrived = np.concatenate(arrived) if arrived else np.empty(0, dtype=np.int64)
+        kept = self.local.take(self.staying)
+        incoming = self._gather(arrived)
+        for name in Population.STATE_ARRAYS:
+            setattr(kept, name, np.concatenate([getattr(kept, name), getattr(incoming, name)]))
+        kept.num_agents = len(kept.x)
+        kept.rebuild_events()
+        self.local = kept
+        self.owned = np.concatenate([self.owned[self.staying], arrived])
+
+        # Infected agents close enough to the tile's edges to reach agents on other tiles
+        radius = self.local.infection_radius
+        x0, y0, x1, y1 = self.box
+        x, y = self.local.x, self.local.y
+        near_edge = (self.local.state == INFECTED) & ((x - x0 < radius) | (x1 - x < radius)
+                                                      | (y - y0 < radius) | (y1 - y < radius))
+        rows = np.flatnonzero(near_edge)
+        self._scatter(rows, self.owned[rows], ("x", "y"))
+        self.halo.post(self.owned[rows], len(self.owned))
+
+    def infect(self, now):
+        """Phase 3: spread from own and halo infected agents in range (see Population.step)."""
+        radius = self.local.infection_radius
+        x0, y0, x1, y1 = self.box
+        source_x, source_y = [], []
+        for other in range(self.workers):
+            if other == self.index:
+                continue
+            posted = self.mailboxes.read(HALO, other)
+            x, y = self.shared["x"][posted], self.shared["y"][posted]
+            in_range = (x >= x0 - radius) & (x <= x1 + radius) & (y >= y0 - radius) & (y <= y1 + radius)
+            source_x.append(x[in_range])
+            source_y.append(y[in_range])
+        sources = (np.concatenate(source_x), np.concatenate(source_y)) if source_x else None
+        self.local.spread_infection(now, sources)
+        self.local.hold_for_quarantine(now)
+        counts = self.local.counter.counts
+        self.shared["counts"][self.index] = [counts[name] for name in COMPARTMENTS]
+        self.shared["graves"][self.index] = len(self.local.city_map.graves)
+
+    def finish(self):
+        """Write every owned agent back to the shared arrays."""
+        self._scatter(np.arange(len(self.owned)), self.owned)
+
+    def close(self):
+        self.mailboxes.close()
+        self.outbox.close()
+        self.halo.close()
+
+
+def _worker(index, template, seed, shared, owned, x_edges, y_edges, workers, time_limit,
+            phase_barrier, tick_barrier, errors):
+    domain = None
+    try:
+        clock = SimulationClock(template.clock.dt)
+        template.clock = clock
+        template.counter = CompartmentCounter()  # Transitions of this worker, summed by the main process
+        template.rng = np.random.default_rng(seed)
+        domain = _Domain(index, template, shared, owned, x_edges, y_edges, workers)
+        while clock.now() <= time_limit:
+            now = clock.now()
+            domain.move(now)
+            phase_barrier.wait()
+            domain.exchange()
+            phase_barrier.wait()
+            domain.infect(now)
+            tick_barrier.wait()
+            clock.tick()
+        domain.finish()
+        tick_barrier.wait()
+    except threading.BrokenBarrierError:
+        pass  # Another worker failed and reported it
+    except BaseException:
+        errors.put((index, traceback.format_exc()))
+        phase_barrier.abort()
+        tick_barrier.abort()
+    finally:
+        if domain is not None:
+            domain.close()
+        shared.close()
+
+
+def run_domains(params, workers=None, time_limit=20, num_agents=NUM_AGENTS, city_size=CITY_SIZE,
+                building_size=BUILDING_SIZE, road_width=ROAD_WIDTH, building_height=BUILDING_HEIGHT,
+                seed=None, dt=TICK_DT, series_path=None, series_every=1, stats=None):
+    """run_headless(vectorized=True) with the city split over `workers` processes (default: all cores).
+
+    The population starts exactly as in run_headless with the same seed. Returns the same
+    (infected, healthy, recovered, deceased) tuple; stats, if given, is filled with the
+    peak as by run_headless and the number of graves dug.
+    """
+    workers = workers or available_cores()
+    rng = SimulationRNG(seed)
+    city_map = CityLayout(city_size, building_size, road_width, building_height, rng)
+    clock = SimulationClock(dt)
+    counter = CompartmentCounter()
+    population = Population.from_params(params, city_map, num_agents, seed=rng.child_seed("population"),
+                                        clock=clock, counter=counter)
+    initial = dict(counter.counts)
+
+    specs = {name: (getattr(population, name).dtype.str, getattr(population, name).shape)
+             for name in Population.STATE_ARRAYS}
+    specs.update(mailbox_names=("S64", (2, workers)),
+                 mailbox_capacity=(np.int64, (2, workers)), mailbox_count=(np.int64, (2, workers)),
+                 counts=(np.int64, (workers, len(COMPARTMENTS))), graves=(np.int64, (workers,)))
+    shared = SharedArrays(specs)
+    for name in Population.STATE_ARRAYS:
+        shared[name][...] = getattr(population, name)
+    for name in ("mailbox_capacity", "mailbox_count", "counts", "graves"):
+        shared[name][...] = 0
+
+    # What the workers need of the population besides its arrays (no map rendering state,
+    # no Python random stream)
+    template = population.take(np.empty(0, dtype=np.int64))
+    template.city_map = CityLayout(city_size, building_size, road_width, building_height, SimulationRNG(0))
+    template.city_map.rng = None
+    template.counter = None
+
+    x_edges, y_edges = tile_bounds(population.x, population.y, workers)
+    tiles = tile_of(population.x, population.y, x_edges, y_edges)
+    context = multiprocessing.get_context()
+    phase_barrier = context.Barrier(workers)
+    tick_barrier = context.Barrier(workers + 1)
+    errors = context.Queue()
+    processes = [context.Process(target=_worker, name=f"domain-{i}", daemon=True,
+                                 args=(i, template, rng.child_seed(("domain", i)), shared,
+                                       np.flatnonzero(tiles == i), x_edges, y_edges, workers, time_limit,
+                                       phase_barrier, tick_barrier, errors))
+                 for i in range(workers)]
+    for process in processes:
+        process.start()
+
+    peak = {"peak_infected": counter[INFECTED_COMPARTMENT], "peak_time": clock.now()}
+    series = TimeSeriesWriter(series_path, series_every) if series_path else None
+    try:
+        while clock.now() <= time_limit:
+            tick_barrier.wait()
+            totals = shared["counts"].sum(axis=0)
+            counter.counts.update({name: initial[name] + int(total) for name, total in zip(COMPARTMENTS, totals)})
+            city_map.graves.resize(int(shared["graves"].sum()))  # Dug on the workers' copies of the map
+            if counter[INFECTED_COMPARTMENT] > peak["peak_infected"]:
+                peak = {"peak_infected": counter[INFECTED_COMPARTMENT], "peak_time": clock.now()}
+            if series is not None:
+                series.record(clock.ticks, clock.now(), counter)
+            clock.tick()
+        tick_barrier.wait()  # The workers have written their agents back
+        for name in Population.STATE_ARRAYS:
+            getattr(population, name)[...] = shared[name]
+        population.rebuild_events()
+    except threading.BrokenBarrierError:
+        index, error = errors.get(timeout=10)
+        raise RuntimeError(f"Domain worker {index} failed:\n{error}") from None
+    finally:
+        if series is not None:
+            series.close()
+        tick_barrier.abort()
+        for process in processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        shared.close()
+        shared.unlink()
+    if stats is not None:
+        stats.update(peak, graves=len(city_map.graves))
+    return counter.totals()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run one large city on several cores.")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--agents", type=int, default=100000)
+    parser.add_argument("--city-size", type=int, default=100)
+    parser.add_argument("--time-limit", type=float, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--compare", action="store_true", help="Also run the single-process engine and compare")
+    args = parser.parse_args()
+
+    params = PARAM_SETS[0]
+    options = dict(time_limit=args.time_limit, num_agents=args.agents, city_size=args.city_size, seed=args.seed)
+    start = time.perf_counter()
+    counts = run_domains(params, args.workers, **options)
+    print(f"{args.workers or available_cores()} workers: {counts} in {time.perf_counter() - start:.2f} s")
+    if args.compare:
+        from engine import run_headless
+        start = time.perf_counter()
+        counts = run_headless(params, vectorized=True, **options)
+        print(f"single process: {counts} in {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
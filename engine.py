@@ -0,0 +1,266 @@
+# engine.py
+"""Simulation engine shared by the visual run in visual.py and headless batch runs."""
+import os
+
+from agent import Agent
+from city import CityLayout
+from compartments import CompartmentCounter, HEALTHY, INFECTED, RECOVERED, DECEASED
+from events import EventScheduler
+from rng import SimulationRNG
+from sim_clock import SimulationClock
+from spatial import SpatialGrid
+from timeseries import TimeSeriesWriter
+
+# Default map parameters
+CITY_SIZE = 5  # 5x5 grid
+BUILDING_SIZE = 2
+BUILDING_HEIGHT = 1  # Fixed height for all buildings
+ROAD_WIDTH = 1  # Fixed road width
+NUM_AGENTS = 50  # Number of moving agents
+TICK_DT = 1 / 30  # Simulated seconds per tick (one frame of the visual run at 30 FPS)
+
+# Simulation parameters to test
+PARAM_SETS = [
+    (0.8, 1.0, 2, 0.15, 2),   # Very high radius, guaranteed infection, very short duration, moderate mortality, rapid quarantine
+    (0.6, 0.6, 20, 0.5, 8),   # Medium-high radius, moderate probability, long infection, high mortality, late quarantine
+    (0.3, 0.4, 10, 0.2, 7),   # Low radius, low probability, medium infection, moderate mortality, delayed quarantine
+    (0.4, 0.7, 12, 0.1, 5),   # Low radius, high probability, medium infection, low mortality, standard quarantine
+    (0.5, 0.9, 15, 0.25, 4),  # Moderate radius, high probability, long infection, moderate mortality, default quarantine
+    (0.7, 0.95, 1, 1, 2),     # High radius, high probability, instant infection, 100% mortality, fast quarantine
+]
+
+
+def create_agents(params, city_map, clock, num_agents=NUM_AGENTS, rng=None, counter=None, scheduler=None):
+    """Create the population for a run and infect one agent to start the spread.
+
+    With an events.EventScheduler the agents' infection timers are scheduled on it; run
+    its due events every tick (see step).
+    """
+    infection_radius, infection_probability, infection_duration, mortality_rate, quarantine_start_time = params
+    agents = [
+        Agent(city_map.city_size, city_map.building_size, city_map.road_width, city_map,
+              step_size=0.05, infection_radius=infection_radius,
+              infection_probability=infection_probability, infection_duration=infection_duration,
+              mortality_rate=mortality_rate, road_buffer=0.001,
+              quarantine_start_time=quarantine_start_time, clock=clock, rng=rng,
+              counter=counter, scheduler=scheduler)
+        for _ in range(num_agents)
+    ]
+
+    agents[0].become_infected()
+    return agents
+
+
+def move_phase(agents):
+    """Move every agent (or animate it to quarantine/graveyard)."""
+    for agent in agents:
+        agent.move(agents)
+
+
+def create_contact_grid(params):
+    """Spatial index for contact detection, with cells sized to the infection radius."""
+    return SpatialGrid(params[0])
+
+
+def spread_from(agent, grid):
+    """Let one infected agent try to infect the healthy agents near it."""
+    for other_agent in grid.nearby(agent.x, agent.y):
+        if other_agent.state == Agent.HEALTHY:
+            agent.check_infection(other_agent)
+
+
+def hold_for_quarantine(agent, scheduler):
+    """What update_infection_status does for an infected agent each tick.
+
+    With a scheduler its timers are events, so the only per-tick work left is keeping an
+    agent on its way to quarantine inside the quarantine box; without one its timers are
+    polled.
+    """
+    if scheduler is None:
+        agent.update_infection_status()
+    elif agent.moving_to_quarantine:
+        agent.move_in_quarantine()
+
+
+def infection_phase(agents, grid, scheduler=None):
+    """Spread the infection between nearby agents and advance infection timers.
+
+    The grid is rebuilt from the healthy agents after movement, so each infected agent only
+    tests the healthy agents in its own and the neighbouring cells.
+    """
+    grid.rebuild([agent for agent in agents if agent.state == Agent.HEALTHY])
+    for agent in agents:
+        if agent.state == Agent.INFECTED:
+            spread_from(agent, grid)
+            hold_for_quarantine(agent, scheduler)
+
+
+def contact_phase(agents, grid):
+    """The contact half of infection_phase on its own (used to time it separately).
+
+    Together with state_phase it does the same work as infection_phase, but draws the
+    random numbers in a different order, so seeded runs don't match it.
+    """
+    grid.rebuild([agent for agent in agents if agent.state == Agent.HEALTHY])
+    for agent in agents:
+        if agent.state == Agent.INFECTED:
+            spread_from(agent, grid)
+
+
+def state_phase(agents, scheduler=None):
+    """Advance every agent's infection timer, quarantine and outcome."""
+    if scheduler is not None:
+        scheduler.run_due()
+    for agent in agents:
+        if agent.state == Agent.INFECTED:
+            hold_for_quarantine(agent, scheduler)
+
+
+def step(agents, grid, scheduler=None):
+    """Advance the simulation by one tick, starting with the scheduler's due events."""
+    if scheduler is not None:
+        scheduler.run_due()
+    move_phase(agents)
+    infection_phase(agents, grid, scheduler)
+
+
+def count_states(agents):
+    """Return the (infected, healthy, recovered, deceased) counts by scanning the agents.
+
+    Runs keep a CompartmentCounter instead; this is for agent lists without one.
+    """
+    infected = sum(1 for agent in agents if agent.compartment == INFECTED)
+    healthy = sum(1 for agent in agents if agent.compartment == HEALTHY)
+    recovered = sum(1 for agent in agents if agent.compartment == RECOVERED)
+    deceased = sum(1 for agent in agents if agent.compartment == DECEASED)
+    return infected, healthy, recovered, deceased
+
+
+def params_to_dict(params):
+    """Name the entries of a parameter tuple, as stored in the results file."""
+    return {
+        "infection_radius": params[0],
+        "infection_probability": params[1],
+        "infection_duration": params[2],
+        "mortality_rate": params[3],
+        "quarantine_start_time": params[4],
+    }
+
+
+def make_result(params, counts):
+    """Build the JSON result record for one run from its parameters and final counts."""
+    infected, healthy, recovered, deceased = counts
+    return {
+        "parameters": params_to_dict(params),
+        "final_counts": {
+            "infected": infected,
+            "healthy": healthy,
+            "recovered": recovered,
+            "deceased": deceased
+        }
+    }
+
+
+def run_headless(params, time_limit=20, num_agents=NUM_AGENTS, city_size=CITY_SIZE,
+                 building_size=BUILDING_SIZE, road_width=ROAD_WIDTH, building_height=BUILDING_HEIGHT,
+                 vectorized=False, seed=None, dt=TICK_DT, series_path=None, series_every=1,
+                 checkpoint_path=None, checkpoint_every=300, resume=False,
+                 trajectory_path=None, trajectory_every=1, stats=None):
+    """Runs a single simulation without a window, GL context or frame cap.
+
+    time_limit is in simulated seconds, advanced by dt per tick, so the run finishes as
+    fast as the CPU allows. All randomness comes from SimulationRNG(seed), so runs with the
+    same seed are reproducible. With vectorized=True the population is stored as NumPy arrays
+    (population.Population) instead of Agent objects, which is much faster for large
+    populations. If series_path is given, the compartment counts are streamed there every
+    series_every ticks (CSV, or NDJSON for .ndjson/.jsonl paths). Returns the same
+    (infected, healthy, recovered, deceased) tuple as visual.run_simulation.
+
+    If checkpoint_path is given, the full state of the run is saved there every
+    checkpoint_every ticks (see checkpoint.py; requires NumPy), on a background thread.
+    With resume=True an existing checkpoint at that path is loaded and the run continues
+    from it exactly as if it had never stopped, appending to its time series.
+
+    If trajectory_path is given, the agents' positions and colors are recorded there every
+    trajectory_every ticks (see trajectory.py; requires NumPy) for viewing with replay.py.
+
+    If stats is a dict, it is filled with the peak number of agents infected at once
+    ("peak_infected") and the simulated time it was first reached ("peak_time").
+    """
+    population = agents = scheduler = None
+    if resume and checkpoint_path and os.path.exists(checkpoint_path):
+        from checkpoint import restore
+        run = restore(checkpoint_path)
+        if tuple(run["params"]) != tuple(params) or (run["meta"]["engine"] == "population") != vectorized:
+            raise ValueError(f"{checkpoint_path} is a checkpoint of a different run")
+        rng, city_map, clock, counter = run["rng"], run["city_map"], run["clock"], run["counter"]
+        population, agents, scheduler = run.get("population"), run.get("agents"), run.get("scheduler")
+        peak = run["meta"]["options"].get("stats")
+    else:
+        rng = SimulationRNG(seed)
+        city_map = CityLayout(city_size, building_size, road_width, building_height, rng)
+        clock = SimulationClock(dt)
+        counter = CompartmentCounter()
+        peak = None
+        if vectorized:
+            from population import Population  # NumPy is only needed for the vectorized engine
+            population = Population.from_params(params, city_map, num_agents, seed=rng.child_seed("population"),
+                                                clock=clock, counter=counter)
+        else:
+            scheduler = EventScheduler(clock)
+            agents = create_agents(params, city_map, clock, num_agents, rng, counter, scheduler)
+    peak = peak or {"peak_infected": counter[INFECTED], "peak_time": clock.now()}
+
+    def track_peak(old, new, count, time):
+        if counter[INFECTED] > peak["peak_infected"]:
+            peak["peak_infected"] = counter[INFECTED]
+            peak["peak_time"] = time
+    counter.subscribe(track_peak)
+
+    if population is not None:
+        advance = population.step
+    else:
+        grid = create_contact_grid(params)
+        advance = lambda: step(agents, grid, scheduler)
+
+    series = None
+    if series_path:
+        series = TimeSeriesWriter(series_path, series_every, resume_from=clock.ticks if clock.ticks else None)
+    trajectory = None
+    if trajectory_path:
+        from trajectory import TrajectoryRecorder
+        size = population.num_agents if population is not None else len(agents)
+        trajectory = TrajectoryRecorder(trajectory_path, city_map, size, params, clock.dt, trajectory_every,
+                                        resume_from=clock.ticks if clock.ticks else None)
+    checkpoints = None
+    if checkpoint_path:
+        from checkpoint import CheckpointWriter, snapshot
+        checkpoints = CheckpointWriter(checkpoint_path)
+    try:
+        while clock.now() <= time_limit:
+            advance()
+            if series is not None:
+                series.record(clock.ticks, clock.now(), counter)
+            if trajectory is not None:
+                if population is not None:
+                    trajectory.record_population(clock.ticks, clock.now(), counter, city_map, population)
+                else:
+                    trajectory.record_agents(clock.ticks, clock.now(), counter, city_map, agents)
+            clock.tick()
+            if checkpoints is not None and clock.ticks % checkpoint_every == 0:
+                if series is not None:
+                    series.flush()  # Everything before the checkpoint is on disk when it is
+                checkpoints.submit(*snapshot(params, clock, rng, city_map, counter, agents, population,
+                                             options={"stats": dict(peak)}, scheduler=scheduler))
+    finally:
+        if series is not None:
+            series.close()
+        if trajectory is not None:
+            trajectory.close()
+        if checkpoints is not None:
+            checkpoints.close()
+        counter.unsubscribe(track_peak)
+
+    if stats is not None:
+        stats.update(peak)
+    return counter.totals()
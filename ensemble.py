@@ -0,0 +1,222 @@
+# ensemble.py
+"""Adaptive Monte Carlo ensembles: replicate each parameter set until its results are known
+to within a tolerance, spending the runs on the configurations that are still noisy."""
+import argparse
+import json
+import math
+from statistics import NormalDist, fmean, stdev
+
+from engine import PARAM_SETS, params_to_dict
+from rng import SimulationRNG
+from sweep import available_cores, run_jobs
+
+METRICS = ("infected", "healthy", "recovered", "deceased", "peak_infected")
+
+
+def t_quantile(p, df):
+    """Quantile p of Student's t distribution with df degrees of freedom.
+
+    Exact for df <= 4 (closed forms, Newton's method on the closed-form CDF for df = 3);
+    beyond that a Cornish-Fisher expansion around the normal quantile, within 0.1% of the
+    exact value up to 99% confidence.
+    """
+    if df == 1:
+        return math.tan(math.pi * (p - 0.5))
+    if df == 2:
+        return (2 * p - 1) / math.sqrt(2 * p * (1 - p))
+    if df == 4:
+        alpha = 4 * p * (1 - p)
+        q = math.cos(math.acos(math.sqrt(alpha)) / 3) / math.sqrt(alpha)
+        return math.copysign(2 * math.sqrt(q - 1), p - 0.5)
+    z = NormalDist().inv_cdf(p)
+    z2 = z * z
+    t = z * (1
+             + (z2 + 1) / (4 * df)
+             + ((5 * z2 + 16) * z2 + 3) / (96 * df ** 2)
+             + (((3 * z2 + 19) * z2 + 17) * z2 - 15) / (384 * df ** 3)
+             + ((((79 * z2 + 776) * z2 + 1482) * z2 - 1920) * z2 - 945) / (92160 * df ** 4))
+    if df == 3:
+        root3 = math.sqrt(3)
+        for _ in range(4):
+            cdf = 0.5 + (t * root3 / (3 + t * t) + math.atan(t / root3)) / math.pi
+            t -= (cdf - p) / (6 * root3 / (math.pi * (3 + t * t) ** 2))
+    return t
+
+
+def confidence_interval(values, confidence=0.95):
+    """Mean, standard deviation and t confidence interval of the mean of a sample."""
+    n = len(values)
+    mean = fmean(values)
+    std = stdev(values) if n > 1 else math.inf
+    half_width = t_quantile((1 + confidence) / 2, n - 1) * std / math.sqrt(n) if n > 1 else math.inf
+    if std == 0:
+        half_width = 0.0
+    return {"mean": mean, "std": std, "ci_low": mean - half_width, "ci_high": mean + half_width,
+            "half_width": half_width}
+
+
+def run_metrics(result):
+    """The values of METRICS in one run result from sweep.run_one."""
+    return dict(result["final_counts"], peak_infected=result["peak"]["infected"])
+
+
+class Configuration:
+    """The replicates of one parameter set collected so far."""
+
+    def __init__(self, index, params):
+        self.index = index
+        self.params = params
+        self.samples = {metric: [] for metric in METRICS}
+        self.replicates = 0  # Runs started, so replicate numbers (and seeds) keep counting up
+        self.errors = []
+
+    def add(self, result):
+        if "error" in result:
+            self.errors.append(result["error"])
+        else:
+            for metric, value in run_metrics(result).items():
+                self.samples[metric].append(value)
+
+    @property
+    def completed(self):
+        return len(self.samples[METRICS[0]])
+
+    def summary(self, confidence):
+        return {metric: confidence_interval(values, confidence) for metric, values in self.samples.items()}
+
+    def half_width(self, confidence):
+        """Widest confidence interval half-width over all metrics."""
+        if self.completed < 2:
+            return math.inf
+        return max(interval["half_width"] for interval in self.summary(confidence).values())
+
+    def needed(self, tolerance, confidence):
+        """Estimated total replicates for every interval to be within tolerance."""
+        n = self.completed
+        t = t_quantile((1 + confidence) / 2, max(n - 1, 1))
+        std = max(stdev(values) for values in self.samples.values())
+        return math.ceil((t * std / tolerance) ** 2)
+
+    def report(self, tolerance, confidence):
+        report = {"parameters": params_to_dict(self.params), "replicates": self.completed,
+                  "converged": not self.errors and self.half_width(confidence) <= tolerance}
+        if self.completed:
+            report["metrics"] = self.summary(confidence)
+        if self.errors:
+            report["errors"] = self.errors
+        return report
+
+
+def run_ensemble(param_sets, tolerance=2.0, confidence=0.95, min_replicates=5, max_replicates=200,
+                 budget=None, workers=None, seed=None, on_result=None, **run_options):
+    """Replicate every parameter set until the confidence intervals of its final counts and
+    peak infection are at most `tolerance` agents wide on each side.
+
+    Runs go in rounds across a process pool (see sweep.run_jobs). Every set first gets
+    min_replicates runs; after each round, the sets that are not yet within tolerance get
+    as many more as their current spread says they need (at most doubling per round and
+    never past max_replicates), the noisiest first, until they all converge or `budget`
+    runs in total have been made. A set with a failed run is not extended. Replicate r of
+    set i uses the same seed as in run_sweep, so the first replicates match a sweep's.
+
+    on_result is called with every run result as it comes in. Extra keyword arguments are
+    passed to run_headless. Returns one report per parameter set, in order.
+    """
+    if min_replicates < 2:
+        raise ValueError("A confidence interval needs at least 2 replicates")
+    if budget is not None and budget < min_replicates * len(param_sets):
+        raise ValueError(f"A budget of {budget} runs can't give {len(param_sets)} parameter sets "
+                         f"{min_replicates} replicates each")
+    workers = workers or available_cores()
+    root = SimulationRNG(seed)
+    configs = [Configuration(index, params) for index, params in enumerate(param_sets)]
+    remaining = math.inf if budget is None else budget
+    allocation = {config.index: min_replicates for config in configs}
+
+    while allocation:
+        jobs, owners = [], {}
+        for config in configs:
+            for _ in range(allocation.get(config.index, 0)):
+                run_seed = root.child_seed((config.index, config.replicates))
+                jobs.append((config.params, config.replicates, run_seed))
+                owners[run_seed] = config
+                config.replicates += 1
+        remaining -= len(jobs)
+        for result in run_jobs(jobs, workers, run_options):
+            owners[result["seed"]].add(result)
+            if on_result is not None:
+                on_result(result)
+
+        # Widest intervals first, so a tight budget goes where it narrows them the most
+        noisy = [config for config in configs
+                 if not config.errors and config.replicates < max_replicates
+                 and config.half_width(confidence) > tolerance]
+        noisy.sort(key=lambda config: config.half_width(confidence), reverse=True)
+        allocation = {}
+        for config in noisy:
+            extra = config.needed(tolerance, confidence) - config.completed
+            extra = min(max(extra, 1), config.completed, max_replicates - config.replicates,
+                        remaining - sum(allocation.values()))
+            if extra <= 0:
+                break
+            allocation[config.index] = extra
+
+    return [config.report(tolerance, confidence) for config in configs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replicate parameter sets until their results are known "
+                                                 "to within a tolerance.")
+    parser.add_argument("--params", help="JSON file with a list of [radius, probability, duration, mortality, quarantine] sets")
+    parser.add_argument("--tolerance", type=float, default=2.0,
+                        help="Largest accepted confidence interval half-width, in agents")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--min-replicates", type=int, default=5)
+    parser.add_argument("--max-replicates", type=int, default=200, help="Most replicates of any one set")
+    parser.add_argument("--budget", type=int, default=None, help="Most runs in total")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--time-limit", type=float, default=20)
+    parser.add_argument("--agents", type=int, default=None)
+    parser.add_argument("--vectorized", action="store_true")
+    parser.add_argument("--runs", help="Also write every run result here, one JSON line each")
+    parser.add_argument("--output", default="ensemble_results.json")
+    args = parser.parse_args()
+
+    param_sets = PARAM_SETS
+    if args.params:
+        with open(args.params, "r") as file:
+            param_sets = [tuple(params) for params in json.load(file)]
+
+    run_options = {"time_limit": args.time_limit, "vectorized": args.vectorized}
+    if args.agents is not None:
+        run_options["num_agents"] = args.agents
+
+    runs = open(args.runs, "w") if args.runs else None
+
+    def on_result(result):
+        if runs is not None:
+            runs.write(json.dumps(result) + "\n")
+            runs.flush()
+        status = "failed" if "error" in result else "done"
+        print(f"{status}: {result['parameters']} replicate {result['replicate']}")
+
+    try:
+        reports = run_ensemble(param_sets, args.tolerance, args.confidence, args.min_replicates,
+                               args.max_replicates, args.budget, args.workers, args.seed, on_result,
+                               **run_options)
+    finally:
+        if runs is not None:
+            runs.close()
+
+    with open(args.output, "w") as file:
+        json.dump(reports, file, indent=4)
+    for report in reports:
+        status = "converged" if report["converged"] else "not converged"
+        ranges = ", ".join(f"{metric} {interval['mean']:.1f} ± {interval['half_width']:.1f}"
+                           for metric, interval in report.get("metrics", {}).items())
+        print(f"{report['parameters']}: {report['replicates']} replicates, {status}; {ranges}")
+
+
+if __name__ == "__main__":
+    main()
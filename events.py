@@ -0,0 +1,65 @@
+# events.py
+"""Priority-queue scheduler for the infection timers of Agent objects."""
+import heapq
+
+# Event kinds, handled by Agent.handle_event
+QUARANTINE = "quarantine"  # Infected long enough to be sent to quarantine
+RESOLVE = "resolve"  # Infection over; the payload says whether the agent dies
+GRAVEYARD = "graveyard"  # Deceased long enough to be carried to the graveyard
+EVENT_KINDS = (QUARANTINE, RESOLVE, GRAVEYARD)
+
+
+class EventScheduler:
+    """Agent events ordered by due time.
+
+    Agents schedule their quarantine, recovery or death and graveyard transfer when they
+    are infected, so each tick only pops the events that are due instead of checking the
+    timers of every agent. Events due at the same time run in the order they were scheduled.
+    Cancelled events stay in the queue and are dropped when they come up.
+    """
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.queue = []  # (time, sequence, kind, agent, payload)
+        self.sequence = 0
+        self.cancelled = set()  # Sequence numbers of cancelled events still in the queue
+
+    def schedule(self, time, kind, agent, payload=None):
+        """Call agent.handle_event(kind, time, payload) once the clock reaches time.
+
+        Returns the event's sequence number, for cancel().
+        """
+        sequence = self.sequence
+        heapq.heappush(self.queue, (time, sequence, kind, agent, payload))
+        self.sequence += 1
+        return sequence
+
+    def cancel(self, sequence):
+        """Drop a pending event, given the number schedule() returned for it."""
+        self.cancelled.add(sequence)
+
+    def run_due(self, now=None):
+        """Handle every event due at or before now (default: the clock's time); returns how many."""
+        now = self.clock.now() if now is None else now
+        queue = self.queue
+        handled = 0
+        cancelled = self.cancelled
+        while queue and queue[0][0] <= now:
+            time, sequence, kind, agent, payload = heapq.heappop(queue)
+            if cancelled and sequence in cancelled:
+                cancelled.remove(sequence)
+                continue
+            agent.handle_event(kind, time, payload)
+            handled += 1
+        return handled
+
+    def pending(self):
+        """The events still to run, in the order they will run."""
+        return [event for event in sorted(self.queue) if event[1] not in self.cancelled]
+
+    def clear(self):
+        self.queue.clear()
+        self.cancelled.clear()
+
+    def __len__(self):
+        return len(self.queue) - len(self.cancelled)
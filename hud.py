@@ -0,0 +1,176 @@
+# hud.py
+import numpy as np
+import pygame
+from OpenGL.GL import *
+from OpenGL.GLU import *
+
+FIRST_CHAR, LAST_CHAR = 32, 126  # Printable ASCII
+MAX_CACHED_STRINGS = 256
+
+
+class GlyphAtlas:
+    """Every printable ASCII glyph of one font size, rendered once into a single texture.
+
+    Glyphs are rendered in white so one atlas serves any text color (tinted with glColor).
+    """
+
+    def __init__(self, font_path, font_size):
+        font = pygame.font.Font(font_path, font_size)
+        surfaces = [font.render(chr(code), True, (255, 255, 255)) for code in range(FIRST_CHAR, LAST_CHAR + 1)]
+        self.height = max(surface.get_height() for surface in surfaces)
+        atlas_width = sum(surface.get_width() + 1 for surface in surfaces)  # 1px gap avoids bleeding
+
+        atlas = pygame.Surface((atlas_width, self.height), pygame.SRCALPHA)
+        atlas.fill((255, 255, 255, 0))
+        self.glyphs = {}  # char -> (u0, u1, width, advance)
+        x = 0
+        for code, surface in zip(range(FIRST_CHAR, LAST_CHAR + 1), surfaces):
+            atlas.blit(surface, (x, 0))
+            advance = font.metrics(chr(code))[0][4]
+            self.glyphs[chr(code)] = (x / atlas_width, (x + surface.get_width()) / atlas_width, surface.get_width(), advance)
+            x += surface.get_width() + 1
+
+        texture_data = pygame.image.tostring(atlas, "RGBA", True)
+        self.texture_id = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, self.texture_id)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, atlas_width, self.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, texture_data)
+
+    def layout(self, text):
+        """Build the vertex and texture-coordinate arrays for text, with its top-left corner at the origin."""
+        vertices = []
+        tex_coords = []
+        x = 0
+        for char in text:
+            u0, u1, glyph_width, advance = self.glyphs.get(char, self.glyphs["?"])
+            vertices += [(x, -self.height), (x + glyph_width, -self.height), (x + glyph_width, 0), (x, 0)]
+            tex_coords += [(u0, 0), (u1, 0), (u1, 1), (u0, 1)]
+            x += advance
+        return np.array(vertices, dtype=np.float32), np.array(tex_coords, dtype=np.float32)
+
+    def release(self):
+        glDeleteTextures([self.texture_id])
+
+
+class TextRenderer:
+    """Screen-space HUD text drawn from cached glyph atlases.
+
+    Each font size is loaded once, and the quads of a string are only rebuilt when the
+    string changes, so constant labels cost one draw call per frame.
+    """
+
+    def __init__(self, font_path, width, height):
+        self.font_path = font_path
+        self.width = width
+        self.height = height
+        self.atlases = {}  # font size -> GlyphAtlas
+        self.strings = {}  # (font size, text) -> (vertices, tex_coords)
+
+    def atlas(self, font_size):
+        atlas = self.atlases.get(font_size)
+        if atlas is None:
+            atlas = self.atlases[font_size] = GlyphAtlas(self.font_path, font_size)
+        return atlas
+
+    def _string_arrays(self, text, font_size):
+        key = (font_size, text)
+        arrays = self.strings.get(key)
+        if arrays is None:
+            if len(self.strings) >= MAX_CACHED_STRINGS:
+                self.strings.clear()  # Old counter values are not coming back
+            arrays = self.strings[key] = self.atlas(font_size).layout(text)
+        return arrays
+
+    def draw_text(self, x, y, text, color=(255, 255, 255), font_size=15):
+        """Draw text with its top-left corner at (x, y) pixels from the top-left of the window."""
+        if not text:
+            return
+        vertices, tex_coords = self._string_arrays(text, font_size)
+
+        glEnable(GL_BLEND)
+        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+
+        # Set up orthogonal 2D projection
+        glMatrixMode(GL_PROJECTION)
+        glPushMatrix()
+        glLoadIdentity()
+        gluOrtho2D(0, self.width, 0, self.height)
+        glMatrixMode(GL_MODELVIEW)
+        glPushMatrix()
+        glLoadIdentity()
+        glTranslatef(x, self.height - y, 0)
+
+        glEnable(GL_TEXTURE_2D)
+        glBindTexture(GL_TEXTURE_2D, self.atlas(font_size).texture_id)
+        glColor3f(color[0] / 255, color[1] / 255, color[2] / 255)  # White glyphs tinted to the text color
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_TEXTURE_COORD_ARRAY)
+        glVertexPointer(2, GL_FLOAT, 0, vertices)
+        glTexCoordPointer(2, GL_FLOAT, 0, tex_coords)
+        glDrawArrays(GL_QUADS, 0, len(vertices))
+        glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+
+        # Cleanup
+        glDisable(GL_TEXTURE_2D)
+        glPopMatrix()
+        glMatrixMode(GL_PROJECTION)
+        glPopMatrix()
+        glMatrixMode(GL_MODELVIEW)
+        glDisable(GL_BLEND)
+
+    def release(self):
+        """Free the atlas textures; call before the GL context goes away."""
+        for atlas in self.atlases.values():
+            atlas.release()
+        self.atlases.clear()
+        self.strings.clear()
+
+
+def draw_hud(text_renderer, counter, params):
+    """Draw the compartment counts, the parameter table and the zone labels of a run."""
+    infected, healthy, recovered, removed = counter.totals()
+    draw_text = text_renderer.draw_text
+
+    # Compartment counts across the top
+    draw_text(45, 169, f"Infected: {infected}", color=(255, 0, 0), font_size=13)
+    draw_text(155, 169, f"Healthy: {healthy}", color=(0, 255, 0), font_size=13)
+    draw_text(270, 169, f"Diseased: {removed}", color=(255, 165, 0), font_size=13)
+    draw_text(380, 169, f"Recovered: {recovered}", color=(0, 0, 255), font_size=13)
+
+    # Display parameters in a table format on the right with smaller text
+    x_offset = text_renderer.width - 290  # Align to the right
+    y_offset = 80
+    row_height = 30
+    table_color = (0, 0, 0)
+
+    table_data = [
+        ("Infection Radius", f"{params[0]:.2f} units"),  # Add units for radius
+        ("Infection Probability", f"{params[1] * 100:.2f}%"),  # Convert to percentage
+        ("Duration of Infection", f"{params[2]} s"),  # Keep seconds for duration
+        ("Mortality Rate", f"{params[3] * 100:.2f}%"),  # Convert to percentage
+    ]
+
+    for i, (label, value) in enumerate(table_data):
+        draw_text(x_offset + 10, y_offset + i * row_height, f"{label}:", color=table_color, font_size=12)
+        draw_text(x_offset + 200, y_offset + i * row_height, value, color=table_color, font_size=12)
+
+    draw_text(50, 580, "Quarantine", color=(139, 0, 0), font_size=9)
+    draw_text(50, 485, "Graveyard", color=(64, 64, 64), font_size=9)  # Deep gray color
+
+
+def draw_profile(text_renderer, summary, x=560, y=640, row_height=14):
+    """Draw a profiler summary ((phase, mean ms), ...) as a small table."""
+    draw_text = text_renderer.draw_text
+    for i, (name, ms) in enumerate(summary):
+        draw_text(x, y + i * row_height, f"{name}:", color=(64, 64, 64), font_size=9)
+        draw_text(x + 110, y + i * row_height, f"{ms:6.2f} ms", color=(64, 64, 64), font_size=9)
+
+
+def draw_playback(text_renderer, time, duration, speed, paused, x=45, y=760):
+    """Draw the position, speed and state of a replay (see replay.py)."""
+    state = "paused" if paused else f"x{speed:g}"
+    text_renderer.draw_text(x, y, f"Replay {time:6.2f} / {duration:.2f} s  {state}", color=(0, 0, 0), font_size=12)
+    text_renderer.draw_text(x, y + 18, "Space pause  , . step  [ ] speed  PgUp PgDn seek 5 s  0-9 jump",
+                            color=(64, 64, 64), font_size=9)
@@ -1,120 +1,92 @@
 # map.py
-import random
+import math
+import numpy as np
 from OpenGL.GL import *
-from PIL import Image  # For loading and processing image files
-import pygame
+from assets import shared_assets, ROAD_TEXTURE, BUILDING_TEXTURE, GRASS_TEXTURE, GRAVESTONE_TEXTURE
+from camera import Frustum
+from city import CityLayout
 
-class Map:
+CHUNK_CELLS = 8  # Cells along each side of a rendering chunk
+GRAVE_SIZE = 0.5
+# Corners of a grave marker's quad relative to its position, and their texture coordinates
+GRAVE_CORNERS = np.array([(0, 0), (1, 0), (1, 1), (0, 1)], dtype=np.float32) * GRAVE_SIZE
+GRAVE_TEX_COORDS = np.array([(0, 0), (1, 0), (1, 1), (0, 1)], dtype=np.float32)
+
+class Map(CityLayout):
     """Class to handle the city layout including buildings and roads with center lines."""
 
-    def __init__(self, city_size, building_size, road_width, building_height):
-        self.city_size = city_size
-        self.building_size = building_size
-        self.road_width = road_width
-        self.building_height = building_height
-        self.road_texture = self.load_texture(r"C:\Users\sofis\OneDrive\Desktop\Projects\project 2\asphalt-road-texture-dark-gray-color_1017-20231.jpg")
-        self.single_texture = self.load_texture(r"C:\Users\sofis\OneDrive\Desktop\Projects\project 2\clouds-reflected-windows-modern-office.png")
-        self.graveyard_width, self.graveyard_height = 2, 2  # Define size
-        self.graveyard_start_x = -self.city_size -self.graveyard_width
-        self.graveyard_start_y = 4
-        # Precompute heights for all building clusters in the grid
-        self.building_heights = self.generate_building_heights()
-        #self.grave_texture = self.load_texture("./graves.png")
-        self.graves = []  # Store grave positions
-        self.grass_texture = self.load_texture("./th.jpeg")
-        self.grave_texture = self.load_texture_gravestone("./gravestone.png")
-
-
-    def load_texture_gravestone(self, file_path):
-        """Load a texture with alpha transparency."""
-        texture_surface = pygame.image.load(file_path).convert_alpha()  # Load with alpha
-        texture_data = pygame.image.tostring(texture_surface, "RGBA", 1)
-        width, height = texture_surface.get_size()
-
-        texture_id = glGenTextures(1)
-        glBindTexture(GL_TEXTURE_2D, texture_id)
-        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, width, height, 0, GL_RGBA, GL_UNSIGNED_BYTE, texture_data)
-        glTexParameterf(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-        glTexParameterf(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-        return texture_id
-
-    def load_texture(self, image_path):
-        """Loads an image file as a texture for OpenGL."""
-        img = Image.open(image_path)
-        img = img.convert("RGB")  # Convert to RGB for OpenGL compatibility
-        img = img.transpose(Image.FLIP_TOP_BOTTOM)  # Flip vertically for OpenGL
-        img_data = img.tobytes()
-        width, height = img.size
-
-        # Generate a texture ID
-        texture_id = glGenTextures(1)
-        glBindTexture(GL_TEXTURE_2D, texture_id)
-        
-        # Set texture parameters
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-        
-        # Load the texture into OpenGL
-        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, width, height, 0, GL_RGB, GL_UNSIGNED_BYTE, img_data)
-        
-        return texture_id
+    def __init__(self, city_size, building_size, road_width, building_height, rng=None, assets=None,
+                 chunk_cells=CHUNK_CELLS):
+        super().__init__(city_size, building_size, road_width, building_height, rng)
+        # Textures are shared by every Map in the process and survive between runs
+        self.assets = assets if assets is not None else shared_assets()
+        self.road_texture = self.assets.texture(ROAD_TEXTURE)
+        self.single_texture = self.assets.texture(BUILDING_TEXTURE)
+        self.grass_texture = self.assets.texture(GRASS_TEXTURE)
+        self.grave_texture = self.assets.texture(GRAVESTONE_TEXTURE, alpha=True)
+        # Display lists of the static city, split into chunks of chunk_cells x chunk_cells
+        # cells so only the chunks in view are drawn (see draw_map)
+        self.chunk_cells = chunk_cells
+        self.static_list = None
+        self.frustum = None  # View of the last draw_map
+        self.visible_chunks = 0
+        self.grave_count = 0  # Graves in the vertex arrays of draw_graves
+        self.build_static_geometry()
+
+    def road_rects(self):
+        """Rectangles (x0, y0, x1, y1) of every road, in drawing order: the interior roads,
+        then the bottom, top, left and right boundary roads."""
+        cell_size = self.building_size + self.road_width
+        end = self.city_size * cell_size - self.road_width  # Where the top and right boundary roads start
+        rects = []
+        for i in range(self.city_size - 1):
+            pos = (i + 1) * cell_size - self.road_width
+            rects.append((0, pos, end, pos + self.road_width))  # Horizontal road
+            rects.append((pos, 0, pos + self.road_width, end))  # Vertical road
+        rects.append((-self.road_width, -self.road_width, end, 0))  # Bottom
+        rects.append((-self.road_width, end, end, end + self.road_width))  # Top
+        rects.append((-self.road_width, 0, 0, end))  # Left
+        rects.append((end, -self.road_width, end + self.road_width, end + self.road_width))  # Right
+        return rects
+
+    def cell_region_bounds(self, region):
+        """World rectangle owned by a range of cells (i0, i1, j0, j1); the ranges at the edge of
+        the grid extend outwards without limit so they include the boundary roads."""
+        if region is None:
+            return -math.inf, -math.inf, math.inf, math.inf
+        cell_size = self.building_size + self.road_width
+        i0, i1, j0, j1 = region
+        return (i0 * cell_size if i0 > 0 else -math.inf, j0 * cell_size if j0 > 0 else -math.inf,
+                i1 * cell_size if i1 < self.city_size else math.inf, j1 * cell_size if j1 < self.city_size else math.inf)
+
+    def draw_roads(self, region=None):
+        """Draws textured roads with centered dotted lines between segments, excluding intersections.
 
-    def draw_roads(self):
-        """Draws textured roads with centered dotted lines between segments, excluding intersections."""
+        With a region (i0, i1, j0, j1) only the road surface and dashes of cells i0 <= i < i1 (along x)
+        and j0 <= j < j1 (along y) are drawn; the roads are cut at the region's edges with the texture
+        coordinates they have in the whole city, so adjacent regions join seamlessly.
+        """
         cell_size = self.building_size + self.road_width
+        i0, i1, j0, j1 = region if region is not None else (0, self.city_size, 0, self.city_size)
+        clip_x0, clip_y0, clip_x1, clip_y1 = self.cell_region_bounds(region)
         glEnable(GL_TEXTURE_2D)
         glBindTexture(GL_TEXTURE_2D, self.road_texture)
 
         glColor3f(1.0, 1.0, 1.0)  # Set color to white to use the texture colors
 
-        # Draw the main roads
         glBegin(GL_QUADS)
-        for i in range(self.city_size - 1):
-            y_pos = (i + 1) * cell_size - self.road_width
-            x_pos = (i + 1) * cell_size - self.road_width
-
-            # Horizontal road
-            glTexCoord2f(0.0, 0.0); glVertex3f(0, y_pos, 0)
-            glTexCoord2f(1.0, 0.0); glVertex3f(self.city_size * cell_size - self.road_width, y_pos, 0)
-            glTexCoord2f(1.0, 1.0); glVertex3f(self.city_size * cell_size - self.road_width, y_pos + self.road_width, 0)
-            glTexCoord2f(0.0, 1.0); glVertex3f(0, y_pos + self.road_width, 0)
-
-            # Vertical road
-            glTexCoord2f(0.0, 0.0); glVertex3f(x_pos, 0, 0)
-            glTexCoord2f(1.0, 0.0); glVertex3f(x_pos + self.road_width, 0, 0)
-            glTexCoord2f(1.0, 1.0); glVertex3f(x_pos + self.road_width, self.city_size * cell_size - self.road_width, 0)
-            glTexCoord2f(0.0, 1.0); glVertex3f(x_pos, self.city_size * cell_size - self.road_width, 0)
-        
-        # Top and bottom horizontal roads
-        # Bottom
-        glTexCoord2f(0.0, 0.0); glVertex3f(-self.road_width, -self.road_width, 0)
-        glTexCoord2f(1.0, 0.0); glVertex3f(self.city_size * (self.building_size + self.road_width) - self.road_width, -self.road_width, 0)
-        glTexCoord2f(1.0, 1.0); glVertex3f(self.city_size * (self.building_size + self.road_width) - self.road_width, 0, 0)
-        glTexCoord2f(0.0, 1.0); glVertex3f(-self.road_width, 0, 0)
-
-        # Top
-        glTexCoord2f(0.0, 0.0); glVertex3f(-self.road_width, self.city_size * (self.building_size + self.road_width) - self.road_width, 0)
-        glTexCoord2f(1.0, 0.0); glVertex3f(self.city_size * (self.building_size + self.road_width) - self.road_width, self.city_size * (self.building_size + self.road_width) - self.road_width, 0)
-        glTexCoord2f(1.0, 1.0); glVertex3f(self.city_size * (self.building_size + self.road_width) - self.road_width, self.city_size * (self.building_size + self.road_width), 0)
-        glTexCoord2f(0.0, 1.0); glVertex3f(-self.road_width, self.city_size * (self.building_size + self.road_width), 0)
-
-
-        # Left and right vertical roads
-        # Left
-        glTexCoord2f(0.0, 0.0); glVertex3f(-self.road_width, 0, 0)
-        glTexCoord2f(1.0, 0.0); glVertex3f(0, 0, 0)
-        glTexCoord2f(1.0, 1.0); glVertex3f(0, self.city_size * (self.building_size + self.road_width) - self.road_width, 0)
-        glTexCoord2f(0.0, 1.0); glVertex3f(-self.road_width, self.city_size * (self.building_size + self.road_width) - self.road_width, 0)
-
-        # Right
-        glTexCoord2f(0.0, 0.0); glVertex3f(self.city_size * (self.building_size + self.road_width) - self.road_width, -self.road_width, 0)
-        glTexCoord2f(1.0, 0.0); glVertex3f(self.city_size * (self.building_size + self.road_width), -self.road_width, 0)
-        glTexCoord2f(1.0, 1.0); glVertex3f(self.city_size * (self.building_size + self.road_width), self.city_size * (self.building_size + self.road_width), 0)
-        glTexCoord2f(0.0, 1.0); glVertex3f(self.city_size * (self.building_size + self.road_width) - self.road_width, self.city_size * (self.building_size + self.road_width), 0)
-
-
+        for x0, y0, x1, y1 in self.road_rects():
+            # Part of the road inside the region
+            qx0, qy0 = max(x0, clip_x0), max(y0, clip_y0)
+            qx1, qy1 = min(x1, clip_x1), min(y1, clip_y1)
+            if qx0 >= qx1 or qy0 >= qy1:
+                continue
+            u0, u1 = (qx0 - x0) / (x1 - x0), (qx1 - x0) / (x1 - x0)
+            v0, v1 = (qy0 - y0) / (y1 - y0), (qy1 - y0) / (y1 - y0)
+            glTexCoord2f(u0, v0); glVertex3f(qx0, qy0, 0)
+            glTexCoord2f(u1, v0); glVertex3f(qx1, qy0, 0)
+            glTexCoord2f(u1, v1); glVertex3f(qx1, qy1, 0)
+            glTexCoord2f(u0, v1); glVertex3f(qx0, qy1, 0)
         glEnd()
         glDisable(GL_TEXTURE_2D)
 
@@ -129,9 +101,9 @@ class Map:
         glBegin(GL_QUADS)
         
         # Horizontal dotted lines (4 rows between 5 segments)
-        for i in range(self.city_size - 1):
+        for i in range(j0, min(j1, self.city_size - 1)):
             y_pos = (i + 1) * cell_size - self.road_width / 2  # Centered on the road width
-            for j in range(self.city_size ):
+            for j in range(i0, i1):
                 x_start = (j ) * cell_size 
 
                 # Draw dashes along the road segment, avoiding intersections
@@ -144,9 +116,9 @@ class Map:
                     x += dash_length + dash_spacing
 
         # Vertical dotted lines (4 columns between 5 segments)
-        for j in range(self.city_size - 1):
+        for j in range(i0, min(i1, self.city_size - 1)):
             x_pos = (j + 1) * cell_size - self.road_width / 2  # Centered on the road width
-            for i in range(self.city_size ):
+            for i in range(j0, j1):
                 y_start = (i ) * cell_size 
 
                 # Draw dashes along the road segment, avoiding intersections
@@ -160,42 +132,6 @@ class Map:
 
         glEnd()
 
-    def get_road_boundaries(self):
-        """Returns a list of valid road areas where agents can move, excluding buildings."""
-        road_boundaries = []
-        cell_size = self.building_size + self.road_width
-
-        # Horizontal and vertical road segments
-        for i in range(self.city_size - 1):
-            y_pos = (i + 1) * cell_size - self.road_width
-            for j in range(self.city_size - 1):
-                x_pos = (j + 1) * cell_size - self.road_width
-
-                # Horizontal road segment
-                road_boundaries.append((0, self.city_size * cell_size, y_pos, y_pos + self.road_width))
-                
-                # Vertical road segment
-                road_boundaries.append((x_pos, x_pos + self.road_width, 0, self.city_size * cell_size))
-
-        return road_boundaries
-
-    def generate_building_heights(self):
-        """Generates fixed heights for each cluster of buildings in the grid."""
-        heights = []
-        for _ in range(self.city_size):
-            row_heights = []
-            for _ in range(self.city_size):
-                # Generate heights for the four buildings in the cell
-                cell_heights = [
-                    random.uniform(self.building_height * 0.3, self.building_height * 1.1),
-                    random.uniform(self.building_height * 0.4, self.building_height * 2),
-                    random.uniform(self.building_height * 0.7, self.building_height * 2),
-                    random.uniform(self.building_height * 0.5, self.building_height * 1.1)
-                ]
-                row_heights.append(cell_heights)
-            heights.append(row_heights)
-        return heights           
-
     def draw_shadow(self, x, y, height, size, is_last_row=False):
         """Draws a lighter, dented shadow below the building based on height, with adjustments for the last row."""
         # Limit shadow length for the last row to avoid extending beyond the grid
@@ -294,11 +230,15 @@ class Map:
 
     def draw_graveyard(self):
         """Draw the graveyard zone with a grass texture and grave markers."""
+        self.draw_graveyard_base()
+        self.draw_graves()
+
+    def draw_graveyard_base(self):
+        """Draw the graveyard base with grass texture."""
         glEnable(GL_TEXTURE_2D)
         glBindTexture(GL_TEXTURE_2D, self.grass_texture)
         glColor3f(1.0, 1.0, 1.0)  # Ensure no color tint on texture
 
-        # Draw the graveyard base with grass texture
         glBegin(GL_QUADS)
         glTexCoord2f(0, 0); glVertex3f(self.graveyard_start_x, self.graveyard_start_y, 0)
         glTexCoord2f(1, 0); glVertex3f(self.graveyard_start_x + self.graveyard_width, self.graveyard_start_y, 0)
@@ -307,45 +247,40 @@ class Map:
         glEnd()
 
         glDisable(GL_TEXTURE_2D)
-        # Draw grave markers on top of the grass texture
-        for x, y in self.graves:
-            self.draw_grave_marker(x, y)
 
-    def draw_grave_marker(self, x, y):
-        """Draw a grave marker with transparency."""
+    def draw_graves(self):
+        """Draw all grave markers on top of the grass texture, in one textured, blended batch."""
+        count = len(self.graves)
+        if count == 0:
+            return
+        if self.grave_count != count:
+            corners = np.frombuffer(self.graves.coords, dtype=np.float32).reshape(count, 1, 2)
+            self.grave_vertices = np.zeros((count, 4, 3), dtype=np.float32)
+            self.grave_vertices[..., :2] = corners + GRAVE_CORNERS
+            self.grave_tex_coords = np.broadcast_to(GRAVE_TEX_COORDS, (count, 4, 2)).copy()
+            self.grave_count = count
+
         glEnable(GL_TEXTURE_2D)
         glBindTexture(GL_TEXTURE_2D, self.grave_texture)
         glEnable(GL_BLEND)
         glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
         glColor3f(1.0, 1.0, 1.0)  # No color tint
-
-        glBegin(GL_QUADS)
-        glTexCoord2f(0, 0); glVertex3f(x, y, 0)
-        glTexCoord2f(1, 0); glVertex3f(x + 0.5, y, 0)
-        glTexCoord2f(1, 1); glVertex3f(x + 0.5, y + 0.5, 0)
-        glTexCoord2f(0, 1); glVertex3f(x, y + 0.5, 0)
-        glEnd()
-
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_TEXTURE_COORD_ARRAY)
+        glVertexPointer(3, GL_FLOAT, 0, self.grave_vertices)
+        glTexCoordPointer(2, GL_FLOAT, 0, self.grave_tex_coords)
+        glDrawArrays(GL_QUADS, 0, 4 * count)
+        glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
         glDisable(GL_BLEND)
         glDisable(GL_TEXTURE_2D)
 
+    def draw_buildings(self, region=None):
+        """Draws clusters of four smaller buildings in each cell and adjusts shadow length for the last row.
 
-
-    def add_grave(self):
-        """Add a grave for a deceased agent in an orderly grid layout."""
-        grid_x = self.graveyard_start_x + (len(self.graves) % 4) * 0.5  # Columns of 4
-        grid_y = self.graveyard_start_y + (len(self.graves) // 4) * 0.5  # New row after 4 graves
-        if (grid_x, grid_y) not in self.graves:  # Ensure no duplicate graves at the same position
-            self.graves.append((grid_x, grid_y))
-
-    def draw_map(self):
-        """Draws the entire city layout with clusters of four smaller buildings in each cell and adjusts shadow length for the last row."""
-        glEnable(GL_DEPTH_TEST)
-        glClearColor(1.0, 1.0, 1.0, 1.0)
-        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-        
-        self.draw_roads()
-
+        With a region (i0, i1, j0, j1) only the cells i0 <= i < i1, j0 <= j < j1 are drawn.
+        """
+        i0, i1, j0, j1 = region if region is not None else (0, self.city_size, 0, self.city_size)
         cell_size = self.building_size + self.road_width
         sub_building_size = self.building_size / 2  # Each smaller building occupies half of the original building size
 
@@ -357,8 +292,8 @@ class Map:
             (0.9, 0.9, 0.9)   # Off-white for top-right
         ]
 
-        for i in range(self.city_size):
-            for j in range(self.city_size):
+        for i in range(i0, i1):
+            for j in range(j0, j1):
                 x = i * cell_size
                 y = j * cell_size
                     
@@ -379,9 +314,90 @@ class Map:
                 self.draw_building(x + sub_building_size, y, heights[1], sub_building_size, top_colors[1]) # Bottom-right
                 self.draw_building(x, y + sub_building_size, heights[2], sub_building_size, top_colors[2]) # Top-left
                 self.draw_building(x + sub_building_size, y + sub_building_size, heights[3], sub_building_size, top_colors[3]) # Top-right
-                # Call the verification overlay function to visualize road boundaries
+
+    def plan_chunks(self):
+        """Splits the grid into chunks of up to chunk_cells x chunk_cells cells, as (i0, i1, j0, j1)
+        ranges, and computes the bounding box (x0, y0, z0, x1, y1, z1) of everything each one draws."""
+        cell_size = self.building_size + self.road_width
+        step = self.chunk_cells
+        self.chunks = [(i0, min(i0 + step, self.city_size), j0, min(j0 + step, self.city_size))
+                       for i0 in range(0, self.city_size, step) for j0 in range(0, self.city_size, step)]
+        top = max(max(heights) for row in self.building_heights for heights in row)
+        reach = top * 0.9  # Furthest a shadow falls below and to the left of its building
+        bounds = []
+        for i0, i1, j0, j1 in self.chunks:
+            # The outer chunks also hold the boundary roads
+            x0 = i0 * cell_size - (self.road_width if i0 == 0 else 0) - reach
+            y0 = j0 * cell_size - (self.road_width if j0 == 0 else 0) - reach
+            bounds.append((x0, y0, 0, i1 * cell_size, j1 * cell_size, top))
+        self.chunk_bounds = np.array(bounds, dtype=np.float64)
+
+    def build_static_geometry(self):
+        """Prepares the display lists of everything that doesn't change during a run.
+
+        The quarantine border and graveyard base go into one list, compiled now. Each chunk of
+        the city gets two lists, one for its roads and lines and one for its buildings and
+        shadows, compiled the first time the chunk is visible (see draw_map).
+        """
+        self.release()
+        self.plan_chunks()
+        self.static_list = glGenLists(2 * len(self.chunks) + 1)
+        self.fixed_list = self.static_list + 2 * len(self.chunks)
+        self.chunk_compiled = np.zeros(len(self.chunks), dtype=bool)
+
+        glNewList(self.fixed_list, GL_COMPILE)
         self.draw_quarantine_zone()  # Draw quarantine box
         glDisable(GL_DEPTH_TEST)
-        self.draw_graveyard()
+        self.draw_graveyard_base()
+        glEnable(GL_DEPTH_TEST)
+        glEndList()
+        self.static_dirty = False
+
+    def compile_chunk(self, index):
+        region = self.chunks[index]
+        glNewList(self.static_list + 2 * index, GL_COMPILE)
+        self.draw_roads(region)
+        glEndList()
+        glNewList(self.static_list + 2 * index + 1, GL_COMPILE)
+        self.draw_buildings(region)
+        glEndList()
+        self.chunk_compiled[index] = True
+
+    def invalidate_static_geometry(self):
+        """Marks the static city as changed (e.g. new building heights) so it is recompiled."""
+        self.static_dirty = True
+
+    def release(self):
+        """Frees the display lists (textures stay with the asset manager); call before
+        discarding the map while its GL context is alive."""
+        if self.static_list is not None:
+            glDeleteLists(self.static_list, 2 * len(self.chunks) + 1)
+            self.static_list = None
+
+    def draw_map(self):
+        """Draws the entire city: the static geometry of the chunks in view plus the current graves.
+
+        The frustum of the current camera is kept in self.frustum, so the agents can be culled
+        against the same view.
+        """
+        glEnable(GL_DEPTH_TEST)
+        glClearColor(1.0, 1.0, 1.0, 1.0)
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+
+        if self.static_list is None or self.static_dirty:
+            self.build_static_geometry()
+        self.frustum = Frustum.current()
+        visible = np.flatnonzero(self.frustum.boxes_visible(self.chunk_bounds))
+        for index in visible[~self.chunk_compiled[visible]]:
+            self.compile_chunk(index)
+        self.visible_chunks = len(visible)
+
+        if len(visible):
+            ground_lists = (self.static_list + 2 * visible).astype(np.uint32)
+            glCallLists(ground_lists)  # All roads before any building, as when drawn in one piece
+            glCallLists(ground_lists + 1)
+        glCallList(self.fixed_list)
+
+        glDisable(GL_DEPTH_TEST)
+        self.draw_graves()
         glEnable(GL_DEPTH_TEST)
-            
\ No newline at end of file
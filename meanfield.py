@@ -0,0 +1,204 @@
+# meanfield.py
+"""Mean-field SIRD estimate of a headless run, for screening parameter sets before a sweep."""
+import argparse
+import json
+import math
+
+import numpy as np
+
+from agent import Agent
+from city import RoadIndex
+from engine import CITY_SIZE, BUILDING_SIZE, ROAD_WIDTH, NUM_AGENTS, TICK_DT, PARAM_SETS
+
+# Fitted with calibrate() to 36 parameter sets (radius 0.2-0.8, probability 0.3-1, duration
+# 2-20 s) of the default map and population, 20 headless runs each
+CONTACT_SCALE = 1.26
+CLUSTERING = 2  # Exponent of the local depletion of healthy agents around the infected ones
+DEFAULT_ATTACK_RANGE = (0.1, 0.9)
+
+
+class MeanFieldSIRD:
+    """Deterministic difference-equation counterpart of run_headless.
+
+    Tracks the expected number of agents ever infected, tick by tick with the same dt.
+    Agents walk the roads at step_size per tick, so an infected agent sweeps a band of
+    width 2 * radius and meets each healthy agent 2 * radius * step_size / road_area times
+    per tick (scaled by contact_scale). An encounter lasts about radius / step_size ticks,
+    with two probability tests per tick (check_infection, then infect), so it transmits with
+    probability 1 - (1 - p**2) ** (radius / step_size). Healthy agents near infected ones run
+    out faster than the population average, so new infections are damped by a further
+    (healthy / population) ** CLUSTERING.
+
+    Infected agents spread until they leave for quarantine (Agent.QUARANTINE_THRESHOLD, the
+    time the agents actually use; they don't read the quarantine parameter either) and
+    resolve infection_duration seconds after infection, dying with probability mortality_rate.
+
+    All methods take a list of parameter tuples and evaluate them together with NumPy, so
+    thousands of sets take milliseconds.
+    """
+
+    def __init__(self, num_agents=NUM_AGENTS, city_size=CITY_SIZE, building_size=BUILDING_SIZE,
+                 road_width=ROAD_WIDTH, dt=TICK_DT, step_size=0.05, contact_scale=CONTACT_SCALE,
+                 quarantine_time=Agent.QUARANTINE_THRESHOLD):
+        self.num_agents = num_agents
+        self.road_area = RoadIndex(city_size, building_size, road_width).area()
+        self.dt = dt
+        self.step_size = step_size
+        self.contact_scale = contact_scale
+        self.quarantine_time = quarantine_time
+
+    def _ticks(self, seconds):
+        """Number of ticks until `seconds` have elapsed on a SimulationClock."""
+        return np.ceil(np.asarray(seconds, dtype=np.float64) / self.dt - 1e-9).astype(np.int64)
+
+    def rates(self, param_sets):
+        """Per-tick model coefficients of each parameter set, as a dict of arrays."""
+        params = np.asarray(param_sets, dtype=np.float64).reshape(-1, 5)
+        radius, probability, duration, mortality = params[:, 0], params[:, 1], params[:, 2], params[:, 3]
+        encounters = self.contact_scale * 2 * radius * self.step_size / self.road_area
+        per_encounter = 1 - (1 - probability ** 2) ** (radius / self.step_size)
+        resolve_ticks = np.maximum(self._ticks(duration), 1)
+        quarantine_ticks = self._ticks(self.quarantine_time)
+        return {
+            # Expected infections of one healthy agent per mobile infected agent and tick
+            "transmission": encounters * per_encounter,
+            "resolve_ticks": resolve_ticks,
+            # Ages (in ticks) at which an infected agent is still out on the roads
+            "mobile_ticks": np.minimum(quarantine_ticks - 1, resolve_ticks),
+            "mortality": mortality,
+        }
+
+    def run(self, param_sets, time_limit=20):
+        """Expected outcome of a run of time_limit simulated seconds for every parameter set.
+
+        Returns a dict of arrays: the final infected, healthy, recovered and deceased counts,
+        the attack rate (fraction ever infected) and the peak number infected at once.
+        """
+        rates = self.rates(param_sets)
+        transmission, mortality = rates["transmission"], rates["mortality"]
+        resolve_ticks, mobile_ticks = rates["resolve_ticks"], rates["mobile_ticks"]
+        n = self.num_agents
+        count = len(transmission)
+        ticks = int(math.floor(time_limit / self.dt + 1e-9)) + 1  # run_headless runs while now <= time_limit
+        columns = np.arange(count)
+
+        # Cumulative infections before each tick, after `pad` rows of zeros for negative lags
+        pad = int(max(resolve_ticks.max(), mobile_ticks.max())) + 1
+        cumulative = np.zeros((pad + ticks + 1, count))
+        cumulative[pad] = 1  # The initially infected agent
+        peak = np.ones(count)
+        for tick in range(ticks):
+            row = pad + tick
+            total = cumulative[row]
+            mobile = total - cumulative[row - mobile_ticks, columns]
+            healthy = n - total
+            new = healthy * (healthy / n) ** CLUSTERING * -np.expm1(-transmission * mobile)
+            cumulative[row + 1] = total + new
+            resolved = cumulative[row + 1 - resolve_ticks, columns]
+            peak = np.maximum(peak, cumulative[row + 1] - resolved)
+
+        total = cumulative[pad + ticks]
+        resolved = cumulative[pad + ticks - resolve_ticks, columns]
+        return {
+            "infected": total - resolved,
+            "healthy": n - total,
+            "recovered": resolved * (1 - mortality),
+            "deceased": resolved * mortality,
+            "attack_rate": total / n,
+            "peak_infected": peak,
+        }
+
+    def estimate(self, params, time_limit=20):
+        """Expected (infected, healthy, recovered, deceased) counts of one parameter set,
+        comparable with the tuple returned by engine.run_headless."""
+        result = self.run([params], time_limit)
+        return tuple(float(result[name][0]) for name in ("infected", "healthy", "recovered", "deceased"))
+
+
+def screen(param_sets, attack_range=DEFAULT_ATTACK_RANGE, model=None, time_limit=20):
+    """Keep the parameter sets whose estimated attack rate lies within attack_range.
+
+    Outbreaks that certainly die out or certainly reach everyone are cheap to predict; the
+    agent-based runs are best spent on the transition between them.
+    """
+    model = model or MeanFieldSIRD()
+    attack_rate = model.run(param_sets, time_limit)["attack_rate"]
+    low, high = attack_range
+    return [params for params, rate in zip(param_sets, attack_rate) if low <= rate <= high]
+
+
+def calibrate(param_sets, replicates=20, seed=0, time_limit=20, workers=None,
+              scales=np.geomspace(0.1, 10, 101), **layout):
+    """Fit contact_scale to headless agent runs of the given parameter sets.
+
+    Runs every set `replicates` times (in parallel, see sweep.run_sweep), then picks the
+    scale whose estimates best match the mean final counts. layout (num_agents, city_size,
+    building_size, road_width) applies to both the runs and the model. Returns
+    (contact_scale, root-mean-square error as a fraction of the population).
+    """
+    from sweep import run_sweep
+
+    run_options = {key: layout[key] for key in ("num_agents", "city_size", "building_size", "road_width")
+                   if key in layout}
+    observed = {}
+    for result in run_sweep(param_sets, replicates, workers, seed, time_limit=time_limit, **run_options):
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        key = tuple(result["parameters"].values())
+        counts = result["final_counts"]
+        observed.setdefault(key, []).append([counts[name] for name in ("infected", "healthy", "recovered", "deceased")])
+    keys = [tuple(params) for params in param_sets]
+    target = np.array([np.mean(observed[key], axis=0) for key in keys])
+
+    best = None
+    for scale in scales:
+        model = MeanFieldSIRD(contact_scale=scale, **layout)
+        result = model.run(keys, time_limit)
+        estimate = np.stack([result[name] for name in ("infected", "healthy", "recovered", "deceased")], axis=1)
+        error = math.sqrt(np.mean((estimate - target) ** 2)) / model.num_agents
+        if best is None or error < best[1]:
+            best = (float(scale), error)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mean-field estimates of parameter sets, for screening sweeps.")
+    parser.add_argument("--params", help="JSON file with a list of [radius, probability, duration, mortality, quarantine] sets")
+    parser.add_argument("--time-limit", type=float, default=20)
+    parser.add_argument("--agents", type=int, default=NUM_AGENTS)
+    parser.add_argument("--contact-scale", type=float, default=CONTACT_SCALE)
+    parser.add_argument("--screen-attack", type=float, nargs=2, metavar=("LOW", "HIGH"),
+                        help="Only keep sets whose estimated attack rate is in [LOW, HIGH]")
+    parser.add_argument("--calibrate", action="store_true", help="Fit the contact scale to headless runs of the sets")
+    parser.add_argument("--replicates", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the (screened) parameter sets here, for sweep.py --params")
+    args = parser.parse_args()
+
+    param_sets = PARAM_SETS
+    if args.params:
+        with open(args.params, "r") as file:
+            param_sets = [tuple(params) for params in json.load(file)]
+
+    if args.calibrate:
+        scale, error = calibrate(param_sets, args.replicates, args.seed, args.time_limit, num_agents=args.agents)
+        print(f"contact_scale={scale:.4g} (RMS error {error:.1%} of the population)")
+        return
+
+    model = MeanFieldSIRD(num_agents=args.agents, contact_scale=args.contact_scale)
+    if args.screen_attack:
+        param_sets = screen(param_sets, args.screen_attack, model, args.time_limit)
+    else:
+        result = model.run(param_sets, args.time_limit)
+        for i, params in enumerate(param_sets):
+            print(f"{params}: infected {result['infected'][i]:.1f}, healthy {result['healthy'][i]:.1f}, "
+                  f"recovered {result['recovered'][i]:.1f}, deceased {result['deceased'][i]:.1f}, "
+                  f"peak {result['peak_infected'][i]:.1f}")
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump([list(params) for params in param_sets], file)
+        print(f"Wrote {len(param_sets)} parameter sets to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+# population.py
+"""Structure-of-arrays population: the Agent model as whole-population NumPy operations."""
+import copy
+import numpy as np
+from agent import Agent
+from sim_clock import SimulationClock
+import compartments
+from compartments import CompartmentCounter
+
+# Direction codes, in the same order as Agent's direction strings
+UP, DOWN, LEFT, RIGHT = 0, 1, 2, 3
+DIRECTION_NAMES = ("up", "down", "left", "right")
+DIRECTION_DX = np.array([0.0, 0.0, -1.0, 1.0])
+DIRECTION_DY = np.array([1.0, -1.0, 0.0, 0.0])
+
+# State codes
+HEALTHY, INFECTED, REMOVED = 0, 1, 2
+
+# Rows of Population.event_due, in the order a tick applies them (as events.EventScheduler
+# would for events due at the same time)
+QUARANTINE_EVENT, RESOLVE_EVENT, GRAVEYARD_EVENT = 0, 1, 2
+
+# Agent colors indexed by state code, with deceased agents in the extra last row
+STATE_COLORS = np.array([
+    (0.0, 1.0, 0.0),   # Green for healthy
+    (1.0, 0.0, 0.0),   # Red for infected
+    (0.0, 0.0, 1.0),   # Blue for recovered
+    (1.0, 0.65, 0.0),  # Orange for deceased
+])
+
+# Keys for packing (column, row) cell coordinates into one integer
+_CELL_OFFSET = 1 << 20
+_CELL_STRIDE = 1 << 21
+
+
+class Population:
+    """Stores every agent's movement and infection state in contiguous arrays.
+
+    Mirrors the per-agent behaviour of Agent (movement, quarantine and graveyard
+    animations, infection and recovery/death) but advances the whole population at once.
+    """
+
+    # Per-agent arrays that make up the state of a run (saved by checkpoint.py)
+    STATE_ARRAYS = ("x", "y", "direction", "steps_remaining", "state", "deceased", "infection_start_time",
+                    "deceased_start_time", "quarantine_due", "in_quarantine", "moving_to_quarantine",
+                    "moving_to_graveyard", "in_graveyard", "has_grave", "arc_progress", "arc_start", "arc_mid",
+                    "arc_end")
+
+    def __init__(self, num_agents, city_map, step_size=0.05, infection_radius=0.5,
+                 infection_probability=0.75, infection_duration=15, mortality_rate=0.2,
+                 road_buffer=0.3, seed=None, clock=None, counter=None):
+        self.num_agents = num_agents
+        self.clock = clock if clock is not None else SimulationClock()
+        self.counter = counter if counter is not None else CompartmentCounter()
+        self.counter.add(compartments.HEALTHY, num_agents)
+        self.city_map = city_map
+        self.city_size = city_map.city_size
+        self.building_size = city_map.building_size
+        self.road_width = city_map.road_width
+        self.step_size = step_size
+        self.infection_radius = infection_radius
+        self.infection_probability = infection_probability
+        self.infection_duration = infection_duration
+        self.mortality_rate = mortality_rate
+        self.road_buffer = road_buffer
+        self.rng = np.random.default_rng(seed)
+
+        n = num_agents
+        self.x, self.y = self._random_road_positions(n)
+        self.direction = self.rng.integers(0, 4, size=n).astype(np.int8)
+        self.steps_remaining = self.rng.uniform(0, 0.05, size=n)
+
+        self.state = np.full(n, HEALTHY, dtype=np.int8)
+        self.deceased = np.zeros(n, dtype=bool)
+        self.infection_start_time = np.full(n, np.nan)
+        self.deceased_start_time = np.full(n, np.nan)
+        self.quarantine_due = np.zeros(n, dtype=bool)  # Set by the quarantine event, as Agent.quarantine_due
+
+        # Quarantine and graveyard animation state
+        self.in_quarantine = np.zeros(n, dtype=bool)
+        self.moving_to_quarantine = np.zeros(n, dtype=bool)
+        self.moving_to_graveyard = np.zeros(n, dtype=bool)
+        self.in_graveyard = np.zeros(n, dtype=bool)
+        self.has_grave = np.zeros(n, dtype=bool)
+        self.arc_progress = np.zeros(n)
+        self.arc_start = np.zeros((n, 2))
+        self.arc_mid = np.zeros((n, 2))
+        self.arc_end = np.zeros((n, 2))
+        self.quarantine_box_position = (-self.city_size - Agent.QUARANTINE_SIZE, 0)
+        self._reset_events(n)
+
+    @classmethod
+    def from_params(cls, params, city_map, num_agents, seed=None, clock=None, counter=None):
+        """Build a population from a parameter tuple and infect one agent to start the spread."""
+        infection_radius, infection_probability, infection_duration, mortality_rate, _ = params
+        population = cls(num_agents, city_map, step_size=0.05, infection_radius=infection_radius,
+                         infection_probability=infection_probability,
+                         infection_duration=infection_duration, mortality_rate=mortality_rate,
+                         road_buffer=0.001, seed=seed, clock=clock, counter=counter)
+        population.state[0] = INFECTED
+        population.infection_start_time[0] = population.clock.now()
+        population._schedule(np.zeros(1, dtype=np.int64), population.clock.now())
+        population.counter.transition(compartments.HEALTHY, compartments.INFECTED, 1, population.clock.now())
+        return population
+
+    def take(self, idx):
+        """Copy of the agents at the given indices as a new Population with the same settings,
+        map, clock, counter and random stream as this one."""
+        subset = copy.copy(self)
+        for name in self.STATE_ARRAYS:
+            setattr(subset, name, getattr(self, name)[idx])
+        subset.num_agents = len(subset.x)
+        subset.rebuild_events()
+        return subset
+
+    def _random_road_positions(self, n):
+        cell_size = self.building_size + self.road_width
+        x = self.rng.integers(0, self.city_size - 1, size=n) * cell_size + self.building_size + self.road_buffer
+        y = self.rng.integers(0, self.city_size - 1, size=n) * cell_size + self.building_size + self.road_buffer
+        x = x + self.rng.uniform(0, self.road_width - 2 * self.road_buffer, size=n)
+        y = y + self.rng.uniform(0, self.road_width - 2 * self.road_buffer, size=n)
+        return x, y
+
+    # Movement
+
+    def is_on_road(self, x, y):
+        """Vectorized Agent.is_on_road for arrays of candidate positions."""
+        return self.city_map.road_index.contains_array(x, y)
+
+    def choose_new_direction_with_bias(self, mask):
+        """Pick new directions for the masked agents, biased towards the map centre."""
+        idx = np.flatnonzero(mask)
+        if idx.size == 0:
+            return
+        map_center = self.city_size * (self.building_size + self.road_width) / 2
+        x, y = self.x[idx], self.y[idx]
+        allowed = np.ones((idx.size, 4), dtype=bool)
+        allowed[:, LEFT] = ~(x < map_center)
+        allowed[:, RIGHT] = ~(x > map_center)
+        allowed[:, DOWN] = ~(y < map_center)
+        allowed[:, UP] = ~(y > map_center)
+
+        # Uniform choice among each row's allowed directions
+        counts = allowed.sum(axis=1)
+        pick = np.floor(self.rng.random(idx.size) * counts).astype(np.int64)
+        ranks = np.cumsum(allowed, axis=1) - 1
+        chosen = np.argmax(allowed & (ranks == pick[:, None]), axis=1)
+
+        self.direction[idx] = chosen
+        self.steps_remaining[idx] = self.rng.uniform(0, 0.05, size=idx.size)
+
+    def random_move(self, mask):
+        """Step the masked agents along their direction, turning when they would leave the road."""
+        idx = np.flatnonzero(mask)
+        if idx.size == 0:
+            return
+        direction = self.direction[idx]
+        new_x = self.x[idx] + DIRECTION_DX[direction] * self.step_size
+        new_y = self.y[idx] + DIRECTION_DY[direction] * self.step_size
+        on_road = self.is_on_road(new_x, new_y)
+
+        moved = idx[on_road]
+        self.x[moved] = new_x[on_road]
+        self.y[moved] = new_y[on_road]
+        self.steps_remaining[moved] -= self.rng.uniform(0, 0.02, size=moved.size)
+
+        blocked = np.zeros(self.num_agents, dtype=bool)
+        blocked[idx[~on_road]] = True
+        self.choose_new_direction_with_bias(blocked)
+
+    def move_in_quarantine(self, mask):
+        """Jitter the masked agents inside the quarantine box."""
+        self._jitter_in_quarantine(np.flatnonzero(mask))
+
+    def _jitter_in_quarantine(self, idx):
+        if idx.size == 0:
+            return
+        qx, qy = self.quarantine_box_position
+        size = Agent.QUARANTINE_SIZE
+        self.x[idx] = np.clip(self.x[idx] + self.rng.uniform(-0.02, 0.02, size=idx.size), qx, qx + size)
+        self.y[idx] = np.clip(self.y[idx] + self.rng.uniform(-0.02, 0.02, size=idx.size), qy, qy + size)
+
+    def _animate_arc(self, idx):
+        """Advance the masked agents along their quadratic Bezier arcs; return which arrived."""
+        self.arc_progress[idx] += Agent.ANIMATION_SPEED
+        t = self.arc_progress[idx]
+        arrived = t >= 1.0
+        travelling = idx[~arrived]
+        t = t[~arrived][:, None]
+        position = ((1 - t) ** 2 * self.arc_start[travelling]
+                    + 2 * (1 - t) * t * self.arc_mid[travelling]
+                    + t ** 2 * self.arc_end[travelling])
+        self.x[travelling] = position[:, 0]
+        self.y[travelling] = position[:, 1]
+        return arrived
+
+    def _start_arcs(self, idx, target_x, target_y, end_x, end_y):
+        self.arc_progress[idx] = 0
+        self.arc_start[idx, 0] = self.x[idx]
+        self.arc_start[idx, 1] = self.y[idx]
+        self.arc_mid[idx, 0] = (self.x[idx] + target_x) / 2
+        self.arc_mid[idx, 1] = (self.y[idx] + target_y) / 2 + 5
+        self.arc_end[idx, 0] = end_x
+        self.arc_end[idx, 1] = end_y
+
+    def move(self, now=None):
+        """Vectorized Agent.move for the whole population."""
+        now = self.clock.now() if now is None else now
+        size = Agent.QUARANTINE_SIZE
+        qx, qy = self.quarantine_box_position
+
+        # Deceased agents travel to a grave position (started by the graveyard event) and stay there
+        dead = (self.state == REMOVED) & self.deceased
+        animating = np.flatnonzero(dead & self.moving_to_graveyard)
+        if animating.size:
+            arrived = animating[self._animate_arc(animating)]
+            self.in_graveyard[arrived] = True
+            self.moving_to_graveyard[arrived] = False
+            for _ in range(arrived.size):
+                self.city_map.add_grave()
+
+        alive = ~dead
+        self.move_in_quarantine(alive & self.in_quarantine)
+
+        # Infected agents past the threshold travel to the quarantine box
+        to_quarantine = alive & ~self.in_quarantine & (self.state == INFECTED) & self.quarantine_due
+        start = np.flatnonzero(to_quarantine & ~self.moving_to_quarantine)
+        if start.size:
+            end_x = qx + self.rng.uniform(0, size, size=start.size)
+            end_y = qy + self.rng.uniform(0, size, size=start.size)
+            self._start_arcs(start, qx, qy, end_x, end_y)
+            self.moving_to_quarantine[start] = True
+        animating = np.flatnonzero(to_quarantine)
+        if animating.size:
+            arrived = animating[self._animate_arc(animating)]
+            self.in_quarantine[arrived] = True
+            self.moving_to_quarantine[arrived] = False
+            self.x[arrived] = qx + self.rng.uniform(0, size, size=arrived.size)
+            self.y[arrived] = qy + self.rng.uniform(0, size, size=arrived.size)
+
+        self.random_move(alive & ~self.in_quarantine & ~to_quarantine)
+
+    # Infection
+
+    def _cell_keys(self, x, y, cell_size):
+        cx = np.floor(x / cell_size).astype(np.int64) + _CELL_OFFSET
+        cy = np.floor(y / cell_size).astype(np.int64) + _CELL_OFFSET
+        return cx * _CELL_STRIDE + cy
+
+    def contact_counts(self, sources=None):
+        """Number of infected agents within the infection radius of each healthy agent.
+
+        sources, if given, are the (x, y) position arrays of further infected agents that are
+        not part of this population (e.g. the halo of a spatial domain, see domains.py).
+        """
+        counts = np.zeros(self.num_agents, dtype=np.int64)
+        healthy = np.flatnonzero(self.state == HEALTHY)
+        infected = np.flatnonzero(self.state == INFECTED)
+        infected_x, infected_y = self.x[infected], self.y[infected]
+        if sources is not None:
+            infected_x = np.concatenate([infected_x, sources[0]])
+            infected_y = np.concatenate([infected_y, sources[1]])
+        if healthy.size == 0 or infected_x.size == 0:
+            return counts
+
+        # Sort healthy agents by grid cell so each neighbouring cell is a contiguous slice
+        cell_size = max(self.infection_radius, 1e-6)
+        healthy_keys = self._cell_keys(self.x[healthy], self.y[healthy], cell_size)
+        order = np.argsort(healthy_keys, kind="stable")
+        healthy = healthy[order]
+        healthy_keys = healthy_keys[order]
+        infected_keys = self._cell_keys(infected_x, infected_y, cell_size)
+
+        radius_sq = self.infection_radius ** 2
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                keys = infected_keys + dx * _CELL_STRIDE + dy
+                lo = np.searchsorted(healthy_keys, keys, side="left")
+                hi = np.searchsorted(healthy_keys, keys, side="right")
+                span = hi - lo
+                total = span.sum()
+                if total == 0:
+                    continue
+                # Expand every (infected, healthy-in-cell) candidate pair
+                source_x = np.repeat(infected_x, span)
+                source_y = np.repeat(infected_y, span)
+                starts = np.repeat(lo - np.cumsum(span) + span, span)
+                target = healthy[starts + np.arange(total)]
+                dist_sq = (source_x - self.x[target]) ** 2 + (source_y - self.y[target]) ** 2
+                np.add.at(counts, target[dist_sq <= radius_sq], 1)
+        return counts
+
+    def spread_infection(self, now=None, sources=None):
+        """Vectorized Agent.check_infection over every infected/healthy pair in range.
+
+        Each contact passes the probability test in check_infection and again in infect,
+        so a healthy agent with m infected contacts escapes with probability (1 - p**2)**m.
+        sources are further infected positions, as for contact_counts.
+
+        All contacts are counted before anyone is infected, so agents infected in this tick
+        only spread from the next one. engine.infection_phase goes through the agents in
+        list order instead, and an agent infected by one earlier in the list already spreads
+        in the same tick. Over many seeds the two engines still agree on the mean outcome
+        of every set in engine.PARAM_SETS (see tests/test_engine.py).
+        """
+        now = self.clock.now() if now is None else now
+        counts = self.contact_counts(sources)
+        exposed = np.flatnonzero(counts)
+        if exposed.size == 0:
+            return
+        p = self.infection_probability
+        escape = (1 - p * p) ** counts[exposed]
+        newly_infected = exposed[self.rng.random(exposed.size) >= escape]
+        self.state[newly_infected] = INFECTED
+        self.infection_start_time[newly_infected] = now
+        if newly_infected.size:
+            self._schedule(newly_infected, now)
+            self.counter.transition(compartments.HEALTHY, compartments.INFECTED, newly_infected.size, now)
+
+    # Infection events
+
+    def _reset_events(self, capacity):
+        self.event_queue = np.empty(capacity, dtype=np.int64)  # Agent indices, in order of infection
+        self.event_due = np.empty((3, capacity))  # Due time of each kind of event of each queued agent
+        self.event_count = 0
+        self.event_heads = [0, 0, 0]  # Per event kind, the queue position of the next event to apply
+
+    def _schedule(self, idx, start_time):
+        """Queue the quarantine, outcome and graveyard events of agents infected at start_time."""
+        begin, end = self.event_count, self.event_count + idx.size
+        self.event_queue[begin:end] = idx
+        resolve = start_time + self.infection_duration
+        self.event_due[QUARANTINE_EVENT, begin:end] = start_time + Agent.QUARANTINE_THRESHOLD
+        self.event_due[RESOLVE_EVENT, begin:end] = resolve
+        self.event_due[GRAVEYARD_EVENT, begin:end] = resolve + Agent.GRAVEYARD_DELAY
+        self.event_count = end
+
+    def _pop_due(self, kind, now):
+        """Queue positions (begin, end) of the events of this kind due at or before now."""
+        begin = self.event_heads[kind]
+        end = begin + int(np.searchsorted(self.event_due[kind, begin:self.event_count], now, side="right"))
+        self.event_heads[kind] = end
+        return begin, end
+
+    def rebuild_events(self):
+        """Queue the pending events of the agents again, after their arrays were replaced
+        (a subset taken, agents added, a checkpoint restored).
+
+        The pending agents are the infected ones and the deceased ones still waiting for the
+        graveyard. Infections all last infection_duration, so the waiting ones, infected
+        earlier, come first in the queue, and the infected ones whose quarantine event has
+        run come next.
+        """
+        infected = self.state == INFECTED
+        waiting = self.deceased & ~self.has_grave
+        pending = np.flatnonzero(infected | waiting)
+        pending = pending[np.argsort(self.infection_start_time[pending], kind="stable")]
+        self._reset_events(self.num_agents)
+        self._schedule(pending, self.infection_start_time[pending])
+        resolved = int(np.count_nonzero(waiting))
+        self.event_heads = [resolved + int(np.count_nonzero(infected & self.quarantine_due)), resolved, 0]
+
+    def run_due(self, now=None):
+        """Apply the quarantine, outcome and graveyard events due at or before now.
+
+        Every infection lasts infection_duration, so agents come due in the order they were
+        infected: each kind of event is a position in that queue and a tick only touches the
+        agents whose events are due, as an events.EventScheduler does for Agent objects.
+        """
+        now = self.clock.now() if now is None else now
+        queue, due = self.event_queue, self.event_due
+
+        begin, end = self._pop_due(QUARANTINE_EVENT, now)
+        idx = queue[begin:end]
+        self.quarantine_due[idx[self.state[idx] == INFECTED]] = True
+
+        begin, end = self._pop_due(RESOLVE_EVENT, now)
+        if end > begin:
+            resolved = queue[begin:end]
+            dies = self.rng.random(resolved.size) < self.mortality_rate
+            self.state[resolved] = REMOVED
+            self.deceased[resolved[dies]] = True
+            self.deceased_start_time[resolved[dies]] = due[RESOLVE_EVENT, begin:end][dies]
+            deaths = int(np.count_nonzero(dies))
+            if deaths:
+                self.counter.transition(compartments.INFECTED, compartments.DECEASED, deaths, now)
+            if deaths < resolved.size:
+                self.counter.transition(compartments.INFECTED, compartments.RECOVERED, resolved.size - deaths, now)
+
+        # Deceased agents wait Agent.GRAVEYARD_DELAY, then set off for a grave position
+        begin, end = self._pop_due(GRAVEYARD_EVENT, now)
+        idx = queue[begin:end]
+        start = idx[self.deceased[idx]]
+        if start.size:
+            gx, gy = self.city_map.graveyard_start_x, self.city_map.graveyard_start_y
+            grave_x = gx + self.rng.uniform(0, self.city_map.graveyard_width - 0.2, size=start.size)
+            grave_y = gy + self.rng.uniform(0, self.city_map.graveyard_height - 0.2, size=start.size)
+            self._start_arcs(start, gx, gy, grave_x, grave_y)
+            self.moving_to_graveyard[start] = True
+            self.has_grave[start] = True
+
+    def hold_for_quarantine(self, now=None):
+        """Keep the infected agents whose quarantine event has run inside the quarantine box
+        (what Agent.update_infection_status does each tick once quarantine is due)."""
+        held = self.event_queue[self.event_heads[RESOLVE_EVENT]:self.event_heads[QUARANTINE_EVENT]]
+        self._jitter_in_quarantine(held[~self.in_quarantine[held]])
+
+    def update_infection_status(self, now=None):
+        """Vectorized Agent.update_infection_status: apply the due events and quarantine."""
+        now = self.clock.now() if now is None else now
+        self.run_due(now)
+        self.hold_for_quarantine(now)
+
+    def step(self, now=None):
+        """Advance the whole population by one tick, in the order engine.step advances Agent
+        objects: due events, movement, then the spread of the infection (see
+        spread_infection for the one difference)."""
+        now = self.clock.now() if now is None else now
+        self.run_due(now)
+        self.move(now)
+        self.spread_infection(now)
+        self.hold_for_quarantine(now)
+
+    def colors(self):
+        """RGB color of every agent, matching Agent.color."""
+        index = self.state.astype(np.intp)
+        index[self.deceased] = len(STATE_COLORS) - 1
+        return STATE_COLORS[index]
+
+    def count_states(self):
+        """Return the (infected, healthy, recovered, deceased) counts by scanning the arrays.
+
+        self.counter holds the same totals without the scan.
+        """
+        removed = self.state == REMOVED
+        return (int(np.count_nonzero(self.state == INFECTED)),
+                int(np.count_nonzero(self.state == HEALTHY)),
+                int(np.count_nonzero(removed & ~self.deceased)),
+                int(np.count_nonzero(removed & self.deceased)))
@@ -0,0 +1,116 @@
+# profiler.py
+"""Opt-in per-phase timing of the frame loop, with a rolling summary and Chrome trace export."""
+import json
+import os
+import time
+from collections import deque
+from contextlib import nullcontext
+
+_NO_PHASE = nullcontext()
+
+
+class NullProfiler:
+    """Stand-in used when profiling is off: every call is a no-op."""
+
+    enabled = False
+    summary = ()
+
+    def phase(self, name):
+        return _NO_PHASE
+
+    def end_frame(self):
+        pass
+
+    def mark(self, name, **args):
+        pass
+
+
+class _Phase:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.profiler._record(self.name, self.start, time.perf_counter_ns())
+
+
+class FrameProfiler:
+    """Times named phases of each frame.
+
+    Wrap each phase in `with profiler.phase(name):` and call end_frame() once per frame.
+    The last `history` frames are kept for a rolling average (refreshed in `summary`
+    every `refresh_every` frames, so an overlay stays readable). With trace=True every
+    phase is also recorded as a Chrome trace event; see export_trace().
+    """
+
+    enabled = True
+
+    def __init__(self, history=120, refresh_every=15, trace=False):
+        self.history = history
+        self.refresh_every = refresh_every
+        self.trace = trace
+        self.frames = 0
+        self.current = {}  # phase -> ns spent in it this frame
+        self.samples = {}  # phase -> deque of per-frame ms
+        self.frame_times = deque(maxlen=history)  # ms per whole frame
+        self.summary = ()  # ((phase, mean ms), ...) in first-seen order, then ("frame", mean ms)
+        self.events = []
+        self.origin = time.perf_counter_ns()
+        self.frame_start = self.origin
+        self.pid = os.getpid()
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def _record(self, name, start, end):
+        self.current[name] = self.current.get(name, 0) + end - start
+        if self.trace:
+            self.events.append({"name": name, "ph": "X", "pid": self.pid, "tid": 0,
+                                "ts": (start - self.origin) / 1000, "dur": (end - start) / 1000,
+                                "args": {"frame": self.frames}})
+
+    def end_frame(self):
+        """Close the current frame and add its phase times to the rolling history."""
+        now = time.perf_counter_ns()
+        for name, ns in self.current.items():
+            samples = self.samples.get(name)
+            if samples is None:
+                samples = self.samples[name] = deque(maxlen=self.history)
+            samples.append(ns / 1e6)
+        self.frame_times.append((now - self.frame_start) / 1e6)
+        if self.trace:
+            self.events.append({"name": "frame", "ph": "X", "pid": self.pid, "tid": 1,
+                                "ts": (self.frame_start - self.origin) / 1000,
+                                "dur": (now - self.frame_start) / 1000, "args": {"frame": self.frames}})
+        self.current = {}
+        self.frame_start = now
+        self.frames += 1
+        if self.frames % self.refresh_every == 0:
+            self.summary = self.averages()
+
+    def averages(self):
+        """Mean milliseconds per frame of every phase (and the whole frame) over the history."""
+        means = [(name, sum(samples) / len(samples)) for name, samples in self.samples.items() if samples]
+        if self.frame_times:
+            means.append(("frame", sum(self.frame_times) / len(self.frame_times)))
+        return tuple(means)
+
+    def mark(self, name, **args):
+        """Record an instant event in the trace, e.g. the start of a run."""
+        if self.trace:
+            self.events.append({"name": name, "ph": "i", "s": "g", "pid": self.pid, "tid": 0,
+                                "ts": (time.perf_counter_ns() - self.origin) / 1000, "args": args})
+
+    def export_trace(self, path):
+        """Write the recorded events as a Chrome trace (chrome://tracing, Perfetto)."""
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": self.pid, "tid": 0, "args": {"name": "phases"}},
+            {"name": "thread_name", "ph": "M", "pid": self.pid, "tid": 1, "args": {"name": "frames"}},
+        ]
+        with open(path, "w") as file:
+            json.dump({"traceEvents": metadata + self.events, "displayTimeUnit": "ms"}, file)
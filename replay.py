@@ -0,0 +1,142 @@
+# replay.py
+"""Render-only playback of a run recorded with run_headless(..., trajectory_path=...).
+
+    python replay.py run.traj [--speed 2] [--start 5]
+
+Space pauses, ',' and '.' step one frame back or forward, '[' and ']' halve or double
+the speed, Page Up/Page Down seek 5 simulated seconds and 0-9 jump to 0-90% of the run.
+The camera zooms and pans as in the visual run. Escape or closing the window quits.
+"""
+import argparse
+
+import numpy as np
+import pygame
+from pygame.locals import *
+from OpenGL.GL import *
+
+from agent_renderer import AgentRenderer
+from assets import shared_assets, FONT
+from camera import Camera
+from compartments import CompartmentCounter, INFECTED, HEALTHY, RECOVERED, DECEASED
+from hud import TextRenderer, draw_hud, draw_playback
+from map import Map
+from trajectory import TrajectoryReader
+
+MIN_SPEED, MAX_SPEED = 1 / 16, 64
+SEEK_STEP = 5.0  # Simulated seconds per Page Up/Page Down
+
+
+class Playback:
+    """Playback position in a recording: the simulated time shown, speed and pause state."""
+
+    def __init__(self, reader, speed=1.0, start=0.0):
+        self.reader = reader
+        self.speed = speed
+        self.time = start
+        self.paused = False
+
+    @property
+    def index(self):
+        return self.reader.index_at(self.time)
+
+    def advance(self, seconds):
+        """Move forward by `seconds` of real time at the current speed."""
+        if not self.paused:
+            self.seek(self.time + seconds * self.speed)
+
+    def seek(self, time):
+        self.time = min(max(time, 0.0), self.reader.duration)
+
+    def step(self, frames):
+        """Pause and move by a number of recorded frames."""
+        self.paused = True
+        index = min(max(self.index + frames, 0), len(self.reader) - 1)
+        self.time = float(self.reader.times[index])
+
+    def handle_event(self, event):
+        """Update the playback from a pygame key press; returns True if the key was used."""
+        if event.type != pygame.KEYDOWN:
+            return False
+        if event.key == pygame.K_SPACE:
+            self.paused = not self.paused
+        elif event.key == pygame.K_PERIOD:
+            self.step(1)
+        elif event.key == pygame.K_COMMA:
+            self.step(-1)
+        elif event.key == pygame.K_RIGHTBRACKET:
+            self.speed = min(self.speed * 2, MAX_SPEED)
+        elif event.key == pygame.K_LEFTBRACKET:
+            self.speed = max(self.speed / 2, MIN_SPEED)
+        elif event.key == pygame.K_PAGEUP:
+            self.seek(self.time + SEEK_STEP)
+        elif event.key == pygame.K_PAGEDOWN:
+            self.seek(self.time - SEEK_STEP)
+        elif pygame.K_0 <= event.key <= pygame.K_9:
+            self.seek(self.reader.duration * (event.key - pygame.K_0) / 10)
+        else:
+            return False
+        return True
+
+
+def load_map(reader):
+    """Map of the recorded run, with its building heights."""
+    city_map = Map(*reader.header["layout"])
+    city_map.building_heights = reader.building_heights.tolist()
+    city_map.invalidate_static_geometry()
+    return city_map
+
+
+def replay(reader, width=800, height=800, speed=1.0, start=0.0):
+    """Play a TrajectoryReader in a window until it is closed."""
+    if not len(reader):
+        raise ValueError("The recording has no frames")
+    pygame.init()
+    pygame.display.set_mode((width, height), DOUBLEBUF | OPENGL)
+    pygame.display.set_caption("Epidemic Simulation Replay")
+    text_renderer = TextRenderer(shared_assets().path(FONT), width, height)
+    city_map = load_map(reader)
+    camera = Camera.for_city(city_map, width, height)
+    renderer = AgentRenderer()
+    counter = CompartmentCounter()
+    playback = Playback(reader, speed, start)
+
+    clock = pygame.time.Clock()
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                running = False
+            elif not playback.handle_event(event):
+                camera.handle_event(event)
+
+        frame = reader[playback.index]
+        # Graves are laid out in the order they are added, so the recording only keeps their number
+        city_map.graves.resize(int(frame["graves"]))
+        counter.counts.update(zip((INFECTED, HEALTHY, RECOVERED, DECEASED), frame["counts"].tolist()))
+
+        camera.apply()
+        city_map.draw_map()
+        visible = frame["visible"]
+        renderer.draw_arrays(frame["x"][visible], frame["y"][visible],
+                             frame["color"][visible].astype(np.float32) / 255, city_map.frustum)
+        draw_hud(text_renderer, counter, reader.params)
+        draw_playback(text_renderer, playback.time, reader.duration, playback.speed, playback.paused)
+        pygame.display.flip()
+        playback.advance(clock.tick(30) / 1000)
+
+    city_map.release()
+    text_renderer.release()
+    pygame.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded simulation run.")
+    parser.add_argument("path", help="Trajectory file written by run_headless(..., trajectory_path=...)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Simulated seconds per real second")
+    parser.add_argument("--start", type=float, default=0.0, help="Simulated time to start at")
+    args = parser.parse_args()
+    replay(TrajectoryReader(args.path), speed=args.speed, start=args.start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+# rng.py
+import hashlib
+import random
+
+
+class SimulationRNG(random.Random):
+    """Seeded random stream for one simulation run.
+
+    A random.Random that remembers its seed, so random and uniform in the hot loops
+    (movement, infection checks) cost exactly what the generator itself does. randint and
+    choice map a single random() draw, as they always have, so seeded runs don't change.
+    """
+
+    def seed(self, a=None, version=2):
+        """Reseed the stream (random.Random.__init__ calls this); the seed is kept in initial_seed."""
+        if a is None:
+            # Record an explicit seed so even unseeded runs can be reproduced
+            a = random.SystemRandom().getrandbits(64)
+        self.initial_seed = a
+        super().seed(a, version)
+
+    def randint(self, a, b):
+        """Random integer in [a, b], including both end points."""
+        if b < a:
+            raise ValueError(f"empty range in randint({a}, {b})")
+        return a + int(self.random() * (b - a + 1))
+
+    def choice(self, seq):
+        return seq[int(self.random() * len(seq))]
+
+    def child_seed(self, key):
+        """Seed of the child stream identified by key (any repr-able value)."""
+        digest = hashlib.sha256(repr((self.initial_seed, key)).encode()).digest()
+        return int.from_bytes(digest[:8], "little")
+
+    def getstate(self):
+        """Everything needed to continue this stream later: (seed, generator state)."""
+        return self.initial_seed, super().getstate()
+
+    def setstate(self, state):
+        """Restore a state returned by getstate()."""
+        self.initial_seed, generator_state = state
+        super().setstate(generator_state)
@@ -0,0 +1,61 @@
+# sim_clock.py
+import math
+import time
+
+
+class SimulationClock:
+    """Simulated time that advances in fixed steps of dt seconds, one step per tick.
+
+    Infection durations, the quarantine threshold and run time limits are measured
+    against this clock, so results don't depend on frame rate or machine load.
+    """
+
+    def __init__(self, dt=1 / 30):
+        self.dt = dt
+        self.ticks = 0
+
+    def now(self):
+        """Current simulated time in seconds."""
+        return self.ticks * self.dt
+
+    def tick(self):
+        """Advance simulated time by one step."""
+        self.ticks += 1
+
+
+class WallClock:
+    """Real time, for agents created outside a simulation run."""
+
+    def now(self):
+        return time.time()
+
+
+class FixedTimestep:
+    """Turns real frame times into whole simulation steps at a fixed rate.
+
+    Real time accrues at `rate` steps per second. Each frame runs the whole steps owed, at
+    most max_steps (default: a tenth of a second's worth) so a machine that can't keep up
+    falls behind instead of spiralling. The steps given up that way are counted in
+    `dropped`: a run with dropped steps ran slower than `rate` in real time. `alpha` is the
+    part of the next step already accrued, for interpolating the rendered positions
+    between the last two steps.
+    """
+
+    def __init__(self, rate=30, max_steps=None):
+        self.rate = rate
+        self.max_steps = max_steps if max_steps is not None else max(1, math.ceil(rate / 10))
+        self.owed = 0.0
+        self.dropped = 0.0
+
+    def advance(self, seconds):
+        """Add `seconds` of real time; returns the number of steps to run now."""
+        owed = self.owed + seconds * self.rate
+        self.owed = min(owed, self.max_steps + 1.0)
+        self.dropped += owed - self.owed
+        steps = min(int(self.owed), self.max_steps)
+        self.owed -= steps
+        return steps
+
+    @property
+    def alpha(self):
+        return min(self.owed, 1.0)
@@ -0,0 +1,39 @@
+# spatial.py
+import math
+
+
+class SpatialGrid:
+    """Uniform grid that buckets agents by position so contact checks only look at nearby cells."""
+
+    def __init__(self, cell_size):
+        # A cell at least as wide as the infection radius means every agent within range
+        # of a point lies in that point's cell or one of its eight neighbours.
+        self.cell_size = max(cell_size, 1e-6)
+        self.cells = {}
+
+    def cell_of(self, x, y):
+        """Return the (column, row) key of the cell containing (x, y)."""
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def rebuild(self, agents):
+        """Re-bucket the given agents at their current positions."""
+        cells = {}
+        cell_size = self.cell_size
+        for agent in agents:
+            key = (math.floor(agent.x / cell_size), math.floor(agent.y / cell_size))
+            bucket = cells.get(key)
+            if bucket is None:
+                cells[key] = [agent]
+            else:
+                bucket.append(agent)
+        self.cells = cells
+
+    def nearby(self, x, y):
+        """Yield the agents in the cell containing (x, y) and its eight neighbours."""
+        cx, cy = self.cell_of(x, y)
+        cells = self.cells
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                bucket = cells.get((cx + dx, cy + dy))
+                if bucket:
+                    yield from bucket
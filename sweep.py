@@ -0,0 +1,163 @@
+# sweep.py
+"""Parallel parameter sweeps: headless runs fanned out over a process pool."""
+import argparse
+import json
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from engine import PARAM_SETS, make_result, params_to_dict, run_headless
+from rng import SimulationRNG
+
+
+def available_cores():
+    """Number of CPU cores this process may run on."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # Not available on Windows/macOS
+        return os.cpu_count() or 1
+
+
+def run_one(params, replicate, seed, run_options):
+    """Worker entry point: one headless run with its own seed.
+
+    Errors are returned as part of the result so a failing configuration
+    doesn't take the rest of the sweep down with it.
+    """
+    result = {"replicate": replicate, "seed": seed}
+    run_options = dict(run_options)
+    series_dir = run_options.pop("series_dir", None)
+    if series_dir:
+        run_options["series_path"] = result["series"] = os.path.join(series_dir, f"run_{seed}.csv")
+    trajectory_dir = run_options.pop("trajectory_dir", None)
+    if trajectory_dir:
+        run_options["trajectory_path"] = result["trajectory"] = os.path.join(trajectory_dir, f"run_{seed}.traj")
+    checkpoint_dir = run_options.pop("checkpoint_dir", None)
+    if checkpoint_dir:
+        # Rerunning the sweep continues interrupted runs from their last checkpoint
+        run_options.update(checkpoint_path=os.path.join(checkpoint_dir, f"run_{seed}.ckpt"), resume=True)
+    try:
+        stats = {}
+        counts = run_headless(params, seed=seed, stats=stats, **run_options)
+        result.update(make_result(params, counts))
+        result["peak"] = {"infected": stats["peak_infected"], "time": stats["peak_time"]}
+    except Exception:
+        result["parameters"] = params_to_dict(params)
+        result["error"] = traceback.format_exc()
+    return result
+
+
+def _failed(job, exc):
+    params, replicate, run_seed = job
+    return {"replicate": replicate, "seed": run_seed,
+            "parameters": params_to_dict(params), "error": repr(exc)}
+
+
+def _run_isolated(jobs, workers, run_options):
+    """Run each job in its own single-process pool, so a crash only loses that job."""
+    for start in range(0, len(jobs), workers):
+        batch = jobs[start:start + workers]
+        pools = [ProcessPoolExecutor(max_workers=1) for _ in batch]
+        futures = {pool.submit(run_one, *job, run_options): job for pool, job in zip(pools, batch)}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except BrokenProcessPool as exc:
+                yield _failed(futures[future], exc)
+        for pool in pools:
+            pool.shutdown()
+
+
+def run_sweep(param_sets, replicates=1, workers=None, seed=None, **run_options):
+    """Run every parameter set `replicates` times across a process pool.
+
+    Results are yielded as soon as each run finishes, in completion order. If a worker
+    process dies outright, the runs lost with the pool are retried one per process, so
+    only the crashing configuration is reported as failed. Extra keyword arguments
+    (time_limit, num_agents, vectorized, ...) are passed to run_headless.
+    """
+    # Every run gets its own child stream of the sweep's root seed
+    root = SimulationRNG(seed)
+    jobs = [(params, replicate, root.child_seed((index, replicate)))
+            for index, params in enumerate(param_sets) for replicate in range(replicates)]
+    yield from run_jobs(jobs, workers, run_options)
+
+
+def run_jobs(jobs, workers=None, run_options=None):
+    """Run (params, replicate, seed) jobs across a process pool, yielding results as they finish.
+
+    If a worker process dies outright, the runs lost with the pool are retried one per
+    process, so only the crashing configuration is reported as failed.
+    """
+    workers = workers or available_cores()
+    run_options = run_options or {}
+    lost = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_one, *job, run_options): job for job in jobs}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except BrokenProcessPool:
+                lost.append(futures[future])
+
+    yield from _run_isolated(lost, workers, run_options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a headless parameter sweep in parallel.")
+    parser.add_argument("--params", help="JSON file with a list of [radius, probability, duration, mortality, quarantine] sets")
+    parser.add_argument("--replicates", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--time-limit", type=float, default=20)
+    parser.add_argument("--agents", type=int, default=None)
+    parser.add_argument("--vectorized", action="store_true")
+    parser.add_argument("--output", default="sweep_results.ndjson")
+    parser.add_argument("--series-dir", help="Directory for per-run time series (run_<seed>.csv)")
+    parser.add_argument("--series-every", type=int, default=1, help="Record the time series every N ticks")
+    parser.add_argument("--trajectory-dir", help="Directory for per-run recordings (run_<seed>.traj) to view with replay.py")
+    parser.add_argument("--trajectory-every", type=int, default=1, help="Record the trajectories every N ticks")
+    parser.add_argument("--checkpoint-dir", help="Directory for per-run checkpoints (run_<seed>.ckpt); "
+                                                 "rerunning with the same seed resumes interrupted runs")
+    parser.add_argument("--checkpoint-every", type=int, default=300, help="Checkpoint every N ticks")
+    parser.add_argument("--screen-attack", type=float, nargs=2, metavar=("LOW", "HIGH"),
+                        help="Only run sets whose mean-field attack rate is in [LOW, HIGH] (see meanfield.py)")
+    args = parser.parse_args()
+
+    param_sets = PARAM_SETS
+    if args.params:
+        with open(args.params, "r") as file:
+            param_sets = [tuple(params) for params in json.load(file)]
+
+    if args.screen_attack:
+        from meanfield import MeanFieldSIRD, screen
+        model = MeanFieldSIRD(num_agents=args.agents) if args.agents is not None else MeanFieldSIRD()
+        screened = screen(param_sets, args.screen_attack, model, args.time_limit)
+        print(f"Screening kept {len(screened)} of {len(param_sets)} parameter sets")
+        param_sets = screened
+
+    run_options = {"time_limit": args.time_limit, "vectorized": args.vectorized}
+    if args.agents is not None:
+        run_options["num_agents"] = args.agents
+    if args.series_dir:
+        os.makedirs(args.series_dir, exist_ok=True)
+        run_options.update(series_dir=args.series_dir, series_every=args.series_every)
+    if args.trajectory_dir:
+        os.makedirs(args.trajectory_dir, exist_ok=True)
+        run_options.update(trajectory_dir=args.trajectory_dir, trajectory_every=args.trajectory_every)
+    if args.checkpoint_dir:
+        os.makedirs(args.checkpoint_dir, exist_ok=True)
+        run_options.update(checkpoint_dir=args.checkpoint_dir, checkpoint_every=args.checkpoint_every)
+
+    # One JSON line per finished run, flushed immediately so nothing is lost on a crash
+    with open(args.output, "w") as file:
+        for result in run_sweep(param_sets, args.replicates, args.workers, args.seed, **run_options):
+            file.write(json.dumps(result) + "\n")
+            file.flush()
+            status = "failed" if "error" in result else "done"
+            print(f"{status}: {result['parameters']} replicate {result['replicate']}")
+
+
+if __name__ == "__main__":
+    main()
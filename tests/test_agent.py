@@ -0,0 +1,50 @@
+# test_agent.py
+import pytest
+
+from agent import Agent
+from city import CityLayout
+from compartments import CompartmentCounter, INFECTED, RECOVERED, DECEASED
+from engine import run_headless
+from events import EventScheduler
+from rng import SimulationRNG
+from sim_clock import SimulationClock
+
+
+def make_agent(clock, mortality_rate=0.0, duration=2, scheduler=None):
+    rng = SimulationRNG(1)
+    city_map = CityLayout(5, 2, 1, 1, rng)
+    counter = CompartmentCounter()
+    agent = Agent(5, 2, 1, city_map, infection_duration=duration, mortality_rate=mortality_rate,
+                  road_buffer=0.001, clock=clock, rng=rng, counter=counter, scheduler=scheduler)
+    return agent, counter
+
+
+def advance(clock, seconds, agent, scheduler=None):
+    """Tick the clock for `seconds` of simulated time, running the agent's timers each tick."""
+    for _ in range(round(seconds / clock.dt)):
+        clock.tick()
+        if scheduler is not None:
+            scheduler.run_due()
+        else:
+            agent.update_infection_status()
+
+
+@pytest.mark.parametrize("use_scheduler", [False, True])
+@pytest.mark.parametrize("mortality_rate, outcome", [(0.0, RECOVERED), (1.0, DECEASED)])
+def test_infection_resolves_after_its_duration_in_simulated_time(use_scheduler, mortality_rate, outcome):
+    clock = SimulationClock(0.1)
+    scheduler = EventScheduler(clock) if use_scheduler else None
+    agent, counter = make_agent(clock, mortality_rate, duration=2, scheduler=scheduler)
+    agent.become_infected()
+    advance(clock, 1.9, agent, scheduler)
+    assert agent.compartment == INFECTED
+    advance(clock, 0.1, agent, scheduler)
+    assert agent.compartment == outcome
+    assert counter[outcome] == 1 and counter[INFECTED] == 0
+
+
+@pytest.mark.parametrize("dt", [1 / 30, 1 / 60, 1 / 10])
+def test_durations_are_seconds_not_ticks(dt):
+    """A 2 s infection is over by 3 s and still running at 1.5 s, whatever the tick length."""
+    assert run_headless((0.5, 0.0, 2, 0, 4), time_limit=3, seed=1, dt=dt) == (0, 49, 1, 0)
+    assert run_headless((0.5, 0.0, 2, 0, 4), time_limit=1.5, seed=1, dt=dt) == (1, 49, 0, 0)
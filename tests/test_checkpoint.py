@@ -0,0 +1,59 @@
+# test_checkpoint.py
+import numpy as np
+import pytest
+
+from checkpoint import read_checkpoint, restore, snapshot, write_checkpoint
+from compartments import INFECTED, HEALTHY
+from engine import PARAM_SETS, run_headless
+
+PARAMS = (0.6, 0.9, 15, 0.25, 4)
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "run.ckpt")
+    arrays = {"a": np.arange(10, dtype=np.int64), "b": np.linspace(0, 1, 6).reshape(2, 3)}
+    write_checkpoint(path, {"ticks": 7, "name": "run"}, arrays)
+    meta, loaded = read_checkpoint(path)
+    assert meta == {"ticks": 7, "name": "run"}
+    for name, array in arrays.items():
+        np.testing.assert_array_equal(loaded[name], array)
+        assert loaded[name].dtype == array.dtype
+
+
+@pytest.mark.parametrize("vectorized", [False, True])
+def test_snapshot_is_a_copy(tmp_path, vectorized):
+    """A snapshot written after the run moved on still holds the state it was taken at."""
+    path = str(tmp_path / "run.ckpt")
+    run_headless(PARAMS, time_limit=2, seed=3, vectorized=vectorized, checkpoint_path=path, checkpoint_every=30)
+    run = restore(path)
+    counts = run["counter"].totals()
+    meta, arrays = snapshot(run["params"], run["clock"], run["rng"], run["city_map"], run["counter"],
+                            run.get("agents"), run.get("population"), options={"stats": {"peak": 1}},
+                            scheduler=run.get("scheduler"))
+    run["counter"].counts[INFECTED] += 5
+    run["counter"].counts[HEALTHY] -= 5
+    write_checkpoint(path, meta, arrays)
+    assert restore(path)["counter"].totals() == counts
+
+
+@pytest.mark.parametrize("vectorized", [False, True])
+@pytest.mark.parametrize("params, seed, interrupted", [(PARAMS, 3, 10), (PARAM_SETS[4], 3, 10.5)])
+def test_resume_matches_uninterrupted(tmp_path, vectorized, params, seed, interrupted):
+    path = str(tmp_path / "run.ckpt")
+    expected_stats, stats = {}, {}
+    expected = run_headless(params, seed=seed, vectorized=vectorized, stats=expected_stats)
+    run_headless(params, time_limit=interrupted, seed=seed, vectorized=vectorized,
+                 checkpoint_path=path, checkpoint_every=100)
+    resumed = run_headless(params, seed=seed, vectorized=vectorized, checkpoint_path=path,
+                           checkpoint_every=100, resume=True, stats=stats)
+    assert resumed == expected
+    assert stats == expected_stats
+
+
+def test_resume_continues_series(tmp_path):
+    path, series, expected_series = (str(tmp_path / name) for name in ("run.ckpt", "resumed.csv", "full.csv"))
+    run_headless(PARAMS, seed=5, series_path=expected_series)
+    run_headless(PARAMS, time_limit=10, seed=5, checkpoint_path=path, checkpoint_every=100, series_path=series)
+    run_headless(PARAMS, seed=5, checkpoint_path=path, checkpoint_every=100, resume=True, series_path=series)
+    with open(series) as resumed, open(expected_series) as full:
+        assert resumed.read() == full.read()
@@ -0,0 +1,54 @@
+# test_city.py
+import numpy as np
+import pytest
+
+from city import CityLayout, RoadIndex
+
+
+def scan_is_on_road(x, y, city_size, building_size, road_width, buffer=0.05):
+    """Agent.is_on_road as it was before RoadIndex: a scan over every road."""
+    cell_size = building_size + road_width
+    for i in range(city_size):
+        y_pos = (i + 1) * cell_size - road_width
+        if buffer <= x <= city_size * cell_size - buffer and y_pos + buffer <= y <= y_pos + road_width - buffer:
+            return True
+    for j in range(city_size):
+        x_pos = (j + 1) * cell_size - road_width
+        if buffer <= y <= city_size * cell_size - buffer and x_pos + buffer <= x <= x_pos + road_width - buffer:
+            return True
+        if buffer <= x <= city_size * cell_size - buffer and -road_width <= y <= buffer:
+            return True
+        if buffer <= y <= city_size * cell_size - buffer and -road_width <= x <= buffer:
+            return True
+    return False
+
+
+@pytest.mark.parametrize("city_size, building_size, road_width", [(5, 2, 1), (1, 2, 1), (7, 1.5, 0.4), (12, 3, 0.25)])
+def test_road_index_matches_scan(city_size, building_size, road_width):
+    index = RoadIndex(city_size, building_size, road_width)
+    rng = np.random.default_rng(0)
+    extent = city_size * (building_size + road_width)
+    points = list(rng.uniform(-road_width - 1, extent + 1, size=(4000, 2)))
+    # Points on and just beside every band edge, where rounding matters
+    edges = [start + offset for start in index.road_starts + [-road_width, 0]
+             for offset in (0, 0.05, road_width - 0.05, road_width)]
+    for edge in edges:
+        for delta in (-1e-9, 0, 1e-9):
+            points += [(edge + delta, extent / 2), (extent / 2, edge + delta), (edge + delta, edge + delta)]
+
+    x, y = np.array(points).T
+    expected = np.array([scan_is_on_road(px, py, city_size, building_size, road_width) for px, py in points])
+    assert [index.contains(px, py) for px, py in points] == expected.tolist()
+    np.testing.assert_array_equal(index.contains_array(x, y), expected)
+
+
+def test_graves_follow_their_order():
+    city_map = CityLayout(5, 2, 1, 1)
+    for _ in range(6):
+        city_map.add_grave()
+    start_x, start_y = city_map.graveyard_start_x, city_map.graveyard_start_y
+    assert list(city_map.graves)[4] == (start_x, start_y + 0.5)
+    city_map.graves.resize(2)
+    assert len(city_map.graves) == 2
+    city_map.graves.resize(6)
+    assert list(city_map.graves)[5] == (start_x + 0.5, start_y + 0.5)
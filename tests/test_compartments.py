@@ -0,0 +1,64 @@
+# test_compartments.py
+from city import CityLayout
+from compartments import DECEASED, HEALTHY, INFECTED, RECOVERED, CompartmentCounter
+from engine import (BUILDING_HEIGHT, BUILDING_SIZE, CITY_SIZE, ROAD_WIDTH, count_states, create_agents,
+                    create_contact_grid, step)
+from events import EventScheduler
+from population import Population
+from rng import SimulationRNG
+from sim_clock import SimulationClock
+
+PARAMS = (0.6, 0.9, 1, 0.5, 2)  # Infections resolve within the run, some as deaths
+
+
+def test_transitions_move_totals():
+    counter = CompartmentCounter()
+    counter.add(HEALTHY, 10)
+    counter.transition(HEALTHY, INFECTED, 3, time=1.0)
+    counter.transition(INFECTED, DECEASED, 1, time=2.0)
+    counter.transition(INFECTED, RECOVERED, time=2.5)
+    assert counter.totals() == (1, 7, 1, 1)
+    assert counter[HEALTHY] == 7
+    assert counter.total == 10
+
+
+def test_listeners_see_updated_totals_until_unsubscribed():
+    counter = CompartmentCounter()
+    counter.add(HEALTHY, 5)
+    seen = []
+    listener = counter.subscribe(lambda old, new, count, time: seen.append((old, new, count, time, counter[new])))
+    counter.transition(HEALTHY, INFECTED, 2, time=0.5)
+    counter.unsubscribe(listener)
+    counter.transition(INFECTED, RECOVERED, 1, time=1.0)
+    assert seen == [(HEALTHY, INFECTED, 2, 0.5, 2)]
+
+
+def test_agent_engine_counts_match_a_scan():
+    rng = SimulationRNG(4)
+    city_map = CityLayout(CITY_SIZE, BUILDING_SIZE, ROAD_WIDTH, BUILDING_HEIGHT, rng)
+    clock = SimulationClock()
+    counter = CompartmentCounter()
+    scheduler = EventScheduler(clock)
+    agents = create_agents(PARAMS, city_map, clock, 40, rng, counter, scheduler)
+    grid = create_contact_grid(PARAMS)
+    for tick in range(300):
+        step(agents, grid, scheduler)
+        clock.tick()
+        if tick % 50 == 0:
+            assert counter.totals() == count_states(agents)
+    assert counter.total == 40
+    assert counter[RECOVERED] + counter[DECEASED] > 0
+
+
+def test_population_counts_match_its_arrays():
+    rng = SimulationRNG(4)
+    city_map = CityLayout(CITY_SIZE, BUILDING_SIZE, ROAD_WIDTH, BUILDING_HEIGHT, rng)
+    clock = SimulationClock()
+    counter = CompartmentCounter()
+    population = Population.from_params(PARAMS, city_map, 40, seed=5, clock=clock, counter=counter)
+    for _ in range(300):
+        population.step()
+        clock.tick()
+    assert counter.total == 40
+    assert counter.totals() == population.count_states()
+    assert counter[RECOVERED] + counter[DECEASED] > 0
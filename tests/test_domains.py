@@ -0,0 +1,58 @@
+# test_domains.py
+from statistics import fmean, stdev
+
+import numpy as np
+
+from domains import HALO, OUTBOX, SharedArrays, _Mailbox, _MailboxReader, run_domains
+from engine import PARAM_SETS, run_headless
+
+AGENTS = 200
+
+
+def test_mailbox_grows_and_readers_follow():
+    shared = SharedArrays({"mailbox_names": ("S64", (2, 2)), "mailbox_capacity": (np.int64, (2, 2)),
+                           "mailbox_count": (np.int64, (2, 2))})
+    mailbox = _Mailbox(HALO, 1, shared, np.int32)
+    reader = _MailboxReader(shared, np.int32)
+    try:
+        mailbox.post(np.arange(3, dtype=np.int32), bound=4)
+        first = mailbox.capacity
+        np.testing.assert_array_equal(reader.read(HALO, 1), [0, 1, 2])
+        assert reader.read(OUTBOX, 1).size == 0  # Nothing posted yet
+
+        mailbox.post(np.arange(first + 10, dtype=np.int32), bound=first + 10)
+        assert mailbox.capacity >= first + 10
+        np.testing.assert_array_equal(reader.read(HALO, 1), np.arange(first + 10))
+        mailbox.post(np.array([7], dtype=np.int32), bound=1)
+        np.testing.assert_array_equal(reader.read(HALO, 1), [7])
+    finally:
+        reader.close()
+        mailbox.close()
+        shared.close()
+        shared.unlink()
+
+
+def test_deaths_reach_the_parent():
+    """Everyone is infected on the first tick and dies at 2 s: all graves are dug by 5 s."""
+    stats = {}
+    assert run_domains((100, 1.0, 2, 1, 4), workers=2, time_limit=5, num_agents=60, seed=1, stats=stats) == (0, 0, 0, 60)
+    assert stats == {"peak_infected": 60, "peak_time": 0.0, "graves": 60}
+
+
+def test_seeded_runs_repeat():
+    options = {"workers": 2, "time_limit": 5, "num_agents": AGENTS, "seed": 4}
+    first = run_domains(PARAM_SETS[4], **options)
+    assert run_domains(PARAM_SETS[4], **options) == first
+    assert sum(first) == AGENTS
+
+
+def test_matches_single_process_statistically():
+    """Each worker has its own random stream, so the split run only matches the single-process
+    engine in distribution: the mean number ever infected must agree."""
+    params, seeds = PARAM_SETS[4], range(16)
+    domains = [AGENTS - run_domains(params, workers=2, time_limit=8, num_agents=AGENTS, seed=seed)[1]
+               for seed in seeds]
+    single = [AGENTS - run_headless(params, time_limit=8, num_agents=AGENTS, seed=seed, vectorized=True)[1]
+              for seed in seeds]
+    standard_error = (stdev(domains) ** 2 / len(domains) + stdev(single) ** 2 / len(single)) ** 0.5
+    assert abs(fmean(domains) - fmean(single)) < 3 * standard_error
@@ -0,0 +1,47 @@
+# test_engine.py
+from statistics import fmean, stdev
+
+import pytest
+
+from engine import PARAM_SETS, run_headless
+from sweep import run_jobs
+
+# Parameter sets whose outcome doesn't depend on the random draws: nobody else is infected
+# (probability 0), or everyone is infected on the first tick (radius wider than the city)
+DETERMINISTIC = [
+    ((0.5, 0.0, 2, 0, 4), (0, 49, 1, 0)),
+    ((0.5, 0.0, 2, 1, 4), (0, 49, 0, 1)),
+    ((0.5, 0.0, 15, 1, 4), (1, 49, 0, 0)),
+    ((100, 1.0, 2, 0, 4), (0, 0, 50, 0)),
+    ((100, 1.0, 2, 1, 4), (0, 0, 0, 50)),
+    ((100, 1.0, 30, 1, 4), (50, 0, 0, 0)),
+]
+STATISTICAL_SEEDS = 30
+
+
+@pytest.mark.parametrize("vectorized", [False, True])
+@pytest.mark.parametrize("params, expected", DETERMINISTIC)
+def test_engines_agree_on_deterministic_runs(params, expected, vectorized):
+    assert run_headless(params, time_limit=10, seed=1, vectorized=vectorized) == expected
+
+
+@pytest.mark.parametrize("vectorized", [False, True])
+def test_seeded_runs_repeat(vectorized):
+    params = (0.5, 0.9, 15, 0.25, 4)
+    first = run_headless(params, time_limit=10, seed=4, vectorized=vectorized)
+    assert run_headless(params, time_limit=10, seed=4, vectorized=vectorized) == first
+    assert sum(first) == 50
+
+
+@pytest.mark.parametrize("params", PARAM_SETS)
+def test_engines_agree_statistically(params):
+    """The agent and NumPy engines draw from different generators, so only their
+    distributions over seeds can be compared: the mean number ever infected must agree."""
+    ever_infected = {}
+    for vectorized in (False, True):
+        results = run_jobs([(params, seed, seed) for seed in range(STATISTICAL_SEEDS)],
+                           run_options={"time_limit": 20, "vectorized": vectorized})
+        ever_infected[vectorized] = [50 - result["final_counts"]["healthy"] for result in results]
+    agents, population = ever_infected[False], ever_infected[True]
+    standard_error = (stdev(agents) ** 2 / len(agents) + stdev(population) ** 2 / len(population)) ** 0.5
+    assert abs(fmean(agents) - fmean(population)) < 3 * standard_error
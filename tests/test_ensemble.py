@@ -0,0 +1,60 @@
+# test_ensemble.py
+import pytest
+
+from ensemble import confidence_interval, run_ensemble, t_quantile
+
+# Two-sided critical values of Student's t distribution
+T_TABLE = {
+    (0.975, 1): 12.7062047, (0.975, 2): 4.3026527, (0.975, 3): 3.1824463, (0.975, 4): 2.7764451,
+    (0.975, 5): 2.5705818, (0.975, 10): 2.2281389, (0.975, 30): 2.0422725,
+    (0.995, 1): 63.6567412, (0.995, 2): 9.9248432, (0.995, 3): 5.8409093, (0.995, 4): 4.6040949,
+    (0.995, 5): 4.0321430, (0.995, 10): 3.1692727, (0.95, 5): 2.0150484,
+}
+
+QUIET = (0.5, 0.0, 15, 0.25, 4)  # Nobody else is ever infected, so every replicate is the same
+NOISY = (0.8, 1.0, 20, 0.5, 4)
+RUN_OPTIONS = {"time_limit": 3, "num_agents": 30, "workers": 1, "seed": 1}
+
+
+@pytest.mark.parametrize("p, df", T_TABLE)
+def test_t_quantile(p, df):
+    exact = T_TABLE[p, df]
+    assert t_quantile(p, df) == pytest.approx(exact, rel=1e-3 if df > 4 else 1e-7)
+    assert t_quantile(1 - p, df) == pytest.approx(-t_quantile(p, df))
+
+
+def test_confidence_interval():
+    interval = confidence_interval([1, 2, 3], 0.95)
+    assert interval["mean"] == 2
+    assert interval["half_width"] == pytest.approx(4.3026527 / 3 ** 0.5)
+    assert confidence_interval([4, 4, 4])["half_width"] == 0
+
+
+def test_quiet_sets_stop_at_min_replicates():
+    quiet, noisy = run_ensemble([QUIET, NOISY], tolerance=0.5, min_replicates=4, max_replicates=12,
+                                **RUN_OPTIONS)
+    assert quiet["converged"] and quiet["replicates"] == 4
+    assert quiet["metrics"]["infected"]["half_width"] == 0
+    assert noisy["replicates"] > 4
+    assert noisy["replicates"] <= 12
+    assert noisy["converged"] == (noisy["metrics"]["infected"]["half_width"] <= 0.5)
+
+
+def test_loose_tolerance_stops_at_min_replicates():
+    reports = run_ensemble([NOISY], tolerance=100, min_replicates=3, **RUN_OPTIONS)
+    assert reports[0]["converged"] and reports[0]["replicates"] == 3
+
+
+def test_budget_caps_the_runs():
+    results = []
+    reports = run_ensemble([QUIET, NOISY], tolerance=0.01, min_replicates=3, budget=10,
+                           on_result=results.append, **RUN_OPTIONS)
+    assert len(results) == 10
+    assert [report["replicates"] for report in reports] == [3, 7]
+
+
+def test_rejects_too_few_replicates():
+    with pytest.raises(ValueError):
+        run_ensemble([NOISY], min_replicates=1)
+    with pytest.raises(ValueError):
+        run_ensemble([QUIET, NOISY], min_replicates=5, budget=8)
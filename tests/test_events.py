@@ -0,0 +1,154 @@
+# test_events.py
+import numpy as np
+import pytest
+
+from checkpoint import read_checkpoint, restore, snapshot, write_checkpoint
+from city import CityLayout
+from compartments import CompartmentCounter
+from engine import BUILDING_HEIGHT, BUILDING_SIZE, CITY_SIZE, ROAD_WIDTH, create_agents, create_contact_grid, step
+from events import GRAVEYARD, QUARANTINE, RESOLVE, EventScheduler
+from population import GRAVEYARD_EVENT, INFECTED, QUARANTINE_EVENT, REMOVED, RESOLVE_EVENT, Population
+from rng import SimulationRNG
+from sim_clock import SimulationClock
+
+PARAMS = (0.6, 0.9, 6, 0.5, 4)  # Quarantine (at 5 s) comes before the outcome
+
+
+class Recorder:
+    def __init__(self, name, log):
+        self.name = name
+        self.log = log
+
+    def handle_event(self, kind, time, payload=None):
+        self.log.append((self.name, kind, time, payload))
+
+
+def test_events_run_in_time_then_schedule_order():
+    clock = SimulationClock(0.5)
+    scheduler = EventScheduler(clock)
+    log = []
+    a, b = Recorder("a", log), Recorder("b", log)
+    scheduler.schedule(1.0, RESOLVE, a, True)
+    scheduler.schedule(0.5, QUARANTINE, b)
+    scheduler.schedule(1.0, QUARANTINE, b)
+    scheduler.schedule(2.0, GRAVEYARD, a)
+    assert scheduler.run_due() == 0  # Nothing is due at 0
+    clock.tick()
+    clock.tick()
+    assert scheduler.run_due() == 3
+    assert log == [("b", QUARANTINE, 0.5, None), ("a", RESOLVE, 1.0, True), ("b", QUARANTINE, 1.0, None)]
+    assert len(scheduler) == 1
+    assert scheduler.run_due(now=5) == 1
+    assert log[-1] == ("a", GRAVEYARD, 2.0, None)
+
+
+def test_cancelled_events_do_not_run():
+    scheduler = EventScheduler(SimulationClock())
+    log = []
+    agent = Recorder("a", log)
+    first = scheduler.schedule(1.0, QUARANTINE, agent)
+    scheduler.schedule(2.0, RESOLVE, agent, False)
+    scheduler.cancel(first)
+    assert len(scheduler) == 1
+    assert [event[1] for event in scheduler.pending()] == [1]
+    assert scheduler.run_due(now=3) == 1
+    assert log == [("a", RESOLVE, 2.0, False)]
+    assert len(scheduler) == 0 and not scheduler.cancelled
+    scheduler.cancel(scheduler.schedule(4.0, GRAVEYARD, agent))
+    scheduler.clear()
+    assert len(scheduler) == 0 and scheduler.pending() == []
+
+
+def simulate_agents(ticks):
+    rng = SimulationRNG(6)
+    city_map = CityLayout(CITY_SIZE, BUILDING_SIZE, ROAD_WIDTH, BUILDING_HEIGHT, rng)
+    clock = SimulationClock()
+    counter = CompartmentCounter()
+    scheduler = EventScheduler(clock)
+    agents = create_agents(PARAMS, city_map, clock, 40, rng, counter, scheduler)
+    grid = create_contact_grid(PARAMS)
+    for _ in range(ticks):
+        step(agents, grid, scheduler)
+        clock.tick()
+    return PARAMS, clock, rng, city_map, counter, agents, scheduler
+
+
+def event_list(scheduler, agents):
+    index = {id(agent): i for i, agent in enumerate(agents)}
+    return [(time, sequence, kind, index[id(agent)], payload)
+            for time, sequence, kind, agent, payload in scheduler.pending()]
+
+
+def test_scheduler_checkpoint_round_trip(tmp_path):
+    params, clock, rng, city_map, counter, agents, scheduler = simulate_agents(200)
+    cancelled = scheduler.pending()[0][1]
+    scheduler.cancel(cancelled)
+    expected = event_list(scheduler, agents)
+    assert expected and {kind for _, _, kind, _, _ in expected} >= {RESOLVE}
+
+    path = str(tmp_path / "run.ckpt")
+    write_checkpoint(path, *snapshot(params, clock, rng, city_map, counter, agents, scheduler=scheduler))
+    run = restore(path)
+    restored = run["scheduler"]
+    assert event_list(restored, run["agents"]) == expected
+    assert restored.sequence == scheduler.sequence
+    assert cancelled not in [event[1] for event in restored.queue]
+
+    # Both go on to run the same events
+    later = clock.now() + 10
+    log = []
+    for agent_list, events in ((agents, scheduler), (run["agents"], restored)):
+        handled = []
+        for i, agent in enumerate(agent_list):
+            agent.handle_event = lambda kind, time, payload=None, i=i: handled.append((i, kind, time, payload))
+        events.run_due(later)
+        log.append(handled)
+    assert log[0] == log[1] and log[0]
+
+
+def pending_events(population):
+    """Per kind, the agents whose events are still to come (without the graveyard events of
+    recovered agents, which do nothing)."""
+    queue = population.event_queue
+    pending = [queue[population.event_heads[kind]:population.event_count]
+               for kind in (QUARANTINE_EVENT, RESOLVE_EVENT, GRAVEYARD_EVENT)]
+    graveyard = pending[GRAVEYARD_EVENT]
+    recovered = (population.state[graveyard] == REMOVED) & ~population.deceased[graveyard]
+    pending[GRAVEYARD_EVENT] = graveyard[~recovered]
+    return [sorted(idx.tolist()) for idx in pending]
+
+
+def test_population_events_rebuild_from_agent_state():
+    rng = SimulationRNG(6)
+    city_map = CityLayout(CITY_SIZE, BUILDING_SIZE, ROAD_WIDTH, BUILDING_HEIGHT, rng)
+    clock = SimulationClock()
+    population = Population.from_params(PARAMS, city_map, 60, seed=2, clock=clock)
+    for _ in range(260):
+        population.step()
+        clock.tick()
+    pending = pending_events(population)
+    assert all(pending)  # Agents waiting for each kind of event
+
+    copy = population.take(np.arange(population.num_agents))
+    assert pending_events(copy) == pending
+    for kind in (QUARANTINE_EVENT, RESOLVE_EVENT, GRAVEYARD_EVENT):
+        due = copy.event_due[kind, copy.event_heads[kind]:copy.event_count]
+        assert np.all(np.diff(due) >= 0)
+        assert np.all(due > clock.now() - clock.dt)  # Only events not yet due
+
+
+@pytest.mark.parametrize("duration", [2, 15])
+def test_population_resolves_on_time(duration):
+    """The queue resolves each infection at the first tick at or after its duration."""
+    rng = SimulationRNG(1)
+    city_map = CityLayout(CITY_SIZE, BUILDING_SIZE, ROAD_WIDTH, BUILDING_HEIGHT, rng)
+    clock = SimulationClock()
+    population = Population.from_params((0.6, 1.0, duration, 0.5, 4), city_map, 50, seed=4, clock=clock)
+    while clock.now() <= duration + 2:
+        population.step()
+        resolved = population.state == REMOVED
+        start = population.infection_start_time
+        assert np.all(clock.now() - start[resolved] >= duration - 1e-9)
+        assert np.all(clock.now() - start[population.state == INFECTED] < duration + 1e-9)
+        clock.tick()
+    assert np.any(population.state == REMOVED)
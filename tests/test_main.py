@@ -0,0 +1,31 @@
+# test_main.py
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEADLESS_MODULES = ["main", "engine", "agent", "population", "sweep", "ensemble", "checkpoint",
+                    "trajectory", "domains", "meanfield", "bench"]
+
+
+@pytest.mark.parametrize("module", HEADLESS_MODULES)
+def test_headless_modules_import_no_rendering_dependencies(module):
+    code = (f"import sys, {module}; "
+            "print([name for name in ('pygame', 'OpenGL', 'PIL', 'matplotlib') if name in sys.modules])")
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == "[]"
+
+
+def test_headless_cli(tmp_path):
+    params, output = tmp_path / "sets.json", tmp_path / "results.json"
+    params.write_text(json.dumps([[0.5, 0.0, 2, 0, 4], [100, 1.0, 2, 1, 4]]))
+    subprocess.run([sys.executable, ROOT, "--params", str(params), "--headless", "--seed", "1",
+                    "--time-limit", "5", "--output", str(output)], check=True)
+    results = json.loads(output.read_text())
+    assert [result["final_counts"] for result in results] == [
+        {"infected": 0, "healthy": 49, "recovered": 1, "deceased": 0},
+        {"infected": 0, "healthy": 0, "recovered": 0, "deceased": 50},
+    ]
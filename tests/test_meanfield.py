@@ -0,0 +1,51 @@
+# test_meanfield.py
+import numpy as np
+import pytest
+
+from meanfield import MeanFieldSIRD, calibrate, screen
+
+PARAM_SETS = [(0.5, 0.3, 5, 0.2, 4), (0.5, 0.8, 5, 0.2, 4), (0.8, 1.0, 10, 0.5, 4)]
+
+
+def test_run_conserves_the_population():
+    model = MeanFieldSIRD(num_agents=50)
+    result = model.run(PARAM_SETS, time_limit=20)
+    total = result["infected"] + result["healthy"] + result["recovered"] + result["deceased"]
+    assert total == pytest.approx(np.full(len(PARAM_SETS), 50))
+    assert np.all(result["peak_infected"] >= result["infected"])
+    assert result["deceased"] == pytest.approx((result["recovered"] + result["deceased"])
+                                               * np.array([params[3] for params in PARAM_SETS]))
+
+
+def test_no_transmission_leaves_one_case():
+    model = MeanFieldSIRD(num_agents=50)
+    assert model.estimate((0.5, 0.0, 2, 1, 4), time_limit=10) == pytest.approx((0, 49, 0, 1))
+    assert model.estimate((0.5, 0.0, 15, 1, 4), time_limit=10) == pytest.approx((1, 49, 0, 0))
+
+
+def test_attack_rate_grows_with_probability_and_radius():
+    model = MeanFieldSIRD()
+    by_probability = model.run([(0.5, p, 10, 0.2, 4) for p in (0.2, 0.4, 0.6, 0.8, 1.0)])["attack_rate"]
+    by_radius = model.run([(r, 0.8, 10, 0.2, 4) for r in (0.2, 0.4, 0.6, 0.8)])["attack_rate"]
+    assert np.all(np.diff(by_probability) > 0)
+    assert np.all(np.diff(by_radius) > 0)
+
+
+def test_screen_keeps_sets_within_the_attack_range():
+    model = MeanFieldSIRD()
+    rates = model.run(PARAM_SETS)["attack_rate"]
+    low, high = sorted(rates)[0] + 1e-9, 1.0
+    assert screen(PARAM_SETS, (low, high), model) == [params for params, rate in zip(PARAM_SETS, rates) if rate >= low]
+    assert screen(PARAM_SETS, (0, 1), model) == PARAM_SETS
+
+
+def test_calibrate_picks_the_best_scale():
+    layout = {"num_agents": 20}
+    scales = (0.1, 1.0, 10.0)
+    scale, error = calibrate(PARAM_SETS, replicates=2, seed=3, time_limit=3, workers=1, scales=scales, **layout)
+    assert scale in scales
+    assert 0 <= error < 1
+    # Refitting over the best scale and one of the others must keep it
+    other = next(candidate for candidate in scales if candidate != scale)
+    assert calibrate(PARAM_SETS, replicates=2, seed=3, time_limit=3, workers=1, scales=(other, scale), **layout) \
+        == (scale, error)
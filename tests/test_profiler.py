@@ -0,0 +1,83 @@
+# test_profiler.py
+import json
+
+import pytest
+
+import profiler
+from profiler import FrameProfiler, NullProfiler
+
+
+class FakeClock:
+    def __init__(self):
+        self.ns = 0
+
+    def advance(self, ms):
+        self.ns += int(ms * 1e6)
+
+    def __call__(self):
+        return self.ns
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(profiler.time, "perf_counter_ns", clock)
+    return clock
+
+
+def run_frames(frame_profiler, clock, frames):
+    for frame in range(frames):
+        with frame_profiler.phase("update"):
+            clock.advance(2 + frame % 2)  # 2 and 3 ms in turn
+        with frame_profiler.phase("draw"):
+            clock.advance(4)
+        with frame_profiler.phase("update"):
+            clock.advance(1)  # A phase entered twice adds up
+        clock.advance(1)
+        frame_profiler.end_frame()
+
+
+def test_summary_averages_each_phase(clock):
+    frame_profiler = FrameProfiler(history=4, refresh_every=4)
+    run_frames(frame_profiler, clock, 3)
+    assert frame_profiler.summary == ()  # Not refreshed yet
+    run_frames(frame_profiler, clock, 5)
+    assert frame_profiler.frames == 8
+    assert frame_profiler.summary == frame_profiler.averages()
+    names = [name for name, _ in frame_profiler.summary]
+    assert names == ["update", "draw", "frame"]
+    means = dict(frame_profiler.summary)
+    assert means["update"] == pytest.approx(3.5)
+    assert means["draw"] == pytest.approx(4)
+    assert means["frame"] == pytest.approx(8.5)
+
+
+def test_trace_export(clock, tmp_path):
+    frame_profiler = FrameProfiler(trace=True)
+    frame_profiler.mark("run", params=[1, 2])
+    run_frames(frame_profiler, clock, 2)
+    path = tmp_path / "trace.json"
+    frame_profiler.export_trace(str(path))
+    events = json.loads(path.read_text())["traceEvents"]
+    phases = [event for event in events if event["ph"] == "X" and event["tid"] == 0]
+    frames = [event for event in events if event["ph"] == "X" and event["tid"] == 1]
+    assert [event["name"] for event in phases] == ["update", "draw", "update"] * 2
+    assert [event["dur"] for event in frames] == [8000, 9000]
+    assert [event["args"]["frame"] for event in frames] == [0, 1]
+    assert [event["name"] for event in events if event["ph"] == "i"] == ["run"]
+
+
+def test_no_trace_events_unless_asked(clock):
+    frame_profiler = FrameProfiler()
+    frame_profiler.mark("run")
+    run_frames(frame_profiler, clock, 2)
+    assert frame_profiler.events == []
+
+
+def test_null_profiler_does_nothing():
+    null = NullProfiler()
+    with null.phase("update"):
+        pass
+    null.end_frame()
+    null.mark("run")
+    assert not null.enabled and null.summary == ()
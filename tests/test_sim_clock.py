@@ -0,0 +1,30 @@
+# test_sim_clock.py
+import pytest
+
+from sim_clock import FixedTimestep, SimulationClock
+
+
+def test_simulation_clock():
+    clock = SimulationClock(0.5)
+    for _ in range(3):
+        clock.tick()
+    assert clock.ticks == 3
+    assert clock.now() == 1.5
+
+
+def test_fixed_timestep_accumulates():
+    stepper = FixedTimestep(rate=30)
+    assert stepper.advance(1 / 60) == 0
+    assert stepper.alpha == pytest.approx(0.5)
+    assert stepper.advance(1 / 60) == 1
+    assert stepper.advance(0.1) == 3
+    assert stepper.dropped == 0
+
+
+def test_fixed_timestep_caps_and_counts_dropped_steps():
+    stepper = FixedTimestep(rate=30, max_steps=3)
+    assert stepper.advance(1.0) == 3  # 30 steps owed, 3 run, 1 kept as the next step's share
+    assert stepper.dropped == pytest.approx(26)
+    assert stepper.alpha == 1.0
+    assert stepper.advance(0) == 1
+    assert stepper.dropped == pytest.approx(26)
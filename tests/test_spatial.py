@@ -0,0 +1,33 @@
+# test_spatial.py
+import math
+import random
+
+import pytest
+
+from spatial import SpatialGrid
+
+
+class Point:
+    def __init__(self, x, y):
+        self.x, self.y = x, y
+
+
+@pytest.mark.parametrize("radius", [0.1, 0.5, 2.0])
+def test_nearby_finds_every_agent_in_range(radius):
+    rng = random.Random(0)
+    points = [Point(rng.uniform(-3, 10), rng.uniform(-3, 10)) for _ in range(500)]
+    grid = SpatialGrid(radius)
+    grid.rebuild(points)
+    for source in points[:50]:
+        nearby = list(grid.nearby(source.x, source.y))
+        assert len(nearby) == len(set(map(id, nearby)))  # Each agent at most once
+        in_range = [p for p in points if math.dist((p.x, p.y), (source.x, source.y)) <= radius]
+        assert set(map(id, in_range)) <= set(map(id, nearby))
+
+
+def test_rebuild_replaces_the_buckets():
+    grid = SpatialGrid(1.0)
+    grid.rebuild([Point(0.5, 0.5)])
+    grid.rebuild([Point(5.5, 5.5)])
+    assert list(grid.nearby(0.5, 0.5)) == []
+    assert len(list(grid.nearby(5, 5))) == 1
@@ -0,0 +1,51 @@
+# test_sweep.py
+import multiprocessing
+import os
+
+import pytest
+
+import sweep
+from engine import run_headless
+
+CRASH = (0.5, 0.0, 2, 0, 4)  # Marked for the patched run_headless below
+FAIL = (0.5, 0.0, 2, 1, 4)
+OK = (100, 1.0, 2, 1, 4)
+
+pytestmark = pytest.mark.skipif(multiprocessing.get_start_method() != "fork",
+                                reason="the patched run_headless must be inherited by the workers")
+
+
+def flaky_run_headless(params, **options):
+    if params == CRASH:
+        os._exit(1)  # The worker process dies outright, breaking the pool
+    if params == FAIL:
+        raise RuntimeError("bad parameters")
+    return run_headless(params, **options)
+
+
+def test_sweep_results():
+    results = list(sweep.run_sweep([OK, FAIL], replicates=2, workers=1, seed=1, time_limit=3))
+    assert len(results) == 4
+    assert sorted(result["replicate"] for result in results) == [0, 0, 1, 1]
+    for result in results:
+        assert "error" not in result
+    assert len({result["seed"] for result in results}) == 4
+
+
+def test_crashing_and_failing_runs_are_reported(monkeypatch):
+    monkeypatch.setattr(sweep, "run_headless", flaky_run_headless)
+    results = list(sweep.run_sweep([OK, CRASH, FAIL], replicates=2, workers=2, seed=1, time_limit=3))
+    assert len(results) == 6
+    by_params = {}
+    for result in results:
+        by_params.setdefault(tuple(result["parameters"].values()), []).append(result)
+    assert all("error" not in result for result in by_params[OK])
+    assert all(result["final_counts"]["deceased"] == 50 for result in by_params[OK])
+    assert all("BrokenProcessPool" in result["error"] for result in by_params[CRASH])
+    assert all("bad parameters" in result["error"] for result in by_params[FAIL])
+
+
+def test_seeds_match_the_run_order():
+    first = list(sweep.run_sweep([OK, FAIL], replicates=2, workers=2, seed=7, time_limit=3))
+    second = list(sweep.run_sweep([OK, FAIL], replicates=2, workers=1, seed=7, time_limit=3))
+    assert sorted(result["seed"] for result in first) == sorted(result["seed"] for result in second)
@@ -0,0 +1,69 @@
+# test_timeseries.py
+import pytest
+
+from compartments import HEALTHY, INFECTED, CompartmentCounter
+from timeseries import COLUMNS, TimeSeriesWriter, read_time_series
+
+
+def write_ticks(writer, counter, ticks):
+    for tick in ticks:
+        if tick:
+            counter.transition(HEALTHY, INFECTED)
+        writer.record(tick, tick / 30, counter)
+
+
+@pytest.fixture
+def counter():
+    counter = CompartmentCounter()
+    counter.add(HEALTHY, 20)
+    return counter
+
+
+@pytest.mark.parametrize("name", ["series.csv", "series.ndjson"])
+def test_round_trip_every_nth_tick(tmp_path, counter, name):
+    path = str(tmp_path / name)
+    with TimeSeriesWriter(path, every=3, flush_every=2) as writer:
+        write_ticks(writer, counter, range(10))
+    series = read_time_series(path)
+    assert list(series) == list(COLUMNS)
+    assert series["tick"] == [0, 3, 6, 9]
+    assert series["infected"] == [0, 3, 6, 9]
+    assert series["healthy"] == [20, 17, 14, 11]
+    assert series["time"] == pytest.approx([0, 0.1, 0.2, 0.3])
+
+
+def test_rows_reach_the_file_at_each_flush(tmp_path, counter):
+    path = str(tmp_path / "series.csv")
+    writer = TimeSeriesWriter(path, flush_every=4)
+    write_ticks(writer, counter, range(5))
+    assert read_time_series(path)["tick"] == [0, 1, 2, 3]
+    writer.close()
+    assert read_time_series(path)["tick"] == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.parametrize("name", ["series.csv", "series.ndjson"])
+def test_resume_drops_rows_after_the_checkpoint(tmp_path, counter, name):
+    path = str(tmp_path / name)
+    with TimeSeriesWriter(path) as writer:
+        write_ticks(writer, counter, range(10))  # Ran on past a checkpoint at tick 6
+    resumed = CompartmentCounter()
+    resumed.add(HEALTHY, 14)
+    resumed.add(INFECTED, 6)
+    with TimeSeriesWriter(path, resume_from=6) as writer:
+        for tick in range(6, 8):
+            writer.record(tick, tick / 30, resumed)
+    series = read_time_series(path)
+    assert series["tick"] == [0, 1, 2, 3, 4, 5, 6, 7]
+    assert series["infected"] == [0, 1, 2, 3, 4, 5, 6, 6]
+
+
+def test_resume_without_a_file_starts_a_new_one(tmp_path, counter):
+    path = str(tmp_path / "series.csv")
+    with TimeSeriesWriter(path, resume_from=6) as writer:
+        writer.record(6, 0.2, counter)
+    assert read_time_series(path)["tick"] == [6]
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        TimeSeriesWriter(str(tmp_path / "series.txt"), format="parquet")
@@ -0,0 +1,51 @@
+# test_trajectory.py
+import numpy as np
+
+from city import CityLayout
+from compartments import CompartmentCounter
+from engine import BUILDING_HEIGHT, BUILDING_SIZE, CITY_SIZE, ROAD_WIDTH, create_agents, create_contact_grid, step
+from events import EventScheduler
+from rng import SimulationRNG
+from sim_clock import SimulationClock
+from trajectory import TrajectoryReader, TrajectoryRecorder
+
+PARAMS = (0.7, 0.95, 1, 1, 2)  # Everyone infected dies within seconds
+
+
+def simulate(ticks, recorder=None):
+    rng = SimulationRNG(2)
+    city_map = CityLayout(CITY_SIZE, BUILDING_SIZE, ROAD_WIDTH, BUILDING_HEIGHT, rng)
+    clock = SimulationClock()
+    counter = CompartmentCounter()
+    scheduler = EventScheduler(clock)
+    agents = create_agents(PARAMS, city_map, clock, 30, rng, counter, scheduler)
+    grid = create_contact_grid(PARAMS)
+    for _ in range(ticks):
+        step(agents, grid, scheduler)
+        if recorder is not None:
+            recorder.record_agents(clock.ticks, clock.now(), counter, city_map, agents)
+        clock.tick()
+    return city_map, agents, counter
+
+
+def test_graves_are_added_by_the_engine():
+    city_map, agents, _ = simulate(300)
+    buried = sum(agent.is_buried() for agent in agents)
+    assert buried > 0
+    assert len(city_map.graves) == buried
+
+
+def test_recording_does_not_change_the_run(tmp_path):
+    path = str(tmp_path / "run.traj")
+    expected_map, expected_agents, expected_counter = simulate(300)
+    with TrajectoryRecorder(path, expected_map, 30, PARAMS, 1 / 30) as recorder:
+        city_map, agents, counter = simulate(300, recorder)
+    assert list(city_map.graves) == list(expected_map.graves)
+    assert counter.totals() == expected_counter.totals()
+    assert [(agent.x, agent.y) for agent in agents] == [(agent.x, agent.y) for agent in expected_agents]
+
+    reader = TrajectoryReader(path)
+    last = reader[len(reader) - 1]
+    assert last["graves"] == len(city_map.graves)
+    assert (~last["visible"]).sum() == len(city_map.graves)
+    np.testing.assert_allclose(last["x"], [agent.x for agent in agents], rtol=1e-6)
@@ -0,0 +1,96 @@
+# timeseries.py
+import json
+import os
+
+COLUMNS = ("tick", "time", "infected", "healthy", "recovered", "deceased")
+
+
+class TimeSeriesWriter:
+    """Streams compartment counts to a CSV or NDJSON file while a run is in progress.
+
+    Rows are recorded every `every` ticks, buffered, and written and flushed every
+    `flush_every` rows, so long runs don't keep their curves in memory and a crashed
+    run still leaves everything up to the last flush on disk.
+
+    With resume_from=tick an existing file is continued instead of replaced: its rows from
+    that tick on (written after the checkpoint being resumed) are dropped first.
+    """
+
+    def __init__(self, path, every=1, flush_every=256, format=None, resume_from=None):
+        self.path = path
+        self.every = every
+        self.flush_every = flush_every
+        self.format = format or ("ndjson" if path.endswith((".ndjson", ".jsonl")) else "csv")
+        if self.format not in ("csv", "ndjson"):
+            raise ValueError(f"Unsupported time-series format: {self.format}")
+        self.rows = []
+        if resume_from is not None and os.path.exists(path):
+            self.file = open(path, "r+")
+            self._truncate_from(resume_from)
+        else:
+            self.file = open(path, "w")
+            if self.format == "csv":
+                self.file.write(",".join(COLUMNS) + "\n")
+
+    def _truncate_from(self, tick):
+        """Drop the rows of `tick` and later from the open file and position it at the end."""
+        keep = 0
+        while True:
+            line = self.file.readline()
+            if not line:
+                break
+            if line.strip() and not line.startswith(COLUMNS[0]):  # Skip the CSV header
+                row_tick = json.loads(line)["tick"] if self.format == "ndjson" else int(line.split(",", 1)[0])
+                if row_tick >= tick:
+                    break
+            keep = self.file.tell()
+        self.file.seek(keep)
+        self.file.truncate()
+
+    def record(self, tick, time, counter):
+        """Record the counter's totals for this tick, if it falls on the sampling interval."""
+        if tick % self.every:
+            return
+        infected, healthy, recovered, deceased = counter.totals()
+        self.rows.append((tick, time, infected, healthy, recovered, deceased))
+        if len(self.rows) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered rows and flush them to the operating system."""
+        if self.rows:
+            if self.format == "csv":
+                lines = [f"{tick},{time:.6g},{infected},{healthy},{recovered},{deceased}\n"
+                         for tick, time, infected, healthy, recovered, deceased in self.rows]
+            else:
+                lines = [json.dumps(dict(zip(COLUMNS, row))) + "\n" for row in self.rows]
+            self.file.writelines(lines)
+            self.rows = []
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+
+def read_time_series(path):
+    """Load a time series written by TimeSeriesWriter as a dict of column lists."""
+    columns = {name: [] for name in COLUMNS}
+    with open(path, "r") as file:
+        if path.endswith((".ndjson", ".jsonl")):
+            rows = (json.loads(line) for line in file if line.strip())
+            rows = ([row[name] for name in COLUMNS] for row in rows)
+        else:
+            next(file)  # Header
+            rows = (line.rstrip("\n").split(",") for line in file if line.strip())
+        for row in rows:
+            for name, value in zip(COLUMNS, row):
+                columns[name].append(float(value) if name == "time" else int(value))
+    return columns
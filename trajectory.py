@@ -0,0 +1,190 @@
+# trajectory.py
+"""Per-tick agent trajectories in an append-only memory-mapped file, for replay.py.
+
+A trajectory file is MAGIC, the number of complete frames, the length of a JSON header,
+the header (map layout, parameters, frame layout), the building heights and then one
+fixed-size frame per recorded tick. Frames are written straight into the mapping and only
+counted once complete, so a file cut short by a crash is still readable up to its last
+frame.
+"""
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b"EPITRAJ1"
+ALIGN = 64
+PREFIX = struct.Struct("<8sQQ")  # MAGIC, frame count, header length
+INITIAL_FRAMES = 256
+
+
+def frame_dtype(num_agents):
+    """One recorded tick: time, counts and graves, then every agent's position, color and
+    whether it is drawn (the deceased already in the graveyard are not)."""
+    return np.dtype([
+        ("tick", "<i8"),
+        ("time", "<f8"),
+        ("counts", "<i4", 4),  # (infected, healthy, recovered, deceased)
+        ("graves", "<i4"),
+        ("x", "<f4", num_agents),
+        ("y", "<f4", num_agents),
+        ("color", "u1", (num_agents, 3)),
+        ("visible", "?", num_agents),
+    ], align=True)
+
+
+def _aligned(offset):
+    return -(-offset // ALIGN) * ALIGN
+
+
+class TrajectoryRecorder:
+    """Appends one frame per recorded tick of a run to a trajectory file.
+
+    The file grows by doubling, so appending costs a copy of the agents' positions into
+    the mapping and nothing else. With resume_from=tick an existing recording is continued
+    (after a checkpoint resume) instead of replaced, dropping its frames from that tick on.
+    """
+
+    def __init__(self, path, city_map, num_agents, params, dt, every=1, resume_from=None):
+        self.path = path
+        self.every = every
+        self.dtype = frame_dtype(num_agents)
+        if resume_from is not None and os.path.exists(path):
+            self.file = open(path, "r+b")
+            self.header, self.header_length, self.frames_offset, frames = _read_header(self.file)
+            if self.header["num_agents"] != num_agents:
+                raise ValueError(f"{path} is a recording of a different run")
+            self.count = frames
+            self._map(max(frames, INITIAL_FRAMES))
+            self.count = int(np.searchsorted(self.frames["tick"][:frames], resume_from))
+        else:
+            self.header = {
+                "params": list(params),
+                "dt": dt,
+                "every": every,
+                "num_agents": num_agents,
+                "layout": [city_map.city_size, city_map.building_size, city_map.road_width,
+                           city_map.building_height],
+            }
+            heights = np.array(city_map.building_heights, dtype=np.float64)
+            self.header["heights_shape"] = list(heights.shape)
+            encoded = json.dumps(self.header).encode()
+            self.header_length = len(encoded)
+            heights_offset = _aligned(PREFIX.size + len(encoded))
+            self.frames_offset = _aligned(heights_offset + heights.nbytes)
+            self.file = open(path, "w+b")
+            self.file.write(PREFIX.pack(MAGIC, 0, len(encoded)) + encoded)
+            self.file.seek(heights_offset)
+            self.file.write(heights.tobytes())
+            self.count = 0
+            self._map(INITIAL_FRAMES)
+
+    def _map(self, capacity):
+        """(Re)map the file with room for capacity frames."""
+        if getattr(self, "mapping", None) is not None:
+            self.frames = None
+            self.mapping.close()
+        self.capacity = capacity
+        self.file.truncate(self.frames_offset + capacity * self.dtype.itemsize)
+        self.mapping = mmap.mmap(self.file.fileno(), 0)
+        self.frames = np.ndarray(capacity, self.dtype, self.mapping, self.frames_offset)
+
+    def record(self, tick, time, counter, graves, x, y, colors, visible):
+        """Append a frame if tick is one of every `every` ticks; colors are RGB in [0, 1]."""
+        if tick % self.every:
+            return
+        if self.count == self.capacity:
+            self._map(self.capacity * 2)
+        frame = self.frames[self.count]
+        frame["tick"] = tick
+        frame["time"] = time
+        frame["counts"] = counter.totals()
+        frame["graves"] = graves
+        frame["x"] = x
+        frame["y"] = y
+        frame["color"] = np.rint(np.asarray(colors) * 255)
+        frame["visible"] = visible
+        self.count += 1
+        PREFIX.pack_into(self.mapping, 0, MAGIC, self.count, self.header_length)
+
+    def record_agents(self, tick, time, counter, city_map, agents):
+        """Append a frame of a list of Agent objects."""
+        if tick % self.every:
+            return
+        visible = [not agent.is_buried() for agent in agents]
+        self.record(tick, time, counter, len(city_map.graves),
+                    [agent.x for agent in agents], [agent.y for agent in agents],
+                    [agent.color for agent in agents], visible)
+
+    def record_population(self, tick, time, counter, city_map, population):
+        """Append a frame of a population.Population."""
+        if tick % self.every:
+            return
+        self.record(tick, time, counter, len(city_map.graves), population.x, population.y,
+                    population.colors(), ~(population.deceased & population.in_graveyard))
+
+    def close(self):
+        """Cut the file down to the recorded frames."""
+        if self.file.closed:
+            return
+        self.mapping.flush()
+        self.frames = None
+        self.mapping.close()
+        self.mapping = None
+        self.file.truncate(self.frames_offset + self.count * self.dtype.itemsize)
+        self.file.seek(0)
+        self.file.write(PREFIX.pack(MAGIC, self.count, self.header_length))  # Frames dropped on resume
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+
+def _read_header(file):
+    """Return (header, header length, frames_offset, frame count) of an open trajectory file."""
+    file.seek(0)
+    magic, frames, length = PREFIX.unpack(file.read(PREFIX.size))
+    if magic != MAGIC:
+        raise ValueError(f"{file.name} is not a trajectory recording")
+    header = json.loads(file.read(length))
+    header["heights_offset"] = _aligned(PREFIX.size + length)
+    heights_size = 8 * int(np.prod(header["heights_shape"]))
+    return header, length, _aligned(header["heights_offset"] + heights_size), frames
+
+
+class TrajectoryReader:
+    """Read-only view of a trajectory file; frames are paged in from disk as they are used."""
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self.header, _, frames_offset, count = _read_header(file)
+            self.mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        dtype = frame_dtype(self.header["num_agents"])
+        count = min(count, (len(self.mapping) - frames_offset) // dtype.itemsize)
+        self.frames = np.ndarray(count, dtype, self.mapping, frames_offset)
+        self.times = self.frames["time"]
+        heights = self.header["heights_shape"]
+        self.building_heights = np.ndarray(heights, np.float64, self.mapping, self.header["heights_offset"])
+
+    @property
+    def params(self):
+        return tuple(self.header["params"])
+
+    @property
+    def duration(self):
+        return float(self.times[-1]) if len(self.frames) else 0.0
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __getitem__(self, index):
+        return self.frames[index]
+
+    def index_at(self, time):
+        """Index of the last frame recorded at or before simulated time `time`."""
+        return max(int(np.searchsorted(self.times, time, side="right")) - 1, 0)
@@ -0,0 +1,186 @@
+# visual.py
+"""The visual run: the simulation drawn in an OpenGL window, one parameter set after another."""
+import os
+
+import pygame
+from pygame.locals import *
+from OpenGL.GL import *
+from OpenGL.GLU import *
+
+from map import Map
+from assets import shared_assets, FONT
+from agent_renderer import AgentRenderer, agent_positions
+from camera import Camera
+from hud import TextRenderer, draw_hud, draw_profile
+from profiler import FrameProfiler, NullProfiler
+from sim_clock import SimulationClock, FixedTimestep
+from rng import SimulationRNG
+from compartments import CompartmentCounter
+from events import EventScheduler
+from timeseries import TimeSeriesWriter
+from engine import (CITY_SIZE, BUILDING_SIZE, BUILDING_HEIGHT, ROAD_WIDTH, NUM_AGENTS, TICK_DT,
+                    create_agents, create_contact_grid, move_phase, infection_phase, make_result)
+
+WIDTH, HEIGHT = 800, 800
+# Simulation ticks per real second and the frame rate cap; SIM_RATE=300 runs the epidemic
+# ten times faster than real time while still drawing at 30 FPS
+SIM_RATE = float(os.environ.get("SIM_RATE", 1 / TICK_DT))
+FPS = 30
+
+
+def open_window(width=WIDTH, height=HEIGHT):
+    """Initializes Pygame, opens the OpenGL window and returns the TextRenderer for its HUD."""
+    pygame.init()
+    pygame.display.set_mode((width, height), DOUBLEBUF | OPENGL)
+    pygame.display.set_caption("3D City Layout with Moving Agents")
+    pygame.font.init()
+    return TextRenderer(shared_assets().path(FONT), width, height)  # Glyph atlases loaded on first use
+
+
+# Set up camera for a straight top-down perspective
+def setup_camera(width=WIDTH, height=HEIGHT):
+    """Camera 20 units above the center of the grid; zoom and pan with the mouse wheel,
+    +/-, the arrow keys or by dragging (Home resets the view)."""
+    center = CITY_SIZE * (BUILDING_SIZE + ROAD_WIDTH) / 2
+    camera = Camera(center, center, 20, width, height)
+    camera.apply()
+    return camera
+
+def reset_simulation():
+    """Resets OpenGL state for a fresh simulation.
+
+    The window, its GL context, the textures and the HUD glyph atlases are reused.
+    """
+    glMatrixMode(GL_PROJECTION)
+    glLoadIdentity()  # Reset OpenGL projection matrix
+    glMatrixMode(GL_MODELVIEW)
+    glLoadIdentity()  # Reset OpenGL modelview matrix
+
+def run_simulation(params, text_renderer, time_limit=20, dt=TICK_DT, seed=None, series_path=None, profiler=None,
+                   camera=None, sim_rate=SIM_RATE, fps=FPS, stats=None):
+    """Runs a single simulation with given parameters in the window of open_window, whose
+    TextRenderer draws the counts.
+
+    time_limit is in simulated seconds, advanced by dt per tick. The simulation runs at
+    sim_rate ticks per real second independently of the frame rate (at most fps): each
+    frame runs the ticks that are due, then draws the agents interpolated between the last
+    two ticks. A slow frame is made up for with more ticks in the next one, so rendering
+    load drops frames instead of slowing the epidemic down.
+    If series_path is given, the compartment counts of every tick are streamed to it.
+    If a profiler.FrameProfiler is given, every phase of the frame is timed and the
+    rolling averages are drawn next to the counts. A camera.Camera, if given, follows
+    the user's zoom and pan; only the parts of the city and the agents in view are drawn.
+
+    A machine too slow for sim_rate runs fewer ticks than the real time passed (see
+    sim_clock.FixedTimestep); the ticks given up are reported on stdout and, if stats is a
+    dict, stored in it as "dropped_ticks".
+    """
+    profiler = profiler or NullProfiler()
+    # Initialize map and agents (one agent starts infected)
+    sim_clock = SimulationClock(dt)
+    rng = SimulationRNG(seed)
+    city_map = Map(CITY_SIZE, BUILDING_SIZE, ROAD_WIDTH, BUILDING_HEIGHT, rng)
+    counter = CompartmentCounter()
+    scheduler = EventScheduler(sim_clock)  # Quarantine, recovery/death and graveyard timers
+    agents = create_agents(params, city_map, sim_clock, NUM_AGENTS, rng, counter, scheduler)
+    grid = create_contact_grid(params)
+    renderer = AgentRenderer()
+    series = TimeSeriesWriter(series_path) if series_path else None
+
+    running = True
+    clock = pygame.time.Clock()
+    stepper = FixedTimestep(sim_rate)
+    previous = None  # Agent positions before the last tick, to interpolate from
+
+    while running:
+        with profiler.phase("events"):
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                elif camera is not None:
+                    camera.handle_event(event)
+
+        with profiler.phase("frame_cap"):
+            elapsed = clock.tick(fps) / 1000  # Limit FPS; real seconds since the last frame
+
+        # Run the ticks due since the last frame
+        steps = stepper.advance(elapsed)
+        for i in range(steps):
+            # Exit simulation after time limit
+            if sim_clock.now() > time_limit:
+                running = False
+                break
+            if i == steps - 1:
+                previous = agent_positions(agents)
+            with profiler.phase("movement"):
+                scheduler.run_due()
+                move_phase(agents)
+            with profiler.phase("infection"):
+                infection_phase(agents, grid, scheduler)
+            if series is not None:
+                with profiler.phase("series"):
+                    series.record(sim_clock.ticks, sim_clock.now(), counter)
+            sim_clock.tick()
+
+        with profiler.phase("draw_map"):
+            glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+            if camera is not None:
+                camera.apply()
+            city_map.draw_map()
+        with profiler.phase("draw_agents"):
+            renderer.draw(agents, city_map.frustum, previous, stepper.alpha)
+
+        with profiler.phase("hud"):
+            draw_hud(text_renderer, counter, params)
+            if profiler.enabled:
+                draw_profile(text_renderer, profiler.summary)
+        with profiler.phase("flip"):
+            pygame.display.flip()
+        profiler.end_frame()
+
+    if series is not None:
+        series.close()
+    city_map.release()
+
+    dropped = int(stepper.dropped)
+    if dropped:
+        print(f"Fell behind {sim_rate:g} ticks/s: {dropped} ticks ({dropped * dt:.1f} simulated s) "
+              f"were not run in real time, so the run was slowed down")
+    if stats is not None:
+        stats["dropped_ticks"] = dropped
+
+    # Final infection state counts
+    return counter.totals()
+
+
+def run_param_sets(param_sets, time_limit=20, seeds=None):
+    """Runs every parameter set in turn in one window and returns their result records.
+
+    seeds, if given, holds one seed per parameter set. Set SIM_PROFILE=1 to show per-phase
+    frame times, and SIM_TRACE=<file.json> to also export them as a Chrome trace
+    (chrome://tracing or https://ui.perfetto.dev).
+    """
+    trace_path = os.environ.get("SIM_TRACE")
+    profiler = FrameProfiler(trace=bool(trace_path)) if os.environ.get("SIM_PROFILE") or trace_path else None
+    seeds = seeds if seeds is not None else [None] * len(param_sets)
+    text_renderer = open_window()
+
+    results = []
+    for params, seed in zip(param_sets, seeds):
+        reset_simulation()
+        camera = setup_camera()
+        if profiler is not None:
+            profiler.mark("run", parameters=params)
+        stats = {}
+        counts = run_simulation(params, text_renderer, time_limit, seed=seed, profiler=profiler, camera=camera,
+                                stats=stats)
+        result = make_result(params, counts)
+        if stats["dropped_ticks"]:
+            result["dropped_ticks"] = stats["dropped_ticks"]  # The run was slower than real time
+        results.append(result)
+
+    if trace_path:
+        profiler.export_trace(trace_path)
+    text_renderer.release()
+    pygame.quit()
+    return results